@@ -16,6 +16,9 @@ from openpyxl.worksheet.worksheet import Worksheet
 
 from fvgvisionai.common.app_timer import AppTimer
 from fvgvisionai.common.atomic_boolean import AtomicBoolean
+from fvgvisionai.common.frame_tracer import TRACER
+from fvgvisionai.common.sampling_profiler import PROFILER
+from fvgvisionai.common.stage_latency import LatencyStage, LATENCY_PERCENTILES
 from fvgvisionai.config.app_settings import AppSettings
 from fvgvisionai.processor.data_aggregator import DataAggregator
 
@@ -90,13 +93,26 @@ class BenchmarkMonitor:
             "min_time_in_zone",
             "avg_time_in_zone",
             "sum_entrances",
-            "sum_exits"
+            "sum_exits",
+            "sum_reader_dropped_frames",
+            "sum_processor_dropped_frames",
+            "sum_processor_offered_frames",
+            "sum_processed_frames",
+            "avg_motion_score",
+            "sum_motion_skipped_frames"
         ]
+        # percentili e massimo dei tempi di ogni stadio
+        for stage in LatencyStage:
+            headers1.extend([f"{stage.value['name']}_p{percentile}_ms" for percentile in LATENCY_PERCENTILES])
+            headers1.append(f"{stage.value['name']}_max_ms")
         self.current_sheet.append(headers1)
 
     def start(self):
         self._interval_timer.start()
         self._benchmark_timer.start()
+        # il profiler copre l'intero benchmark
+        if self._app_settings.profiler_enabled:
+            PROFILER.start()
 
     def close(self):
 
@@ -119,6 +135,16 @@ class BenchmarkMonitor:
         # Chiudere il foglio Excel
         self.workbook.close()
 
+        # timeline degli ultimi frame del benchmark
+        if TRACER.enabled:
+            TRACER.dump(self._app_settings.trace_file_name)
+            self._logger.info(f"trace saved to {self._app_settings.trace_file_name}")
+
+        if self._app_settings.profiler_enabled:
+            PROFILER.stop()
+            PROFILER.dump(self._app_settings.profiler_file_name)
+            self._logger.info(f"profile saved to {self._app_settings.profiler_file_name}.*")
+
     def _build_message_payload(self,
                                data: DataAggregator) -> list:
         agg_frame_info_list = [
@@ -137,8 +163,16 @@ class BenchmarkMonitor:
             data.max_time_in_zone,
             data.avg_time_in_zone,
             data.door_people_entered,
-            data.door_people_leaved
+            data.door_people_leaved,
+            data.frames_dropped_by_reader,
+            data.frames_dropped_by_processor,
+            data.frames_offered_to_processor,
+            data.frames_processed,
+            data.motion_score.average,
+            data.frames_skipped_by_motion
         ]
+        for stage in LatencyStage:
+            agg_frame_info_list.extend(data.stage_latency.percentiles(stage))
         return agg_frame_info_list
 
     def generate_graph(self, sheet_title: str, graph_title: str, x_axis_title: str, y_axis_title: str,
@@ -175,7 +209,8 @@ class BenchmarkMonitor:
             return False
         elif elapsed_time_from_last_benchmark_ms >= self._measures_aggregation_time_ms:
             data = data_aggregator.copy()
-            self._executor.submit(self._registry_data_for_benchmark, frame_index, source_frame, data)
+            # il frame appartiene ad un pool e verra' riutilizzato, ne serve una copia per il thread del benchmark
+            self._executor.submit(self._registry_data_for_benchmark, frame_index, source_frame.copy(), data)
             self._interval_timer.start()
             return True
         elif (global_elapsed_time_ms > self._app_settings.benchmark_duration_time_ms +
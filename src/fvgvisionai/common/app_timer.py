@@ -2,7 +2,10 @@ import time
 
 
 class AppTimer:
-    """Una classe per misurare il tempo trascorso tra due punti nel codice."""
+    """Una classe per misurare il tempo trascorso tra due punti nel codice.
+
+    Usa l'orologio monotono perf_counter_ns, per cui le misure non risentono delle correzioni dell'ora di sistema.
+    """
 
     def __init__(self):
         """Inizializza un nuovo timer."""
@@ -10,7 +13,7 @@ class AppTimer:
 
     def start(self):
         """Avvia il timer registrando il tempo di inizio."""
-        self.start_time = time.time_ns()
+        self.start_time = time.perf_counter_ns()
 
     def stop(self) -> float:
         """Ferma il timer e restituisce il tempo trascorso in millisecondi.
@@ -41,7 +44,7 @@ class AppTimer:
                 """
         if not self.is_running:
             return 0
-        end_time = time.time_ns()
+        end_time = time.perf_counter_ns()
         elapsed_time = end_time - self.start_time
 
         # Calcola il tempo trascorso in millisecondi
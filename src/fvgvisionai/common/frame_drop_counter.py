@@ -0,0 +1,52 @@
+import threading
+
+from fvgvisionai.common.metrics import FRAMES_DROPPED, FRAMES_PROCESSED
+
+
+class FrameDropCounter:
+    """Conteggio dei frame scartati, condiviso tra il reader (frame acquisiti ma mai decodificati) e il processor
+    (frame ricevuti mentre era ancora occupato), assieme ai frame offerti al processor e da questo elaborati.
+
+    Scartati ed elaborati sono anche contati, senza azzeramenti, nelle metriche della camera."""
+
+    def __init__(self, camera_index: int = 0):
+        self._reader_dropped = 0
+        self._processor_dropped = 0
+        self._processor_offered = 0
+        self._processor_processed = 0
+        self._lock = threading.Lock()
+
+        self._reader_dropped_metric = FRAMES_DROPPED.labels(camera=camera_index, stage="reader")
+        self._processor_dropped_metric = FRAMES_DROPPED.labels(camera=camera_index, stage="processor")
+        self._processed_metric = FRAMES_PROCESSED.labels(camera=camera_index)
+
+    def add_reader_dropped(self, value: int = 1):
+        self._reader_dropped_metric.inc(value)
+        with self._lock:
+            self._reader_dropped += value
+
+    def add_processor_dropped(self, value: int = 1):
+        self._processor_dropped_metric.inc(value)
+        with self._lock:
+            self._processor_dropped += value
+
+    def add_processor_offered(self, value: int = 1):
+        with self._lock:
+            self._processor_offered += value
+
+    def add_processor_processed(self, value: int = 1):
+        self._processed_metric.inc(value)
+        with self._lock:
+            self._processor_processed += value
+
+    def pop(self) -> (int, int, int, int):
+        """Restituisce i frame scartati (reader, processor), offerti ed elaborati dal processor dall'ultima chiamata e
+        azzera i contatori."""
+        with self._lock:
+            counters = (self._reader_dropped, self._processor_dropped,
+                        self._processor_offered, self._processor_processed)
+            self._reader_dropped = 0
+            self._processor_dropped = 0
+            self._processor_offered = 0
+            self._processor_processed = 0
+            return counters
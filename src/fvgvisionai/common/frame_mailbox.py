@@ -0,0 +1,51 @@
+import threading
+from typing import Optional
+
+
+class FrameMailbox:
+    """Casella di un solo elemento tra il reader ed il thread che elabora i frame.
+
+    Un nuovo frame sostituisce quello non ancora preso in carico ("latest wins"), per cui il thread elabora sempre il
+    frame piu' recente ed il reader non viene mai bloccato. Consegna ed attesa avvengono sotto lo stesso lock, per cui
+    ogni frame offerto viene o elaborato una sola volta o sostituito.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item: Optional[tuple] = None
+        self._closed = False
+
+    def offer(self, item: tuple) -> Optional[tuple]:
+        """Deposita l'elemento e restituisce quello sostituito, None se la casella era vuota."""
+        with self._condition:
+            replaced = self._item
+            self._item = item
+            self._condition.notify()
+            return replaced
+
+    @property
+    def pending(self) -> int:
+        """1 se un frame attende di essere preso in carico, altrimenti 0."""
+        return 0 if self._item is None else 1
+
+    @property
+    def pending_item(self) -> Optional[tuple]:
+        """Elemento in attesa di essere preso in carico, senza prelevarlo."""
+        return self._item
+
+    def take(self, timeout: float) -> Optional[tuple]:
+        """Preleva l'elemento, attendendo al massimo timeout secondi; None se non ne arriva nessuno o alla chiusura."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item = self._item
+            self._item = None
+            return item
+
+    def close(self) -> Optional[tuple]:
+        """Sveglia il thread in attesa e restituisce l'elemento non ancora prelevato."""
+        with self._condition:
+            self._closed = True
+            item = self._item
+            self._item = None
+            self._condition.notify_all()
+            return item
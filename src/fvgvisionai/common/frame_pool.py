@@ -0,0 +1,125 @@
+import logging
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class FrameLease:
+    """Riferimento ad un buffer del FramePool, con conteggio esplicito dei possessori.
+
+    Chi riceve un lease e deve usare il frame oltre la chiamata corrente esegue retain(); quando ha finito esegue
+    release(). All'ultimo release() il buffer torna disponibile nel pool.
+    """
+
+    def __init__(self, pool: 'FramePool', index: int, frame: np.ndarray):
+        self._pool = pool
+        self._index = index
+        self.frame = frame
+        self._ref_count = 1
+
+    def retain(self) -> 'FrameLease':
+        self._pool.retain(self)
+        return self
+
+    def release(self):
+        self._pool.release(self)
+
+
+# pool esistenti, per il conteggio della memoria dei frame per possessore
+_frame_pools: 'weakref.WeakSet[FramePool]' = weakref.WeakSet()
+
+
+class FramePool:
+    """Pool di buffer numpy preallocati, condivisi tra reader, processor e output tramite FrameLease.
+
+    Se tutti i buffer sono in uso ne viene allocato uno nuovo, fino ad un massimo di max_size; oltre viene allocato
+    un frame fuori dal pool, che verra' liberato dal garbage collector.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], initial_size: int, max_size: int, dtype=np.uint8,
+                 owner: str = "unknown"):
+        self._shape = shape
+        self._dtype = dtype
+        self._owner = owner
+        self._max_size = max(max_size, initial_size)
+        self._buffers: List[np.ndarray] = [np.empty(shape, dtype=dtype) for _ in range(initial_size)]
+        self._free_indexes: List[int] = list(range(initial_size))
+        self._overflow_allocations = 0
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        _frame_pools.add(self)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def size(self) -> int:
+        return len(self._buffers)
+
+    @property
+    def free_count(self) -> int:
+        with self._lock:
+            return len(self._free_indexes)
+
+    @property
+    def owner(self) -> str:
+        return self._owner
+
+    def usage(self) -> Dict[str, int]:
+        """Buffer del pool, quelli in uso, i byte allocati ed i frame allocati fuori dal pool perche' esaurito."""
+        with self._lock:
+            size = len(self._buffers)
+            in_use = size - len(self._free_indexes)
+            overflow_allocations = self._overflow_allocations
+        frame_bytes = int(np.prod(self._shape)) * np.dtype(self._dtype).itemsize
+        return {"buffers": size, "in_use": in_use, "bytes": size * frame_bytes,
+                "overflow_allocations": overflow_allocations}
+
+    def acquire(self) -> FrameLease:
+        with self._lock:
+            if len(self._free_indexes) > 0:
+                index = self._free_indexes.pop()
+                return FrameLease(self, index, self._buffers[index])
+
+            if len(self._buffers) < self._max_size:
+                self._buffers.append(np.empty(self._shape, dtype=self._dtype))
+                self._logger.debug(f"frame pool is grown to {len(self._buffers)} buffers")
+                index = len(self._buffers) - 1
+                return FrameLease(self, index, self._buffers[index])
+
+        with self._lock:
+            self._overflow_allocations += 1
+        self._logger.warning(f"frame pool is exhausted ({self._max_size} buffers), allocating a frame")
+        return FrameLease(self, -1, np.empty(self._shape, dtype=self._dtype))
+
+    def retain(self, lease: FrameLease):
+        with self._lock:
+            lease._ref_count += 1
+
+    def release(self, lease: FrameLease):
+        with self._lock:
+            lease._ref_count -= 1
+            if lease._ref_count == 0 and lease._index >= 0:
+                self._free_indexes.append(lease._index)
+            elif lease._ref_count < 0:
+                self._logger.error(f"frame lease #{lease._index} released too many times")
+
+
+def frame_pools_usage() -> Dict[str, Dict[str, int]]:
+    """Uso dei pool esistenti sommato per possessore."""
+    result: Dict[str, Dict[str, int]] = {}
+    for pool in list(_frame_pools):
+        owner_usage = result.setdefault(pool.owner, {"pools": 0, "buffers": 0, "in_use": 0, "bytes": 0,
+                                                     "overflow_allocations": 0})
+        owner_usage["pools"] += 1
+        for key, value in pool.usage().items():
+            owner_usage[key] += value
+    return result
+
+
+def release_lease(lease: Optional[FrameLease]):
+    if lease is not None:
+        lease.release()
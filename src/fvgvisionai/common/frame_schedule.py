@@ -0,0 +1,45 @@
+import math
+
+from fvgvisionai.config.app_settings import AppSettings
+
+
+class FrameSchedule:
+    """Pianificazione dei frame condivisa tra reader e processor, indicizzata con il frame index del reader.
+
+    Un frame deve essere decodificato solo se verra' analizzato dal modello (MODEL_SKIP_FRAMES_MASK) oppure se serve
+    all'output, che puo' avere fps inferiori a quelli della sorgente. Tutti gli altri frame possono essere solo
+    acquisiti con grab(), senza retrieve() e resize.
+    """
+
+    def __init__(self, app_settings: AppSettings):
+        self._enabled = app_settings.video_source_scheduled_decoding_enabled
+        self._mask = app_settings.model_skip_frames_mask if app_settings.model_skip_frames_enabled else [True]
+        self._mask_size = len(self._mask)
+        self._output_enabled = app_settings.video_output_stream or app_settings.video_output_image
+        self._output_fps = app_settings.video_output_fps
+        self._output_stride = 1
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def output_stride(self) -> int:
+        return self._output_stride
+
+    def setup(self, source_frame_rate_declared: int):
+        source_fps = 1000.0 / max(source_frame_rate_declared, 1)
+        # arrotondato per difetto, l'output non deve mai restare senza frame
+        self._output_stride = max(1, math.floor(source_fps / max(self._output_fps, 1)))
+
+    def needs_analysis(self, frame_index: int) -> bool:
+        return self._mask[frame_index % self._mask_size]
+
+    def needs_decode(self, frame_index: int) -> bool:
+        if not self._enabled:
+            return True
+
+        if self.needs_analysis(frame_index):
+            return True
+
+        return self._output_enabled and frame_index % self._output_stride == 0
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Deque, Dict, Tuple
+
+# eventi conservati di default, i piu' vecchi vengono sovrascritti
+DEFAULT_TRACE_BUFFER_SIZE = 100_000
+
+_NO_SPAN = nullcontext()
+
+
+class _TraceSpan:
+    __slots__ = ("_tracer", "_name", "_frame_index", "_camera_index", "_start_ns")
+
+    def __init__(self, tracer: 'FrameTracer', name: str, frame_index: int, camera_index: int):
+        self._tracer = tracer
+        self._name = name
+        self._frame_index = frame_index
+        self._camera_index = camera_index
+        self._start_ns = 0
+
+    def __enter__(self):
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._tracer.end(self._name, self._start_ns, self._frame_index, self._camera_index)
+        return False
+
+
+class FrameTracer:
+    """Registrazione opzionale della timeline dei frame tra i thread, esportabile nel formato trace-event di
+    Chrome/Perfetto (chrome://tracing, ui.perfetto.dev).
+
+    Ogni tratto misurato diventa un evento completo (inizio e durata) con thread, frame_index e camera, conservato in
+    un ring di dimensione fissa: gli eventi di reader, processor ed output dello stesso frame si possono cosi'
+    confrontare per vedere attese e sovrapposizioni. Con il tracer disabilitato begin() e span() non misurano nulla.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._events: Deque[Tuple[str, int, int, int, int, int]] = deque(maxlen=DEFAULT_TRACE_BUFFER_SIZE)
+        self._thread_names: Dict[int, str] = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def configure(self, enabled: bool, buffer_size: int = DEFAULT_TRACE_BUFFER_SIZE):
+        self._events = deque(maxlen=buffer_size)
+        self._thread_names = {}
+        self._origin_ns = time.perf_counter_ns()
+        self._enabled = enabled
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def begin(self) -> int:
+        """Istante di inizio da passare ad end(); 0 se il tracer e' disabilitato."""
+        return time.perf_counter_ns() if self._enabled else 0
+
+    def end(self, name: str, start_ns: int, frame_index: int = -1, camera_index: int = 0):
+        if start_ns == 0 or not self._enabled:
+            return
+        end_ns = time.perf_counter_ns()
+        thread_id = threading.get_ident()
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = threading.current_thread().name
+        # deque.append e' atomica, per cui i thread non si contendono alcun lock
+        self._events.append((name, thread_id, start_ns, end_ns - start_ns, frame_index, camera_index))
+
+    def span(self, name: str, frame_index: int = -1, camera_index: int = 0):
+        """Context manager che registra il blocco come evento; non fa nulla se il tracer e' disabilitato."""
+        if not self._enabled:
+            return _NO_SPAN
+        return _TraceSpan(self, name, frame_index, camera_index)
+
+    def clear(self):
+        self._events.clear()
+
+    def chrome_trace(self) -> dict:
+        """Eventi registrati nel formato JSON trace-event, con i tempi in microsecondi dall'avvio del tracer."""
+        pid = os.getpid()
+        events = list(self._events)
+        trace_events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": name}}
+                        for thread_id, name in list(self._thread_names.items())]
+        for name, thread_id, start_ns, duration_ns, frame_index, camera_index in events:
+            trace_events.append({"name": name,
+                                 "cat": "frame",
+                                 "ph": "X",
+                                 "ts": (start_ns - self._origin_ns) / 1_000,
+                                 "dur": duration_ns / 1_000,
+                                 "pid": pid,
+                                 "tid": thread_id,
+                                 "args": {"frame_index": frame_index, "camera": camera_index}})
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def dump(self, file_name: str):
+        with open(file_name, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+
+TRACER = FrameTracer()
@@ -0,0 +1,92 @@
+import math
+from typing import Dict, Iterator, Tuple
+
+# intervallo dei valori distinti dall'istogramma: i valori fuori intervallo finiscono nel primo o nell'ultimo bucket
+HISTOGRAM_MIN_VALUE = 0.01
+HISTOGRAM_MAX_VALUE = 1_000_000.0
+
+# errore relativo massimo dei percentili
+HISTOGRAM_RELATIVE_ERROR = 0.02
+
+
+class LogHistogram:
+    """Istogramma a bucket logaritmici di dimensione fissa, per i percentili di una serie di valori positivi.
+
+    Il bucket di un valore e' il logaritmo in base gamma = (1 + e) / (1 - e), per cui il valore rappresentativo di
+    ogni bucket differisce al massimo di e (HISTOGRAM_RELATIVE_ERROR) dai valori registrati. La memoria non dipende dal
+    numero di valori (al massimo un contatore per bucket, solo per i bucket usati) e due istogrammi si uniscono
+    sommando i bucket.
+    """
+
+    __slots__ = ("_counts", "_count", "_max")
+
+    _gamma = (1 + HISTOGRAM_RELATIVE_ERROR) / (1 - HISTOGRAM_RELATIVE_ERROR)
+    _log_gamma = math.log(_gamma)
+    _size = math.ceil(math.log(HISTOGRAM_MAX_VALUE / HISTOGRAM_MIN_VALUE) / _log_gamma) + 2
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self._count = 0
+        self._max = 0.0
+
+    def record(self, value: float):
+        if value > HISTOGRAM_MIN_VALUE:
+            index = min(int(math.log(value / HISTOGRAM_MIN_VALUE) / self._log_gamma) + 1, self._size - 1)
+        else:
+            index = 0
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self._count += 1
+        if value > self._max:
+            self._max = value
+
+    def merge(self, other: 'LogHistogram'):
+        if other._count == 0:
+            return
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self._count += other._count
+        self._max = max(self._max, other._max)
+
+    def clear(self):
+        self._counts = {}
+        self._count = 0
+        self._max = 0.0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def max(self) -> float:
+        return self._max
+
+    def percentile(self, percentile: float) -> float:
+        """Valore sotto cui cade la percentuale indicata (0-100) dei valori registrati; 0 se non ce ne sono."""
+        if self._count == 0:
+            return 0
+        rank = max(1, math.ceil(self._count * percentile / 100))
+        cumulative = 0
+        for index in sorted(self._counts):
+            cumulative += self._counts[index]
+            if cumulative >= rank:
+                return self._bucket_value(index)
+        return self._max
+
+    def buckets(self) -> Iterator[Tuple[float, int]]:
+        """Valore rappresentativo e conteggio dei bucket usati, in ordine di valore."""
+        for index in sorted(self._counts):
+            yield self._bucket_value(index), self._counts[index]
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return min(HISTOGRAM_MIN_VALUE, self._max)
+        # centro del bucket [min * gamma^(i-1), min * gamma^i]
+        value = HISTOGRAM_MIN_VALUE * self._gamma ** (index - 1) * 2 * self._gamma / (self._gamma + 1)
+        return min(value, self._max)
+
+    def copy(self) -> 'LogHistogram':
+        copied_instance = LogHistogram()
+        copied_instance._counts = self._counts.copy()
+        copied_instance._count = self._count
+        copied_instance._max = self._max
+        return copied_instance
@@ -0,0 +1,130 @@
+import gc
+import logging
+import threading
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fvgvisionai.common.frame_pool import frame_pools_usage
+
+# righe di codice riportate di default per snapshot e differenze
+DEFAULT_TOP_STATISTICS = 20
+
+# livelli di stack registrati da tracemalloc per ogni allocazione
+DEFAULT_TRACEMALLOC_FRAMES = 5
+
+PROC_STATUS_FILE = "/proc/self/status"
+PROC_STATUS_FIELDS = ["VmRSS", "VmHWM", "VmSize"]
+
+# funzione che restituisce (elementi, byte) di una struttura
+SizeFunction = Callable[[], Tuple[int, int]]
+
+
+def _read_process_memory() -> Dict[str, int]:
+    """Memoria del processo in kB letta da /proc (solo Linux)."""
+    result = {}
+    try:
+        with open(PROC_STATUS_FILE) as status_file:
+            for line in status_file:
+                name, _, value = line.partition(":")
+                if name in PROC_STATUS_FIELDS:
+                    result[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return result
+
+
+def _statistics_to_dict(statistics: list, top: int) -> List[dict]:
+    result = []
+    for statistic in statistics[:top]:
+        frame = statistic.traceback[0]
+        item = {"file": frame.filename, "line": frame.lineno, "size": statistic.size, "count": statistic.count}
+        if hasattr(statistic, "size_diff"):
+            item["size_diff"] = statistic.size_diff
+            item["count_diff"] = statistic.count_diff
+        result.append(item)
+    return result
+
+
+class MemoryInspector:
+    """Ispezione della memoria del processo in esecuzione, senza riavvii.
+
+    Riporta i frame numpy per possessore (pool di reader e processor, triple buffer, code ed output registrati), le
+    dimensioni delle strutture che crescono con gli oggetti tracciati e, a richiesta, le allocazioni registrate da
+    tracemalloc con la differenza rispetto ad uno snapshot di riferimento.
+    """
+
+    def __init__(self):
+        self._frame_holders: Dict[str, SizeFunction] = {}
+        self._tracked_structures: Dict[str, SizeFunction] = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    def register_frame_holder(self, name: str, function: SizeFunction):
+        """Registra chi trattiene frame fuori dai pool: la funzione restituisce numero e byte dei frame."""
+        with self._lock:
+            self._frame_holders[name] = function
+
+    def register_tracked_structure(self, name: str, function: SizeFunction):
+        """Registra una struttura che cresce con gli oggetti tracciati: la funzione restituisce elementi e byte."""
+        with self._lock:
+            self._tracked_structures[name] = function
+
+    @staticmethod
+    def _evaluate(functions: Dict[str, SizeFunction]) -> Dict[str, Dict[str, int]]:
+        result = {}
+        for name, function in functions.items():
+            try:
+                count, size = function()
+                result[name] = {"count": count, "bytes": size}
+            except Exception as e:
+                result[name] = {"error": str(e)}
+        return result
+
+    def report(self) -> dict:
+        with self._lock:
+            frame_holders = dict(self._frame_holders)
+            tracked_structures = dict(self._tracked_structures)
+        return {"process_kb": _read_process_memory(),
+                "gc": {"objects": len(gc.get_objects()), "counts": gc.get_count(), "garbage": len(gc.garbage)},
+                "frame_pools": frame_pools_usage(),
+                "frame_holders": self._evaluate(frame_holders),
+                "tracked_structures": self._evaluate(tracked_structures),
+                "tracemalloc": {"tracing": tracemalloc.is_tracing(),
+                                "traced_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0,
+                                "baseline": self._baseline is not None}}
+
+    def start_tracing(self, frames: int = DEFAULT_TRACEMALLOC_FRAMES) -> bool:
+        """Avvia tracemalloc; False se era gia' avviato."""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        self._logger.info(f"tracemalloc started with {frames} frames")
+        return True
+
+    def stop_tracing(self) -> bool:
+        """Ferma tracemalloc e scarta lo snapshot di riferimento; False se non era avviato."""
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self._baseline = None
+        self._logger.info("tracemalloc stopped")
+        return True
+
+    def take_snapshot(self, top: int = DEFAULT_TOP_STATISTICS) -> List[dict]:
+        """Salva lo snapshot di riferimento per diff() e ne restituisce le righe che allocano di piu'."""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot()
+        self._baseline = snapshot
+        return _statistics_to_dict(snapshot.statistics("lineno"), top)
+
+    def diff(self, top: int = DEFAULT_TOP_STATISTICS) -> List[dict]:
+        """Righe di codice con la maggiore crescita di memoria rispetto allo snapshot di riferimento."""
+        if not tracemalloc.is_tracing() or self._baseline is None:
+            return []
+        snapshot = tracemalloc.take_snapshot()
+        return _statistics_to_dict(snapshot.compare_to(self._baseline, "lineno"), top)
+
+
+MEMORY_INSPECTOR = MemoryInspector()
@@ -0,0 +1,212 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# limiti superiori in secondi dei bucket delle durate, da 0.5 ms a 10 s
+SPAN_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+_SPAN_BUCKETS_NS = [round(bucket * 1_000_000_000) for bucket in SPAN_BUCKETS]
+
+EXPOSITION_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Contatori e span si aggiornano senza lock, per restare sotto al microsecondo per misura: ogni combinazione di
+# etichette e' aggiornata di norma da un solo thread (reader, processor od output della camera) e la raccolta legge
+# solo valori gia' scritti. Con piu' thread sulla stessa metrica un aggiornamento concorrente si puo' perdere, il che
+# e' accettabile per la telemetria.
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(label_names, label_values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+               for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    """Contatore monotono di una combinazione di etichette."""
+
+    __slots__ = ("_value",)
+
+    def __init__(self):
+        self._value = 0
+
+    def inc(self, value: int = 1):
+        self._value += value
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def _samples(self, name: str) -> List[Tuple[str, Optional[Tuple[str, str]], float]]:
+        return [(name, None, self._value)]
+
+
+class Gauge:
+    """Valore istantaneo di una combinazione di etichette, impostato o letto da una funzione al momento della
+    raccolta: le profondita' delle code si leggono cosi' senza costi nel percorso dei frame."""
+
+    __slots__ = ("_value", "_function")
+
+    def __init__(self):
+        self._value = 0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return math.nan
+        return self._value
+
+    def _samples(self, name: str) -> List[Tuple[str, Optional[Tuple[str, str]], float]]:
+        return [(name, None, self.value)]
+
+
+class Span:
+    """Durate di un tratto di codice, misurate con l'orologio monotono perf_counter_ns ed esposte come istogramma
+    a bucket fissi (SPAN_BUCKETS). La registrazione e' una ricerca binaria e due somme, per cui si puo' lasciare
+    attiva in produzione."""
+
+    __slots__ = ("_counts", "_sum_ns")
+
+    def __init__(self):
+        self._counts = [0] * (len(_SPAN_BUCKETS_NS) + 1)
+        self._sum_ns = 0
+
+    @staticmethod
+    def start() -> int:
+        return time.perf_counter_ns()
+
+    def stop(self, start_ns: int) -> int:
+        """Registra il tempo trascorso da start_ns e lo restituisce in nanosecondi."""
+        elapsed_ns = time.perf_counter_ns() - start_ns
+        self.observe_ns(elapsed_ns)
+        return elapsed_ns
+
+    def observe_ns(self, elapsed_ns: int, count: int = 1):
+        """Registra count misure della durata indicata."""
+        self._counts[bisect.bisect_left(_SPAN_BUCKETS_NS, elapsed_ns)] += count
+        self._sum_ns += elapsed_ns * count
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def _samples(self, name: str) -> List[Tuple[str, Optional[Tuple[str, str]], float]]:
+        counts = self._counts.copy()
+        sum_ns = self._sum_ns
+        samples = []
+        cumulative = 0
+        for bucket, count in zip(SPAN_BUCKETS + [math.inf], counts):
+            cumulative += count
+            samples.append((f"{name}_bucket", ("le", _format_value(float(bucket))), cumulative))
+        samples.append((f"{name}_sum", None, sum_ns / 1_000_000_000))
+        samples.append((f"{name}_count", None, cumulative))
+        return samples
+
+
+class MetricFamily:
+    """Metrica con nome, descrizione ed etichette; labels() restituisce (creandolo alla prima richiesta) il valore
+    di una combinazione di etichette, da conservare per non ripetere la ricerca ad ogni misura."""
+
+    def __init__(self, name: str, documentation: str, metric_type: str, label_names: List[str],
+                 child_class: type):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self._child_class = child_class
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **label_values):
+        key = tuple(str(label_values[name]) for name in self.label_names)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child_class())
+        return child
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for label_values, child in children:
+            for sample_name, extra_label, value in child._samples(self.name):
+                labels = _format_labels(self.label_names, label_values, extra_label)
+                lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Insieme delle metriche del processo, esposte nel formato testuale di Prometheus."""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, documentation: str, metric_type: str, label_names: List[str],
+                  child_class: type) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = MetricFamily(name, documentation, metric_type, label_names, child_class)
+                self._families[name] = family
+            return family
+
+    def counter(self, name: str, documentation: str, label_names: List[str]) -> MetricFamily:
+        return self._register(name, documentation, "counter", label_names, Counter)
+
+    def gauge(self, name: str, documentation: str, label_names: List[str]) -> MetricFamily:
+        return self._register(name, documentation, "gauge", label_names, Gauge)
+
+    def span(self, name: str, documentation: str, label_names: List[str]) -> MetricFamily:
+        return self._register(name, documentation, "histogram", label_names, Span)
+
+    def exposition(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        lines = []
+        for family in families:
+            lines.extend(family.exposition())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+FRAMES_READ = REGISTRY.counter("fvg_frames_read_total",
+                               "Frames read from the video source and handed to the processor", ["camera"])
+FRAMES_PROCESSED = REGISTRY.counter("fvg_frames_processed_total",
+                                    "Frames taken in charge by the processor", ["camera"])
+FRAMES_DROPPED = REGISTRY.counter("fvg_frames_dropped_total",
+                                  "Frames dropped by the reader or by the busy processor", ["camera", "stage"])
+FRAMES_ENCODED = REGISTRY.counter("fvg_frames_encoded_total",
+                                  "Annotated frames encoded by an output", ["camera", "output"])
+STAGE_DURATION = REGISTRY.span("fvg_stage_duration_seconds",
+                               "Time spent in each stage of the frame pipeline", ["camera", "stage"])
+QUEUE_DEPTH = REGISTRY.gauge("fvg_queue_depth",
+                             "Frames waiting in the processor queues", ["camera", "queue"])
+TRACKED_OBJECTS = REGISTRY.gauge("fvg_tracked_objects",
+                                 "Objects currently followed by the scenario trackers", ["camera", "tracker"])
@@ -0,0 +1,166 @@
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+from fvgvisionai.config.constants import MAX_SAMPLE_RATE_HZ
+
+# campioni al secondo di default
+DEFAULT_SAMPLE_RATE_HZ = 100
+
+# profondita' massima delle stack registrate, dalla funzione in esecuzione verso l'alto
+MAX_STACK_DEPTH = 128
+
+PROFILER_THREAD_NAME = "profiler"
+
+# funzione (nome, file, riga di inizio)
+StackFrame = Tuple[str, str, int]
+
+
+class SamplingProfiler:
+    """Profiler statistico interno al processo: un thread legge periodicamente le stack di tutti gli altri thread
+    da sys._current_frames() e conta quante volte compare ogni stack (collapsed stack).
+
+    Il costo dipende solo dalla frequenza di campionamento e non dal codice profilato, per cui si puo' avviare in
+    produzione senza strumenti esterni. I risultati sono esportati nel formato collapsed-stack (flamegraph.pl,
+    speedscope) o nel formato JSON di speedscope, con un profilo per thread.
+    """
+
+    def __init__(self):
+        self._sample_interval_s = 1.0 / DEFAULT_SAMPLE_RATE_HZ
+        self._stacks: Dict[Tuple[str, Tuple[StackFrame, ...]], int] = {}
+        self._samples = 0
+        self._lock = threading.Lock()
+        # avvio ed arresto possono arrivare insieme da piu' thread del web server; e' distinto da _lock, che il
+        # thread di campionamento prende mentre stop() ne attende la fine
+        self._control_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._exit = threading.Event()
+        self._logger = logging.getLogger(__name__)
+
+    def configure(self, sample_rate_hz: int):
+        self._sample_interval_s = 1.0 / min(max(sample_rate_hz, 1), MAX_SAMPLE_RATE_HZ)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def samples(self) -> int:
+        return self._samples
+
+    def start(self) -> bool:
+        """Avvia il campionamento azzerando i risultati precedenti; False se era gia' avviato."""
+        with self._control_lock:
+            if self._thread is not None:
+                return False
+            with self._lock:
+                self._stacks = {}
+                self._samples = 0
+            self._exit.clear()
+            self._thread = threading.Thread(target=self._run, name=PROFILER_THREAD_NAME, daemon=True)
+            self._thread.start()
+        self._logger.info(f"sampling profiler started every {self._sample_interval_s * 1000:.1f} ms")
+        return True
+
+    def stop(self) -> bool:
+        """Ferma il campionamento mantenendo i risultati; False se non era avviato."""
+        with self._control_lock:
+            if self._thread is None:
+                return False
+            self._exit.set()
+            self._thread.join()
+            self._thread = None
+        self._logger.info(f"sampling profiler stopped after {self._samples} samples")
+        return True
+
+    def _run(self):
+        own_thread_id = threading.get_ident()
+        next_sample = time.monotonic()
+        while not self._exit.is_set():
+            try:
+                self._sample(own_thread_id)
+            except Exception as e:
+                self._logger.error("Unexpected error %s " % e)
+                traceback.print_exc()
+            # il ritmo e' fissato, ma se il campionamento e' in ritardo si salta direttamente al successivo
+            next_sample = max(next_sample + self._sample_interval_s, time.monotonic())
+            self._exit.wait(next_sample - time.monotonic())
+
+    def _sample(self, own_thread_id: int):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            stack: List[StackFrame] = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            stacks.append((thread_names.get(thread_id, str(thread_id)), tuple(stack)))
+
+        with self._lock:
+            for key in stacks:
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self._samples += 1
+
+    def _snapshot(self) -> Dict[Tuple[str, Tuple[StackFrame, ...]], int]:
+        with self._lock:
+            return dict(self._stacks)
+
+    def collapsed(self) -> str:
+        """Una riga per stack, "thread;funzione;...;funzione conteggio", dalla radice alla funzione in esecuzione."""
+        lines = []
+        for (thread_name, stack), count in sorted(self._snapshot().items()):
+            names = [thread_name] + [f"{name} ({file_name}:{line})" for name, file_name, line in stack]
+            lines.append(f"{';'.join(name.replace(';', ':') for name in names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        """Profilo nel formato JSON di speedscope (https://www.speedscope.app), un profilo campionato per thread."""
+        frames: List[dict] = []
+        frame_indexes: Dict[StackFrame, int] = {}
+        profiles: Dict[str, dict] = {}
+
+        for (thread_name, stack), count in sorted(self._snapshot().items()):
+            sample = []
+            for stack_frame in stack:
+                index = frame_indexes.get(stack_frame)
+                if index is None:
+                    index = len(frames)
+                    frame_indexes[stack_frame] = index
+                    name, file_name, line = stack_frame
+                    frames.append({"name": name, "file": file_name, "line": line})
+                sample.append(index)
+
+            profile = profiles.get(thread_name)
+            if profile is None:
+                profile = {"type": "sampled", "name": thread_name, "unit": "seconds", "startValue": 0,
+                           "endValue": 0, "samples": [], "weights": []}
+                profiles[thread_name] = profile
+            weight = count * self._sample_interval_s
+            profile["samples"].append(sample)
+            profile["weights"].append(weight)
+            profile["endValue"] += weight
+
+        return {"$schema": "https://www.speedscope.app/file-format-schema.json",
+                "shared": {"frames": frames},
+                "profiles": list(profiles.values()),
+                "name": "fvgvisionai",
+                "activeProfileIndex": 0,
+                "exporter": "fvgvisionai sampling profiler"}
+
+    def dump(self, file_name_prefix: str):
+        """Salva i risultati nei file <prefisso>.collapsed e <prefisso>.speedscope.json."""
+        with open(f"{file_name_prefix}.collapsed", "w") as collapsed_file:
+            collapsed_file.write(self.collapsed())
+        with open(f"{file_name_prefix}.speedscope.json", "w") as speedscope_file:
+            json.dump(self.speedscope(), speedscope_file)
+
+
+PROFILER = SamplingProfiler()
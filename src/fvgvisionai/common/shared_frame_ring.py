@@ -0,0 +1,49 @@
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """Ring di slot per frame bgr24 in un unico blocco di shared memory, condiviso tra processi.
+
+    Il processo che crea il ring (name=None) ne e' il proprietario e lo rimuove alla chiusura; gli altri processi si
+    collegano con il nome del blocco.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], slots: int, name: Optional[str] = None):
+        self._shape = tuple(shape)
+        self._slots = slots
+        self._owner = name is None
+
+        frame_size = int(np.prod(self._shape))
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=frame_size * slots)
+        if not self._owner:
+            # solo il proprietario deve rimuovere il blocco, altrimenti il resource tracker lo farebbe all'uscita
+            # del processo collegato
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        self._frames: Optional[np.ndarray] = np.ndarray((slots,) + self._shape, dtype=np.uint8,
+                                                        buffer=self._shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def slots(self) -> int:
+        return self._slots
+
+    def frame(self, slot: int) -> np.ndarray:
+        return self._frames[slot]
+
+    def close(self):
+        # le viste numpy devono essere rilasciate prima di chiudere il blocco
+        self._frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,99 @@
+import threading
+from enum import Enum
+from typing import Dict, Tuple
+
+from fvgvisionai.common.log_histogram import LogHistogram
+from fvgvisionai.common.metrics import STAGE_DURATION, Span
+
+# percentili riportati per ogni stadio, oltre al massimo
+LATENCY_PERCENTILES = [50, 95, 99]
+
+
+class LatencyStage(Enum):
+    READ = {"value": 0, "name": "read"}
+    RESIZE = {"value": 1, "name": "resize"}
+    INFERENCE = {"value": 2, "name": "inference"}
+    ANALYTICS = {"value": 3, "name": "analytics"}
+    DRAWING = {"value": 4, "name": "drawing"}
+    SWAP = {"value": 5, "name": "swap"}
+    ENCODE = {"value": 6, "name": "encode"}
+    HLS_WRITE = {"value": 7, "name": "hls_write"}
+
+
+class StageLatency:
+    """Istogrammi dei tempi in ms di ogni stadio, dalla lettura della sorgente alla scrittura dell'output.
+
+    Reader, processor ed output della stessa sorgente registrano sulla stessa istanza da thread diversi; le letture
+    avvengono su una copia. La memoria e' fissa (un LogHistogram per stadio) e due istanze si uniscono sommando gli
+    istogrammi, ad esempio quelle di intervalli diversi o del processo separato del modello.
+
+    Ogni misura viene registrata anche nello span della camera esposto su /metrics, comprese quelle aggiunte con
+    merge(): si possono unire solo misure non gia' registrate in questo processo.
+    """
+
+    def __init__(self, camera_index: int = 0):
+        self._lock = threading.Lock()
+        self._histograms: Dict[LatencyStage, LogHistogram] = {stage: LogHistogram() for stage in LatencyStage}
+        self._init_spans(camera_index)
+
+    def _init_spans(self, camera_index: int):
+        self.camera_index = camera_index
+        self._spans: Dict[LatencyStage, Span] = {
+            stage: STAGE_DURATION.labels(camera=camera_index, stage=stage.value["name"]) for stage in LatencyStage}
+
+    def record(self, stage: LatencyStage, elapsed_time: float):
+        self._spans[stage].observe_ns(round(elapsed_time * 1_000_000))
+        with self._lock:
+            self._histograms[stage].record(elapsed_time)
+
+    def merge(self, other: 'StageLatency'):
+        histograms = other.copy()._histograms
+        # gli stadi eseguiti dal processo del modello sono registrati negli span di quel processo, non esposti
+        for stage, histogram in histograms.items():
+            span = self._spans[stage]
+            for value, count in histogram.buckets():
+                span.observe_ns(round(value * 1_000_000), count)
+        with self._lock:
+            for stage, histogram in histograms.items():
+                self._histograms[stage].merge(histogram)
+
+    def clear(self):
+        with self._lock:
+            for histogram in self._histograms.values():
+                histogram.clear()
+
+    def copy(self) -> 'StageLatency':
+        copied_instance = StageLatency(self.camera_index)
+        with self._lock:
+            copied_instance._histograms = {stage: histogram.copy() for stage, histogram in self._histograms.items()}
+        return copied_instance
+
+    def percentiles(self, stage: LatencyStage) -> Tuple[float, ...]:
+        """Percentili LATENCY_PERCENTILES e massimo dello stadio, 0 se non ci sono misure."""
+        with self._lock:
+            histogram = self._histograms[stage]
+            values = [histogram.percentile(percentile) for percentile in LATENCY_PERCENTILES] + [histogram.max]
+        return tuple(round(value, 2) for value in values)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Percentili e massimo degli stadi misurati, per nome dello stadio."""
+        result = {}
+        for stage in LatencyStage:
+            if self._histograms[stage].count == 0:
+                continue
+            values = self.percentiles(stage)
+            result[stage.value["name"]] = {**{f"p{percentile}": value
+                                              for percentile, value in zip(LATENCY_PERCENTILES, values)},
+                                           "max": values[-1]}
+        return result
+
+    def __getstate__(self):
+        # il lock non si puo' serializzare verso il processo del modello
+        with self._lock:
+            return {"camera_index": self.camera_index,
+                    "histograms": {stage.name: histogram.copy() for stage, histogram in self._histograms.items()}}
+
+    def __setstate__(self, state):
+        self._lock = threading.Lock()
+        self._histograms = {LatencyStage[name]: histogram for name, histogram in state["histograms"].items()}
+        self._init_spans(state["camera_index"])
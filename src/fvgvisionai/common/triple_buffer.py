@@ -1,9 +1,12 @@
 import threading
+from contextlib import contextmanager
 from enum import Enum
 from typing import Optional, List
 
 import numpy as np
 
+from fvgvisionai.common.frame_pool import FrameLease, release_lease
+
 
 class FrameType(Enum):
     FRAME_NEW = 0
@@ -13,6 +16,7 @@ class FrameType(Enum):
 class TripleBuffer:
     def __init__(self):
         self._buffers: List[Optional[np.ndarray]] = [None, None, None]
+        self._leases: List[Optional[FrameLease]] = [None, None, None]
         self._id = [0, 0, 0]
         self._indices = [0, 1, 2]
         self._lock = threading.Lock()
@@ -21,10 +25,35 @@ class TripleBuffer:
         with self._lock:
             return self._get_id(FrameType.FRAME_READY), self._get_frame(FrameType.FRAME_READY)
 
-    def set_new_frame(self, frame_id: int, frame: np.ndarray):
+    @contextmanager
+    def ready_frame(self):
+        """Come get_ready_frame, ma il frame resta valido (non torna nel pool) fino all'uscita dal blocco with."""
+        with self._lock:
+            frame_id = self._get_id(FrameType.FRAME_READY)
+            frame = self._get_frame(FrameType.FRAME_READY)
+            lease = self._leases[self._indices[FrameType.FRAME_READY.value]]
+            if lease is not None:
+                lease.retain()
+        try:
+            yield frame_id, frame
+        finally:
+            release_lease(lease)
+
+    def set_new_frame(self, frame_id: int, frame: np.ndarray, frame_lease: Optional[FrameLease] = None):
+        """Il triple buffer diventa possessore di frame_lease, che verra' rilasciato quando il frame e' sostituito."""
+        with self._lock:
+            index = self._indices[FrameType.FRAME_NEW.value]
+            old_lease = self._leases[index]
+            self._id[index] = frame_id
+            self._buffers[index] = frame
+            self._leases[index] = frame_lease
+        release_lease(old_lease)
+
+    def held_frames(self) -> (int, int):
+        """Frame referenziati dal triple buffer e loro dimensione in byte."""
         with self._lock:
-            self._id[self._indices[FrameType.FRAME_NEW.value]] = frame_id
-            self._buffers[self._indices[FrameType.FRAME_NEW.value]] = frame
+            frames = [frame for frame in self._buffers if frame is not None]
+        return len(frames), sum(frame.nbytes for frame in frames)
 
     def swap_buffers(self):
         with self._lock:
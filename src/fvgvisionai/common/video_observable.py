@@ -3,6 +3,8 @@ from typing import List, Optional
 
 from numpy import ndarray
 
+from fvgvisionai.common.frame_pool import FrameLease
+
 
 class VideoObserver(ABC):
 
@@ -11,7 +13,8 @@ class VideoObserver(ABC):
         pass
 
     @abstractmethod
-    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int):
+    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int,
+                            model_frame: Optional[ndarray] = None, frame_lease: Optional[FrameLease] = None):
         pass
 
 
@@ -27,9 +30,12 @@ class VideoObservable:
         for observer in self._video_observers:
             observer.setup_video_parameters(video_width, video_height, video_fps)
 
-    def notify_video_frame(self, frame_index: int, video_frame: ndarray, elapsed_time: int):
+    def notify_video_frame(self, frame_index: int, video_frame: ndarray, elapsed_time: int,
+                           model_frame: Optional[ndarray] = None, frame_lease: Optional[FrameLease] = None):
+        # model_frame: frame gia' alla risoluzione del modello, se prodotto direttamente dal decoder
+        # frame_lease: lease del buffer del pool, chi usa il frame dopo la notifica deve eseguire retain()
         for observer in self._video_observers:
-            observer.receive_video_frame(frame_index, video_frame, elapsed_time)
+            observer.receive_video_frame(frame_index, video_frame, elapsed_time, model_frame, frame_lease)
 
     def remove_video_observer(self, observer: VideoObserver):
         self._video_observers.remove(observer)
@@ -9,7 +9,8 @@ from fvgvisionai.config.app_settings_utils import from_props, \
     to_door_poly, to_model_size, to_zone_poly, ModelSize, ImageType, to_model_library, \
     ModelLibrary, to_model_precision, \
     ModelPrecision, to_model_resolution, ModelResolution, to_binary_array, to_model_categories, to_video_source_mode, \
-    VideoSourceMode, to_parking_list, to_str, to_model_filename, ModelId, to_model_id
+    VideoSourceMode, to_parking_list, to_str, to_model_filename, ModelId, to_model_id, to_video_source_list, \
+    to_tiles_grid
 from fvgvisionai.config.colored_formatter import ColoredFormatter
 from fvgvisionai.config.constants import NOTIFICATION_AZURE_CONNECTION_STRING, \
     LOGGING_LEVEL, SECTION_SETTINGS, VIDEO_SOURCE, \
@@ -31,7 +32,16 @@ from fvgvisionai.config.constants import NOTIFICATION_AZURE_CONNECTION_STRING, \
     SCENARIO_IN_ZONE_DANGER_LIMIT, ALERT_IN_ZONE_ICON, SECTION_ALERT, VIDEO_SOURCE_IMAGE, VIDEO_SOURCE_MODE, \
     SCENARIO_PARKING, SCENARIO_PARKING_COORDS, SCENARIO_PARKING_COLD_DOWN_TIME_S, SCENARIO_PARKING_TIME_LIMIT_S, \
     SCENARIO_PARKING_CATEGORIES, SCENARIO_PARKING_DANGER_LIMIT, SCENARIO_DOOR_ENTERING_ENABLED, \
-    SCENARIO_DOOR_LEAVING_ENABLED, SCENARIO_DOOR_LEAVING_LABEL, SCENARIO_DOOR_ENTERING_LABEL, MODEL_FILENAME
+    SCENARIO_DOOR_LEAVING_ENABLED, SCENARIO_DOOR_LEAVING_LABEL, SCENARIO_DOOR_ENTERING_LABEL, MODEL_FILENAME, \
+    VIDEO_SOURCE_LIST, MODEL_BATCH_WAIT_MS, VIDEO_SOURCE_GRABBER_ENABLED, VIDEO_SOURCE_GRABBER_BUFFER_SIZE, \
+    VIDEO_SOURCE_SCHEDULED_DECODING_ENABLED, VIDEO_SOURCE_DECODER_MODEL_FRAME_ENABLED, MODEL_PROCESS_ISOLATION_ENABLED, \
+    MODEL_ONNX_INTRA_OP_THREADS, MODEL_ONNX_INTER_OP_THREADS, MODEL_MOTION_TRACKER_ENABLED, \
+    MODEL_MOTION_SCHEDULER_ENABLED, MODEL_MOTION_THRESHOLD, MODEL_MOTION_IDLE_INTERVAL, MODEL_MOTION_CROP_ENABLED, \
+    MODEL_LATENCY_CONTROLLER_ENABLED, MODEL_LATENCY_TARGET, MODEL_ROI_CROP_ENABLED, MODEL_ROI_CROP_MARGIN, \
+    MODEL_TILES_ENABLED, MODEL_TILES_GRID, MODEL_TILES_OVERLAP, MODEL_TILES_INTERVAL, MODEL_MICRO_BATCH_SIZE, \
+    MODEL_MICRO_BATCH_WAIT_MS, MODEL_PIPELINE_ENABLED, DISPLAY_LATENCY_ENABLED, SECTION_DIAGNOSTICS, TRACE_ENABLED, \
+    TRACE_BUFFER_SIZE, TRACE_FILE_NAME, PROFILER_ENABLED, PROFILER_SAMPLE_RATE_HZ, PROFILER_FILE_NAME, \
+    MEMORY_INSPECTION_ENABLED, MEMORY_TRACEMALLOC_FRAMES, MAX_SAMPLE_RATE_HZ
 from fvgvisionai.config.file_property_loader import load_properties_from_file
 from fvgvisionai.processor.categories import ModelCategory
 
@@ -58,8 +68,18 @@ class AppSettings:
             # section SECTION_VIDEO_SOURCE
             self._video_source = from_props(properties, config, VIDEO_SOURCE, SECTION_VIDEO_SOURCE)
             self._video_source_image = from_props(properties, config, VIDEO_SOURCE_IMAGE, SECTION_VIDEO_SOURCE)
+            self._video_source_list = to_video_source_list(
+                from_props(properties, config, VIDEO_SOURCE_LIST, SECTION_VIDEO_SOURCE))
             self._video_source_mode = to_video_source_mode(
                 from_props(properties, config, VIDEO_SOURCE_MODE, SECTION_VIDEO_SOURCE))
+            self._video_source_grabber_enabled = to_bool(
+                from_props(properties, config, VIDEO_SOURCE_GRABBER_ENABLED, SECTION_VIDEO_SOURCE))
+            self._video_source_grabber_buffer_size = int(
+                from_props(properties, config, VIDEO_SOURCE_GRABBER_BUFFER_SIZE, SECTION_VIDEO_SOURCE))
+            self._video_source_scheduled_decoding_enabled = to_bool(
+                from_props(properties, config, VIDEO_SOURCE_SCHEDULED_DECODING_ENABLED, SECTION_VIDEO_SOURCE))
+            self._video_source_decoder_model_frame_enabled = to_bool(
+                from_props(properties, config, VIDEO_SOURCE_DECODER_MODEL_FRAME_ENABLED, SECTION_VIDEO_SOURCE))
             self._video_source_forced_fps_enabled = to_bool(from_props(properties, config,
                                                                        VIDEO_SOURCE_FORCED_FPS_ENABLED,
                                                                        SECTION_VIDEO_SOURCE))
@@ -88,6 +108,35 @@ class AppSettings:
             self._model_tracking_enabled = to_bool(from_props(properties, config, MODEL_DO_TRACKING, SECTION_MODEL))
             self._model_categories = to_model_categories(
                 from_props(properties, config, MODEL_CATEGORIES, SECTION_MODEL))
+            self._model_batch_wait_ms = int(from_props(properties, config, MODEL_BATCH_WAIT_MS, SECTION_MODEL))
+            self._model_process_isolation_enabled = to_bool(
+                from_props(properties, config, MODEL_PROCESS_ISOLATION_ENABLED, SECTION_MODEL))
+            self._model_onnx_intra_op_threads = int(
+                from_props(properties, config, MODEL_ONNX_INTRA_OP_THREADS, SECTION_MODEL))
+            self._model_onnx_inter_op_threads = int(
+                from_props(properties, config, MODEL_ONNX_INTER_OP_THREADS, SECTION_MODEL))
+            self._model_motion_tracker_enabled = to_bool(
+                from_props(properties, config, MODEL_MOTION_TRACKER_ENABLED, SECTION_MODEL))
+            self._model_motion_scheduler_enabled = to_bool(
+                from_props(properties, config, MODEL_MOTION_SCHEDULER_ENABLED, SECTION_MODEL))
+            self._model_motion_threshold = float(from_props(properties, config, MODEL_MOTION_THRESHOLD, SECTION_MODEL))
+            self._model_motion_idle_interval = int(
+                from_props(properties, config, MODEL_MOTION_IDLE_INTERVAL, SECTION_MODEL))
+            self._model_motion_crop_enabled = to_bool(
+                from_props(properties, config, MODEL_MOTION_CROP_ENABLED, SECTION_MODEL))
+            self._model_latency_controller_enabled = to_bool(
+                from_props(properties, config, MODEL_LATENCY_CONTROLLER_ENABLED, SECTION_MODEL))
+            self._model_latency_target = float(from_props(properties, config, MODEL_LATENCY_TARGET, SECTION_MODEL))
+            self._model_roi_crop_enabled = to_bool(from_props(properties, config, MODEL_ROI_CROP_ENABLED, SECTION_MODEL))
+            self._model_roi_crop_margin = int(from_props(properties, config, MODEL_ROI_CROP_MARGIN, SECTION_MODEL))
+            self._model_tiles_enabled = to_bool(from_props(properties, config, MODEL_TILES_ENABLED, SECTION_MODEL))
+            self._model_tiles_grid = to_tiles_grid(from_props(properties, config, MODEL_TILES_GRID, SECTION_MODEL))
+            self._model_tiles_overlap = float(from_props(properties, config, MODEL_TILES_OVERLAP, SECTION_MODEL))
+            self._model_tiles_interval = int(from_props(properties, config, MODEL_TILES_INTERVAL, SECTION_MODEL))
+            self._model_micro_batch_size = int(from_props(properties, config, MODEL_MICRO_BATCH_SIZE, SECTION_MODEL))
+            self._model_micro_batch_wait_ms = int(
+                from_props(properties, config, MODEL_MICRO_BATCH_WAIT_MS, SECTION_MODEL))
+            self._model_pipeline_enabled = to_bool(from_props(properties, config, MODEL_PIPELINE_ENABLED, SECTION_MODEL))
 
             # section SECTION_SPACE_ANALYSIS
             # scenario door
@@ -185,6 +234,7 @@ class AppSettings:
 
             self._show_video_info = to_bool(from_props(properties, config, DISPLAY_VIDEO_INFO_ENABLED, SECTION_DISPLAY))
             self._show_alert_icon = to_bool(from_props(properties, config, DISPLAY_ALERT_ICON_ENABLED, SECTION_DISPLAY))
+            self._show_latency = to_bool(from_props(properties, config, DISPLAY_LATENCY_ENABLED, SECTION_DISPLAY))
 
             # section BENCHMARK
             self._benchmark_duration_time_ms = int(
@@ -195,6 +245,19 @@ class AppSettings:
                 from_props(properties, config, BENCHMARK_DATA_AGGREGATION_TIME_MS, SECTION_BENCHMARK))
             self._benchmark_warmup_time_ms = int(
                 from_props(properties, config, BENCHMARK_WARMUP_TIMS_MS, SECTION_BENCHMARK))
+
+            # section DIAGNOSTICS
+            self._trace_enabled = to_bool(from_props(properties, config, TRACE_ENABLED, SECTION_DIAGNOSTICS))
+            self._trace_buffer_size = int(from_props(properties, config, TRACE_BUFFER_SIZE, SECTION_DIAGNOSTICS))
+            self._trace_file_name = from_props(properties, config, TRACE_FILE_NAME, SECTION_DIAGNOSTICS)
+            self._profiler_enabled = to_bool(from_props(properties, config, PROFILER_ENABLED, SECTION_DIAGNOSTICS))
+            self._profiler_sample_rate_hz = int(
+                from_props(properties, config, PROFILER_SAMPLE_RATE_HZ, SECTION_DIAGNOSTICS))
+            self._profiler_file_name = from_props(properties, config, PROFILER_FILE_NAME, SECTION_DIAGNOSTICS)
+            self._memory_inspection_enabled = to_bool(
+                from_props(properties, config, MEMORY_INSPECTION_ENABLED, SECTION_DIAGNOSTICS))
+            self._memory_tracemalloc_frames = int(
+                from_props(properties, config, MEMORY_TRACEMALLOC_FRAMES, SECTION_DIAGNOSTICS))
         else:
             # section SECTION_SETTINGS
             log_level = from_env(config, LOGGING_LEVEL, SECTION_SETTINGS, cli_args)
@@ -202,8 +265,18 @@ class AppSettings:
             # section SECTION_VIDEO_SOURCE
             self._video_source = from_env(config, VIDEO_SOURCE, SECTION_VIDEO_SOURCE, cli_args)
             self._video_source_image = from_env(config, VIDEO_SOURCE_IMAGE, SECTION_VIDEO_SOURCE, cli_args)
+            self._video_source_list = to_video_source_list(
+                from_env(config, VIDEO_SOURCE_LIST, SECTION_VIDEO_SOURCE, cli_args))
             self._video_source_mode = to_video_source_mode(
                 from_env(config, VIDEO_SOURCE_MODE, SECTION_VIDEO_SOURCE, cli_args))
+            self._video_source_grabber_enabled = to_bool(
+                from_env(config, VIDEO_SOURCE_GRABBER_ENABLED, SECTION_VIDEO_SOURCE, cli_args))
+            self._video_source_grabber_buffer_size = int(
+                from_env(config, VIDEO_SOURCE_GRABBER_BUFFER_SIZE, SECTION_VIDEO_SOURCE, cli_args))
+            self._video_source_scheduled_decoding_enabled = to_bool(
+                from_env(config, VIDEO_SOURCE_SCHEDULED_DECODING_ENABLED, SECTION_VIDEO_SOURCE, cli_args))
+            self._video_source_decoder_model_frame_enabled = to_bool(
+                from_env(config, VIDEO_SOURCE_DECODER_MODEL_FRAME_ENABLED, SECTION_VIDEO_SOURCE, cli_args))
             self._video_source_forced_fps_enabled = to_bool(
                 from_env(config, VIDEO_SOURCE_FORCED_FPS_ENABLED, SECTION_VIDEO_SOURCE, cli_args))
             self._video_source_forced_fps = int(
@@ -229,6 +302,34 @@ class AppSettings:
             self._model_precision = to_model_precision(from_env(config, MODEL_PRECISION, SECTION_MODEL, cli_args))
             self._model_tracking_enabled = to_bool(from_env(config, MODEL_DO_TRACKING, SECTION_MODEL, cli_args))
             self._model_categories = to_model_categories(from_env(config, MODEL_CATEGORIES, SECTION_MODEL, cli_args))
+            self._model_batch_wait_ms = int(from_env(config, MODEL_BATCH_WAIT_MS, SECTION_MODEL, cli_args))
+            self._model_process_isolation_enabled = to_bool(
+                from_env(config, MODEL_PROCESS_ISOLATION_ENABLED, SECTION_MODEL, cli_args))
+            self._model_onnx_intra_op_threads = int(
+                from_env(config, MODEL_ONNX_INTRA_OP_THREADS, SECTION_MODEL, cli_args))
+            self._model_onnx_inter_op_threads = int(
+                from_env(config, MODEL_ONNX_INTER_OP_THREADS, SECTION_MODEL, cli_args))
+            self._model_motion_tracker_enabled = to_bool(
+                from_env(config, MODEL_MOTION_TRACKER_ENABLED, SECTION_MODEL, cli_args))
+            self._model_motion_scheduler_enabled = to_bool(
+                from_env(config, MODEL_MOTION_SCHEDULER_ENABLED, SECTION_MODEL, cli_args))
+            self._model_motion_threshold = float(from_env(config, MODEL_MOTION_THRESHOLD, SECTION_MODEL, cli_args))
+            self._model_motion_idle_interval = int(
+                from_env(config, MODEL_MOTION_IDLE_INTERVAL, SECTION_MODEL, cli_args))
+            self._model_motion_crop_enabled = to_bool(
+                from_env(config, MODEL_MOTION_CROP_ENABLED, SECTION_MODEL, cli_args))
+            self._model_latency_controller_enabled = to_bool(
+                from_env(config, MODEL_LATENCY_CONTROLLER_ENABLED, SECTION_MODEL, cli_args))
+            self._model_latency_target = float(from_env(config, MODEL_LATENCY_TARGET, SECTION_MODEL, cli_args))
+            self._model_roi_crop_enabled = to_bool(from_env(config, MODEL_ROI_CROP_ENABLED, SECTION_MODEL, cli_args))
+            self._model_roi_crop_margin = int(from_env(config, MODEL_ROI_CROP_MARGIN, SECTION_MODEL, cli_args))
+            self._model_tiles_enabled = to_bool(from_env(config, MODEL_TILES_ENABLED, SECTION_MODEL, cli_args))
+            self._model_tiles_grid = to_tiles_grid(from_env(config, MODEL_TILES_GRID, SECTION_MODEL, cli_args))
+            self._model_tiles_overlap = float(from_env(config, MODEL_TILES_OVERLAP, SECTION_MODEL, cli_args))
+            self._model_tiles_interval = int(from_env(config, MODEL_TILES_INTERVAL, SECTION_MODEL, cli_args))
+            self._model_micro_batch_size = int(from_env(config, MODEL_MICRO_BATCH_SIZE, SECTION_MODEL, cli_args))
+            self._model_micro_batch_wait_ms = int(from_env(config, MODEL_MICRO_BATCH_WAIT_MS, SECTION_MODEL, cli_args))
+            self._model_pipeline_enabled = to_bool(from_env(config, MODEL_PIPELINE_ENABLED, SECTION_MODEL, cli_args))
 
             # section SECTION_SPACE_ANALYSIS
             # scenario zone
@@ -316,6 +417,7 @@ class AppSettings:
             self._show_video_info = to_bool(from_env(config, DISPLAY_VIDEO_INFO_ENABLED, SECTION_DISPLAY, cli_args))
             self._show_alert_icon = to_bool(from_env(config, DISPLAY_ALERT_ICON_ENABLED, SECTION_DISPLAY, cli_args))
             self._show_time = to_bool(from_env(config, DISPLAY_TIME, SECTION_DISPLAY, cli_args))
+            self._show_latency = to_bool(from_env(config, DISPLAY_LATENCY_ENABLED, SECTION_DISPLAY, cli_args))
 
             # section BENCHMARK
             self._benchmark_duration_time_ms = int(
@@ -327,16 +429,41 @@ class AppSettings:
             self._benchmark_warmup_time_ms = int(
                 from_env(config, BENCHMARK_WARMUP_TIMS_MS, SECTION_BENCHMARK, cli_args))
 
+            # section DIAGNOSTICS
+            self._trace_enabled = to_bool(from_env(config, TRACE_ENABLED, SECTION_DIAGNOSTICS, cli_args))
+            self._trace_buffer_size = int(from_env(config, TRACE_BUFFER_SIZE, SECTION_DIAGNOSTICS, cli_args))
+            self._trace_file_name = from_env(config, TRACE_FILE_NAME, SECTION_DIAGNOSTICS, cli_args)
+            self._profiler_enabled = to_bool(from_env(config, PROFILER_ENABLED, SECTION_DIAGNOSTICS, cli_args))
+            self._profiler_sample_rate_hz = int(
+                from_env(config, PROFILER_SAMPLE_RATE_HZ, SECTION_DIAGNOSTICS, cli_args))
+            self._profiler_file_name = from_env(config, PROFILER_FILE_NAME, SECTION_DIAGNOSTICS, cli_args)
+            self._memory_inspection_enabled = to_bool(
+                from_env(config, MEMORY_INSPECTION_ENABLED, SECTION_DIAGNOSTICS, cli_args))
+            self._memory_tracemalloc_frames = int(
+                from_env(config, MEMORY_TRACEMALLOC_FRAMES, SECTION_DIAGNOSTICS, cli_args))
+
+        self._logging_level = log_level
         ch.setLevel(logging.getLevelName(log_level))
         ch.setFormatter(ColoredFormatter())
         logger.addHandler(ch)
 
         self._logger = logging.getLogger(__name__)
 
+        # Con onnxruntime il modello e' eseguito su CPU
+        if self._model_use_tensort and self._model_library == ModelLibrary.ONNXRUNTIME:
+            self._model_use_tensort = False
+            self._logger.warning("MODEL_USE_TENSORT is ignored with MODEL_LIBRARY=onnxruntime")
+
         if self._model_use_tensort and not is_tensorrt_installed():
             self._model_use_tensort = False
             self._logger.warning("Tensorrt is not present in the system")
 
+        # Lo scheduler basato sul movimento sostituisce la maschera dei frame da saltare
+        if self._model_motion_scheduler_enabled and self._model_skip_frames_enabled:
+            self._logger.warning(
+                "MODEL_MOTION_SCHEDULER_ENABLED replaces MODEL_SKIP_FRAMES_MASK, the mask is ignored!")
+            self._model_skip_frames_enabled = False
+
         # Se non esiste maschera, ne creiamo una che fa lavorare sempre il modello
         if not self._model_skip_frames_enabled:
             self._model_skip_frames_mask = [True]
@@ -358,6 +485,67 @@ class AppSettings:
                 "In benchmark mode, the notification is disabled!")
             self._enabled_notification = False
 
+        # In modalita' multi camera il modello e' condiviso: solo ultralytics supporta l'inferenza batch
+        if self.multi_camera_enabled and self._model_library != ModelLibrary.ULTRALYTICS:
+            self._logger.warning(
+                f"VIDEO_SOURCE_LIST requires MODEL_LIBRARY=ultralytics, only {self._video_source_list[0]} is used!")
+            self._video_source = self._video_source_list[0]
+            self._video_source_list = []
+
+        # Il processo separato per il modello e' previsto solo per ultralytics con una sola camera
+        if self._model_process_isolation_enabled and (
+                self.multi_camera_enabled or self._model_library != ModelLibrary.ULTRALYTICS):
+            self._logger.warning(
+                "MODEL_PROCESS_ISOLATION_ENABLED requires MODEL_LIBRARY=ultralytics and a single video source, "
+                "the model runs in the main process!")
+            self._model_process_isolation_enabled = False
+
+        # Il ritaglio sulle zone ha senso solo se tutti gli scenari abilitati usano solo le detection nelle zone
+        if self._model_roi_crop_enabled and (self._scenario_pose_enabled or not (
+                self._scenario_zone_enabled or self._scenario_door_enabled or self._scenario_parking_enabled)):
+            self._logger.warning(
+                "MODEL_ROI_CROP_ENABLED requires SCENARIO_IN_ZONE, SCENARIO_DOOR or SCENARIO_PARKING without "
+                "SCENARIO_POSE, the model analyses the whole frame!")
+            self._model_roi_crop_enabled = False
+
+        # Con il modello condiviso tra piu' camere ogni richiesta e' un solo frame, i tile non sono supportati
+        if self._model_tiles_enabled and self.multi_camera_enabled:
+            self._logger.warning("MODEL_TILES_ENABLED is not supported with VIDEO_SOURCE_LIST, tiles are disabled!")
+            self._model_tiles_enabled = False
+
+        # Il micro-batch anticipa l'inferenza dei frame previsti dalla maschera: non e' compatibile con le scelte fatte
+        # frame per frame (movimento, ritaglio, tile) ne' con il modello in un altro processo o condiviso
+        if self._model_micro_batch_size > 1 and (
+                self._model_motion_scheduler_enabled or self._model_roi_crop_enabled or self._model_tiles_enabled or
+                self._model_process_isolation_enabled or self.multi_camera_enabled):
+            self._logger.warning(
+                "MODEL_MICRO_BATCH_SIZE is not supported with motion scheduler, ROI crop, tiles, process isolation "
+                "or VIDEO_SOURCE_LIST, frames are analysed one at a time!")
+            self._model_micro_batch_size = 1
+
+        # La pipeline esegue gli stadi nel processo corrente, un frame alla volta per stadio. Il motion scheduler
+        # decide l'inferenza del frame N con le detection del frame N-1, che con la pipeline sono ancora in analisi
+        if self._model_pipeline_enabled and (self._model_micro_batch_size > 1 or
+                                             self._model_process_isolation_enabled or
+                                             self._model_motion_scheduler_enabled):
+            self._logger.warning("MODEL_PIPELINE_ENABLED is not supported with MODEL_MICRO_BATCH_SIZE, process "
+                                 "isolation or motion scheduler, pipeline is disabled!")
+            self._model_pipeline_enabled = False
+
+        if self._trace_enabled and self._trace_buffer_size < 1:
+            self._logger.warning("TRACE_BUFFER_SIZE must be greater than 0, tracing is disabled!")
+            self._trace_enabled = False
+
+        # Il costo del profiler e' proporzionale alla frequenza di campionamento
+        if self._profiler_enabled and not 0 < self._profiler_sample_rate_hz <= MAX_SAMPLE_RATE_HZ:
+            self._logger.warning(f"PROFILER_SAMPLE_RATE_HZ must be between 1 and {MAX_SAMPLE_RATE_HZ}, "
+                                 f"profiler is disabled!")
+            self._profiler_enabled = False
+
+        if self._memory_inspection_enabled and self._memory_tracemalloc_frames < 1:
+            self._logger.warning("MEMORY_TRACEMALLOC_FRAMES must be greater than 0, memory inspection is disabled!")
+            self._memory_inspection_enabled = False
+
         self._benchmark_mode = benchmark_mode
 
     def show_properties(self):
@@ -463,6 +651,90 @@ class AppSettings:
     def model_categories(self) -> List[ModelCategory]:
         return self._model_categories
 
+    @property
+    def model_batch_wait_ms(self) -> int:
+        return self._model_batch_wait_ms
+
+    @property
+    def model_process_isolation_enabled(self) -> bool:
+        return self._model_process_isolation_enabled
+
+    @property
+    def model_onnx_intra_op_threads(self) -> int:
+        return self._model_onnx_intra_op_threads
+
+    @property
+    def model_onnx_inter_op_threads(self) -> int:
+        return self._model_onnx_inter_op_threads
+
+    @property
+    def model_motion_tracker_enabled(self) -> bool:
+        return self._model_motion_tracker_enabled
+
+    @property
+    def model_motion_scheduler_enabled(self) -> bool:
+        return self._model_motion_scheduler_enabled
+
+    @property
+    def model_motion_threshold(self) -> float:
+        return self._model_motion_threshold
+
+    @property
+    def model_motion_idle_interval(self) -> int:
+        return self._model_motion_idle_interval
+
+    @property
+    def model_motion_crop_enabled(self) -> bool:
+        return self._model_motion_crop_enabled
+
+    @property
+    def model_latency_controller_enabled(self) -> bool:
+        return self._model_latency_controller_enabled
+
+    @property
+    def model_latency_target(self) -> float:
+        return self._model_latency_target
+
+    @property
+    def model_roi_crop_enabled(self) -> bool:
+        return self._model_roi_crop_enabled
+
+    @property
+    def model_roi_crop_margin(self) -> int:
+        return self._model_roi_crop_margin
+
+    @property
+    def model_tiles_enabled(self) -> bool:
+        return self._model_tiles_enabled
+
+    @property
+    def model_tiles_grid(self) -> (int, int):
+        return self._model_tiles_grid
+
+    @property
+    def model_tiles_overlap(self) -> float:
+        return self._model_tiles_overlap
+
+    @property
+    def model_tiles_interval(self) -> int:
+        return self._model_tiles_interval
+
+    @property
+    def model_micro_batch_size(self) -> int:
+        return self._model_micro_batch_size
+
+    @property
+    def model_micro_batch_wait_ms(self) -> int:
+        return self._model_micro_batch_wait_ms
+
+    @property
+    def model_pipeline_enabled(self) -> bool:
+        return self._model_pipeline_enabled
+
+    @property
+    def logging_level(self) -> str:
+        return self._logging_level
+
     @property
     def model_size(self) -> ModelSize:
         return self._model_size
@@ -559,10 +831,34 @@ class AppSettings:
     def video_source_image(self) -> str:
         return self._video_source_image
 
+    @property
+    def video_source_list(self) -> List[str]:
+        return self._video_source_list
+
+    @property
+    def multi_camera_enabled(self) -> bool:
+        return len(self._video_source_list) > 0
+
     @property
     def video_source_mode(self) -> VideoSourceMode:
         return self._video_source_mode
 
+    @property
+    def video_source_grabber_enabled(self) -> bool:
+        return self._video_source_grabber_enabled
+
+    @property
+    def video_source_grabber_buffer_size(self) -> int:
+        return self._video_source_grabber_buffer_size
+
+    @property
+    def video_source_scheduled_decoding_enabled(self) -> bool:
+        return self._video_source_scheduled_decoding_enabled
+
+    @property
+    def video_source_decoder_model_frame_enabled(self) -> bool:
+        return self._video_source_decoder_model_frame_enabled
+
     @property
     def video_source_forced_fps_enabled(self) -> bool:
         return self._video_source_forced_fps_enabled
@@ -651,6 +947,10 @@ class AppSettings:
     def show_alert_icon(self) -> bool:
         return self._show_alert_icon
 
+    @property
+    def show_latency_enabled(self) -> bool:
+        return self._show_latency
+
     @property
     def benchmark_enabled(self) -> bool:
         return self._benchmark_mode
@@ -671,6 +971,38 @@ class AppSettings:
     def benchmark_warmup_time_ms(self) -> int:
         return self._benchmark_warmup_time_ms
 
+    @property
+    def trace_enabled(self) -> bool:
+        return self._trace_enabled
+
+    @property
+    def trace_buffer_size(self) -> int:
+        return self._trace_buffer_size
+
+    @property
+    def trace_file_name(self) -> str:
+        return self._trace_file_name
+
+    @property
+    def profiler_enabled(self) -> bool:
+        return self._profiler_enabled
+
+    @property
+    def profiler_sample_rate_hz(self) -> int:
+        return self._profiler_sample_rate_hz
+
+    @property
+    def profiler_file_name(self) -> str:
+        return self._profiler_file_name
+
+    @property
+    def memory_inspection_enabled(self) -> bool:
+        return self._memory_inspection_enabled
+
+    @property
+    def memory_tracemalloc_frames(self) -> int:
+        return self._memory_tracemalloc_frames
+
 
 def load_settings_from_file(file_name: str, cli_args: Dict[str, str], config: ConfigParser,
                             benchmark_mode=False) -> AppSettings:
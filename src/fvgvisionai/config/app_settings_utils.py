@@ -20,6 +20,7 @@ class VideoSourceMode(Enum):
 class ModelLibrary(Enum):
     ULTRALYTICS = {"name": "ultralytics"}
     PASSTHROUGH = {"name": "passthrough"}
+    ONNXRUNTIME = {"name": "onnxruntime"}
 
 
 class ModelId(Enum):
@@ -68,6 +69,14 @@ def extract_dimensions(value: str) -> (int, int):
     return int(temp_size[0]), int(temp_size[1])
 
 
+def to_tiles_grid(value: str) -> (int, int):
+    # colonne x righe, es. 3x2
+    columns, rows = (int(x) for x in value.lower().split("x"))
+    if columns < 1 or rows < 1:
+        raise ValueError(f"Griglia dei tile '{value}' non valida.")
+    return columns, rows
+
+
 def to_model_filename(value: str) -> str:
     file_name = value.strip()
 
@@ -77,6 +86,13 @@ def to_model_filename(value: str) -> str:
     return file_name
 
 
+def to_video_source_list(value: str) -> List[str]:
+    if value.strip().lower() == "none" or value.strip() == "":
+        return []
+
+    return [source.strip() for source in value.split('|') if source.strip() != ""]
+
+
 def from_props(properties: Dict[str, any], config: Optional[ConfigParser], key: str, section: str) -> str:
     section = section.lower()
     if key.upper() in properties:
@@ -150,12 +166,11 @@ def to_binary_array(spaced_string: str) -> List[bool]:
 
 def to_zone_poly(zone_coords: str) -> np.array:
     polygon = [[int(y) for y in x.split(',')] for x in zone_coords.split('|')]
+    if len(polygon) < 3:
+        raise ValueError(f"Zone '{zone_coords}' deve avere almeno 3 vertici.")
 
-    # zone to count people in
-    zone_poly = np.array([polygon[0],  # left upper corner
-                          polygon[1],  # right upper corner
-                          polygon[2],  # right lower corner
-                          polygon[3]], np.int32)  # left lower corner
+    # zone to count people in, any number of vertices
+    zone_poly = np.array(polygon, np.int32)
     zone_poly = zone_poly.reshape((-1, 1, 2))
 
     return zone_poly
@@ -176,12 +191,11 @@ def to_parking_list(parking_coords: str) -> List[np.array]:
         coordinates = box_str.strip('[]').split('|')
         # Converti le coordinate in numeri interi
         polygon = [[int(coord) for coord in coord_pair.split(',')] for coord_pair in coordinates]
+        if len(polygon) < 3:
+            raise ValueError(f"Parcheggio '{box_str}' deve avere almeno 3 vertici.")
         # Aggiungi le coordinate decodificate all'array di definizioni
-        # zone to count people in
-        parking_poly = np.array([polygon[0],  # left upper corner
-                                 polygon[1],  # right upper corner
-                                 polygon[2],  # right lower corner
-                                 polygon[3]], np.int32)  # left lower corner
+        # zone to count people in, any number of vertices
+        parking_poly = np.array(polygon, np.int32)
         parking_poly = parking_poly.reshape((-1, 1, 2))
 
         box_definitions.append(parking_poly)
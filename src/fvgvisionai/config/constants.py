@@ -7,6 +7,7 @@ SECTION_NOTIFICATION = "notification"
 SECTION_VIDEO_SOURCE = "video_source"
 SECTION_BENCHMARK = "benchmark"
 SECTION_ALERT = "alert"
+SECTION_DIAGNOSTICS = "diagnostics"
 
 NOTIFICATION_AZURE_CONNECTION_STRING = "NOTIFICATION_AZURE_CONNECTION_STRING"
 
@@ -15,6 +16,11 @@ LOGGING_LEVEL = "LOGGING_LEVEL"
 VIDEO_SOURCE = "VIDEO_SOURCE"
 VIDEO_SOURCE_IMAGE = "VIDEO_SOURCE_IMAGE"
 VIDEO_SOURCE_MODE = "VIDEO_SOURCE_MODE"
+VIDEO_SOURCE_LIST = "VIDEO_SOURCE_LIST"
+VIDEO_SOURCE_GRABBER_ENABLED = "VIDEO_SOURCE_GRABBER_ENABLED"
+VIDEO_SOURCE_GRABBER_BUFFER_SIZE = "VIDEO_SOURCE_GRABBER_BUFFER_SIZE"
+VIDEO_SOURCE_SCHEDULED_DECODING_ENABLED = "VIDEO_SOURCE_SCHEDULED_DECODING_ENABLED"
+VIDEO_SOURCE_DECODER_MODEL_FRAME_ENABLED = "VIDEO_SOURCE_DECODER_MODEL_FRAME_ENABLED"
 VIDEO_SOURCE_FORCED_FPS_ENABLED = "VIDEO_SOURCE_FORCED_FPS_ENABLED"
 VIDEO_SOURCE_FORCED_FPS_VALUE = "VIDEO_SOURCE_FORCED_FPS_VALUE"
 VIDEO_SOURCE_FORCED_RESOLUTION_ENABLED = "VIDEO_SOURCE_FORCED_RESOLUTION_ENABLED"
@@ -33,6 +39,26 @@ MODEL_SIZE = "MODEL_SIZE"
 MODEL_PRECISION = "MODEL_PRECISION"
 MODEL_USE_TENSORT = "MODEL_USE_TENSORT"
 MODEL_CATEGORIES = "MODEL_CATEGORIES"
+MODEL_BATCH_WAIT_MS = "MODEL_BATCH_WAIT_MS"
+MODEL_PROCESS_ISOLATION_ENABLED = "MODEL_PROCESS_ISOLATION_ENABLED"
+MODEL_ONNX_INTRA_OP_THREADS = "MODEL_ONNX_INTRA_OP_THREADS"
+MODEL_ONNX_INTER_OP_THREADS = "MODEL_ONNX_INTER_OP_THREADS"
+MODEL_MOTION_TRACKER_ENABLED = "MODEL_MOTION_TRACKER_ENABLED"
+MODEL_MOTION_SCHEDULER_ENABLED = "MODEL_MOTION_SCHEDULER_ENABLED"
+MODEL_MOTION_THRESHOLD = "MODEL_MOTION_THRESHOLD"
+MODEL_MOTION_IDLE_INTERVAL = "MODEL_MOTION_IDLE_INTERVAL"
+MODEL_MOTION_CROP_ENABLED = "MODEL_MOTION_CROP_ENABLED"
+MODEL_LATENCY_CONTROLLER_ENABLED = "MODEL_LATENCY_CONTROLLER_ENABLED"
+MODEL_LATENCY_TARGET = "MODEL_LATENCY_TARGET"
+MODEL_ROI_CROP_ENABLED = "MODEL_ROI_CROP_ENABLED"
+MODEL_ROI_CROP_MARGIN = "MODEL_ROI_CROP_MARGIN"
+MODEL_TILES_ENABLED = "MODEL_TILES_ENABLED"
+MODEL_TILES_GRID = "MODEL_TILES_GRID"
+MODEL_TILES_OVERLAP = "MODEL_TILES_OVERLAP"
+MODEL_TILES_INTERVAL = "MODEL_TILES_INTERVAL"
+MODEL_MICRO_BATCH_SIZE = "MODEL_MICRO_BATCH_SIZE"
+MODEL_MICRO_BATCH_WAIT_MS = "MODEL_MICRO_BATCH_WAIT_MS"
+MODEL_PIPELINE_ENABLED = "MODEL_PIPELINE_ENABLED"
 
 SCENARIO_IN_ZONE = "SCENARIO_IN_ZONE"
 SCENARIO_IN_ZONE_COORDS = "SCENARIO_IN_ZONE_COORDS"
@@ -67,6 +93,7 @@ DISPLAY_VIDEO_INFO_ENABLED = "DISPLAY_VIDEO_INFO_ENABLED"
 DISPLAY_ALERT_ICON_ENABLED = "DISPLAY_ALERT_ICON_ENABLED"
 DISPLAY_TIME_IN_ZONE_ENABLED = "DISPLAY_TIME_IN_ZONE_ENABLED"
 DISPLAY_TIME = "DISPLAY_TIME"
+DISPLAY_LATENCY_ENABLED = "DISPLAY_LATENCY_ENABLED"
 
 NOTIFICATION_ENABLED = "NOTIFICATION_ENABLED"
 NOTIFICATION_DEVICE_ID = "NOTIFICATION_DEVICE_ID"
@@ -91,3 +118,16 @@ BENCHMARK_DURATION_TIME_MS = "BENCHMARK_DURATION_TIME_MS"
 BENCHMARK_RESULTS_FILE_NAME = "BENCHMARK_RESULTS_FILE_NAME"
 BENCHMARK_DATA_AGGREGATION_TIME_MS = "BENCHMARK_DATA_AGGREGATION_TIME_MS"
 BENCHMARK_WARMUP_TIMS_MS = "BENCHMARK_WARMUP_TIMS_MS"
+
+TRACE_ENABLED = "TRACE_ENABLED"
+TRACE_BUFFER_SIZE = "TRACE_BUFFER_SIZE"
+TRACE_FILE_NAME = "TRACE_FILE_NAME"
+
+PROFILER_ENABLED = "PROFILER_ENABLED"
+PROFILER_SAMPLE_RATE_HZ = "PROFILER_SAMPLE_RATE_HZ"
+PROFILER_FILE_NAME = "PROFILER_FILE_NAME"
+# campioni al secondo massimi del profiler, per limitare il costo del campionamento
+MAX_SAMPLE_RATE_HZ = 1_000
+
+MEMORY_INSPECTION_ENABLED = "MEMORY_INSPECTION_ENABLED"
+MEMORY_TRACEMALLOC_FRAMES = "MEMORY_TRACEMALLOC_FRAMES"
@@ -3,12 +3,15 @@ import threading
 from abc import ABC, abstractmethod
 from typing import Optional
 
+from fvgvisionai.common.metrics import FRAMES_READ
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
 from fvgvisionai.common.video_observable import VideoObservable
 from fvgvisionai.config.app_settings import AppSettings
 
 
 class AbstractVideoSource(ABC):
-    def __init__(self, input_file: str, video_observable: VideoObservable, app_settings: AppSettings):
+    def __init__(self, input_file: str, video_observable: VideoObservable, app_settings: AppSettings,
+                 stage_latency: Optional[StageLatency] = None):
         self._input_file = input_file
         self._frame_index = 0
         self._running = False
@@ -19,6 +22,9 @@ class AbstractVideoSource(ABC):
         self._source_forced_fps = app_settings.video_source_forced_fps
 
         self._exit_signal: Optional[threading.Event] = None
+        self._stage_latency = stage_latency
+        self._camera_index = stage_latency.camera_index if stage_latency is not None else 0
+        self._frames_read_metric = FRAMES_READ.labels(camera=self._camera_index)
 
         self._logger = logging.getLogger(__name__)
 
@@ -38,3 +44,7 @@ class AbstractVideoSource(ABC):
     def stop(self):
         self._running = False
 
+    def _record_latency(self, stage: LatencyStage, elapsed_time: float):
+        if self._stage_latency is not None:
+            self._stage_latency.record(stage, elapsed_time)
+
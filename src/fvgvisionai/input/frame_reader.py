@@ -1,39 +1,113 @@
 import threading
-from typing import Optional
+from typing import Optional, List
 
 from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
+from fvgvisionai.common.stage_latency import StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.common.video_observable import VideoObservable
 from fvgvisionai.config.app_settings import AppSettings
 from fvgvisionai.config.app_settings_utils import ModelLibrary, VideoSourceMode
+from fvgvisionai.input.abstract_video_source import AbstractVideoSource
 from fvgvisionai.input.image_source.static_image_source_reader import StaticImageSourceReader
 from fvgvisionai.input.stream_source.cv2_stream_reader import Cv2StreamReader
+from fvgvisionai.input.stream_source.ffmpeg_stream_reader import FFMpegStreamReader
 from fvgvisionai.notify.notification_client import NotificationClient
+from fvgvisionai.processor.abstract_frame_processor import AbstractFrameProcessor
+from fvgvisionai.processor.batch_inference_engine import BatchInferenceEngine
+from fvgvisionai.processor.isolated_frame_processor import IsolatedFrameProcessor
+from fvgvisionai.processor.onnx_processor import OnnxFrameProcessor
 from fvgvisionai.processor.passthrough_processor import PassthroughProcessor
 from fvgvisionai.processor.ultralytics_processor import UltralyticsFrameProcessor
 
 
+def create_stream_reader(video_source: str, video_observable: VideoObservable, processor: AbstractFrameProcessor,
+                         app_settings: AppSettings) -> AbstractVideoSource:
+    if app_settings.video_source_mode == VideoSourceMode.FFMPEG:
+        return FFMpegStreamReader(video_source, video_observable, app_settings, processor.frame_schedule,
+                                  processor.stage_latency)
+    return Cv2StreamReader(video_source, video_observable, app_settings,
+                           processor.frame_drop_counter, processor.frame_schedule, processor.stage_latency)
+
+
 def run_reader(video_observable: VideoObservable, buffer: TripleBuffer,
                notification_client: Optional[NotificationClient],
                benchmark_monitor: Optional[BenchmarkMonitor],
-               app_settings: AppSettings, exit_event: threading.Event) -> int:
-    if app_settings.model_library == ModelLibrary.ULTRALYTICS:
-        video_observable.add_video_observer(
-            UltralyticsFrameProcessor(buffer, notification_client, benchmark_monitor, app_settings))
+               app_settings: AppSettings, exit_event: threading.Event,
+               stage_latency: Optional[StageLatency] = None) -> int:
+    if app_settings.model_library == ModelLibrary.ULTRALYTICS and app_settings.model_process_isolation_enabled:
+        processor = IsolatedFrameProcessor(buffer, notification_client, benchmark_monitor, app_settings,
+                                           stage_latency=stage_latency)
+    elif app_settings.model_library == ModelLibrary.ULTRALYTICS:
+        processor = UltralyticsFrameProcessor(buffer, notification_client, benchmark_monitor, app_settings,
+                                              stage_latency=stage_latency)
     elif app_settings.model_library == ModelLibrary.PASSTHROUGH:
-        video_observable.add_video_observer(
-            PassthroughProcessor(buffer, notification_client, benchmark_monitor, app_settings))
+        processor = PassthroughProcessor(buffer, notification_client, benchmark_monitor, app_settings,
+                                         stage_latency=stage_latency)
+    elif app_settings.model_library == ModelLibrary.ONNXRUNTIME:
+        processor = OnnxFrameProcessor(buffer, notification_client, benchmark_monitor, app_settings,
+                                       stage_latency=stage_latency)
     else:
         return -1
+    video_observable.add_video_observer(processor)
+
+    try:
+        if app_settings.video_source_mode in (VideoSourceMode.STREAM, VideoSourceMode.FFMPEG):
+            create_stream_reader(app_settings.video_source, video_observable, processor,
+                                 app_settings).read_source(exit_event)
+        #elif app_settings.video_source_mode == VideoSourceMode.CUDA:
+        #    CudaStreamReader(app_settings.video_source, video_observable, app_settings).read_source(exit_event)
+        elif app_settings.video_source_mode == VideoSourceMode.IMAGE:
+            StaticImageSourceReader(app_settings.video_source_image, video_observable,
+                                    app_settings).read_source(exit_event)
+        else:
+            raise ValueError(f"VIDEO_SOURCE_MODE={app_settings.video_source_mode} is not a valid decoder value")
+    finally:
+        processor.close()
+    return 0
+
+
+def run_multi_camera_reader(video_observables: List[VideoObservable], buffers: List[TripleBuffer],
+                            notification_clients: List[Optional[NotificationClient]],
+                            benchmark_monitor: Optional[BenchmarkMonitor],
+                            app_settings: AppSettings, exit_event: threading.Event,
+                            stage_latencies: Optional[List[StageLatency]] = None) -> int:
+    if app_settings.video_source_mode not in (VideoSourceMode.STREAM, VideoSourceMode.FFMPEG):
+        raise ValueError(f"VIDEO_SOURCE_MODE={app_settings.video_source_mode} is not supported with VIDEO_SOURCE_LIST")
+
+    inference_engine = BatchInferenceEngine(app_settings, len(app_settings.video_source_list))
+
+    processors: List[AbstractFrameProcessor] = []
+    readers: List[AbstractVideoSource] = []
+    for camera_index, video_source in enumerate(app_settings.video_source_list):
+        # Il benchmark e' misurato sulla prima camera
+        processor = UltralyticsFrameProcessor(buffers[camera_index], notification_clients[camera_index],
+                                              benchmark_monitor if camera_index == 0 else None,
+                                              app_settings,
+                                              inference_engine=inference_engine,
+                                              camera_index=camera_index,
+                                              stage_latency=stage_latencies[camera_index] if stage_latencies else None)
+        video_observables[camera_index].add_video_observer(processor)
+        processors.append(processor)
+        readers.append(create_stream_reader(video_source, video_observables[camera_index], processor, app_settings))
+
+    inference_engine.start(exit_event)
+
+    try:
+        reader_threads: List[threading.Thread] = []
+        for camera_index, reader in enumerate(readers):
+            reader_thread = threading.Thread(target=reader.read_source,
+                                             args=(exit_event,),
+                                             name=f'InputThread-{camera_index}')
+            reader_thread.daemon = True
+            reader_thread.start()
+            reader_threads.append(reader_thread)
+
+        for reader_thread in reader_threads:
+            reader_thread.join()
+    finally:
+        # l'engine resta attivo finche' i processor non hanno completato le inferenze in corso
+        for processor in processors:
+            processor.close()
+        inference_engine.stop()
 
-    if app_settings.video_source_mode == VideoSourceMode.STREAM:
-        Cv2StreamReader(app_settings.video_source, video_observable, app_settings).read_source(exit_event)
-    #elif app_settings.video_source_mode == VideoSourceMode.FFMPEG:
-    #    FFMpegStreamReader(app_settings.video_source, video_observable, app_settings).read_source(exit_event)
-    #elif app_settings.video_source_mode == VideoSourceMode.CUDA:
-    #    CudaStreamReader(app_settings.video_source, video_observable, app_settings).read_source(exit_event)
-    elif app_settings.video_source_mode == VideoSourceMode.IMAGE:
-        StaticImageSourceReader(app_settings.video_source_image, video_observable, app_settings).read_source(exit_event)
-    else:
-        raise ValueError(f"VIDEO_SOURCE_MODE={app_settings.video_source_mode} is not a valid decoder value")
     return 0
@@ -1,6 +1,8 @@
 import logging
 
 import cv2
+from typing import Optional
+
 from numpy import ndarray
 
 from fvgvisionai.config.app_settings import AppSettings
@@ -53,7 +55,11 @@ class FrameResizer:
             self._logger.info(f"source image size is {self._image_source_width}x{self._image_source_height} ")
             return [self._image_source_width, self._image_source_height]
 
-    def resize_frame(self, frame: ndarray) -> ndarray:
+    @property
+    def is_resize_required(self) -> bool:
+        return self._image_source_force_resize
+
+    def resize_frame(self, frame: ndarray, dst: Optional[ndarray] = None) -> ndarray:
         if self._image_source_force_resize:
-            return cv2.resize(frame, (self._image_source_width, self._image_source_height))
+            return cv2.resize(frame, (self._image_source_width, self._image_source_height), dst=dst)
         return frame
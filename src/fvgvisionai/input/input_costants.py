@@ -3,3 +3,7 @@ DEFAULT_SOURCE_FPS = 12
 NO_CONNECTION_FRAME_INDEX = -1
 
 TIME_TO_WATI_BEFORE_RECONNECT = 5
+
+# buffer preallocati per la lettura dei frame, il pool cresce fino al massimo se tutti sono in uso
+FRAME_BUFFER_POOL_SIZE = 6
+FRAME_BUFFER_POOL_MAX_SIZE = 16
@@ -0,0 +1,110 @@
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Optional
+
+import cv2
+from numpy import ndarray
+
+from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_drop_counter import FrameDropCounter
+from fvgvisionai.common.utils import wait_frame_duration
+
+WAIT_TIME_IN_SEC = 0.5
+
+STOP_TIMEOUT_IN_SEC = 2.0
+
+
+class Cv2FrameGrabber:
+    """Acquisizione disaccoppiata dalla decodifica.
+
+    Un thread dedicato esegue grab() alla velocita' della sorgente e registra ogni frame acquisito in un ring di
+    dimensione limitata (i piu' vecchi vengono scartati). read() decodifica con retrieve() solo l'ultimo frame
+    acquisito: i frame intermedi non vengono mai decodificati e sono conteggiati come scartati.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, buffer_size: int, declared_elapsed_time: int,
+                 frame_drop_counter: Optional[FrameDropCounter] = None):
+        self._cap = cap
+        self._declared_elapsed_time = declared_elapsed_time
+        self._frame_drop_counter = frame_drop_counter
+
+        # grab() e retrieve() non possono essere eseguite contemporaneamente sulla stessa VideoCapture
+        self._cap_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._grabbed_frames = deque(maxlen=max(buffer_size, 1))
+        self._grab_index = 0
+        self._failed = False
+
+        self._stop_signal = threading.Event()
+        self._grabber_thread: Optional[threading.Thread] = None
+
+        self._logger = logging.getLogger(__name__)
+
+    def start(self):
+        self._grabber_thread = threading.Thread(target=self._run, name='GrabberThread')
+        self._grabber_thread.daemon = True
+        self._grabber_thread.start()
+
+    def stop(self):
+        self._stop_signal.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._grabber_thread is not None:
+            self._grabber_thread.join(STOP_TIMEOUT_IN_SEC)
+            self._grabber_thread = None
+
+    def read(self, decode: bool = True, image: Optional[ndarray] = None) -> (bool, Optional[ndarray]):
+        with self._condition:
+            while len(self._grabbed_frames) == 0 and not self._failed and not self._stop_signal.is_set():
+                self._condition.wait(WAIT_TIME_IN_SEC)
+
+        with self._cap_lock:
+            with self._condition:
+                if len(self._grabbed_frames) == 0:
+                    return False, None
+                # vince sempre l'ultimo frame acquisito, gli altri non verranno mai decodificati
+                dropped = len(self._grabbed_frames) - 1
+                self._grabbed_frames.clear()
+            if decode:
+                ret, frame = self._cap.retrieve(image)
+            else:
+                ret, frame = True, None
+
+        if dropped > 0:
+            self._logger.debug(f"grabber dropped {dropped} frames")
+            if self._frame_drop_counter is not None:
+                self._frame_drop_counter.add_reader_dropped(dropped)
+        return ret, frame
+
+    def _run(self):
+        grab_timer = AppTimer()
+        try:
+            while not self._stop_signal.is_set():
+                grab_timer.start()
+                with self._cap_lock:
+                    ret = self._cap.grab()
+                    with self._condition:
+                        if ret:
+                            if len(self._grabbed_frames) == self._grabbed_frames.maxlen:
+                                # il frame piu' vecchio esce dal ring senza essere mai stato letto
+                                if self._frame_drop_counter is not None:
+                                    self._frame_drop_counter.add_reader_dropped()
+                            self._grab_index = (self._grab_index + 1) % 1_000_000_000
+                            self._grabbed_frames.append(self._grab_index)
+                        else:
+                            self._failed = True
+                        self._condition.notify_all()
+
+                if not ret:
+                    break
+
+                # le sorgenti su file non hanno un loro ritmo, per cui si rispetta quello dichiarato
+                wait_frame_duration(self._declared_elapsed_time, round(grab_timer.stop()))
+        except Exception as e:
+            self._logger.error("Unexpected error %s " % e)
+            traceback.print_exc()
+            with self._condition:
+                self._failed = True
+                self._condition.notify_all()
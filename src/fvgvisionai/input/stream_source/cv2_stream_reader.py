@@ -6,22 +6,40 @@ import traceback
 from typing import Optional
 
 import cv2
+import numpy as np
+from numpy import ndarray
 
 from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_drop_counter import FrameDropCounter
+from fvgvisionai.common.frame_pool import FramePool, FrameLease, release_lease
+from fvgvisionai.common.frame_schedule import FrameSchedule
+from fvgvisionai.common.frame_tracer import TRACER
 from fvgvisionai.common.loading_image_utils import create_error_no_connection
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
 from fvgvisionai.common.utils import compute_elapsed_time_ms, wait_frame_duration
 from fvgvisionai.common.video_observable import VideoObservable
 from fvgvisionai.config.app_settings import AppSettings
 from fvgvisionai.input.abstract_video_source import AbstractVideoSource
 from fvgvisionai.input.frame_resizer import FrameResizer
-from fvgvisionai.input.input_costants import DEFAULT_SOURCE_FPS, NO_CONNECTION_FRAME_INDEX, TIME_TO_WATI_BEFORE_RECONNECT
+from fvgvisionai.input.input_costants import DEFAULT_SOURCE_FPS, NO_CONNECTION_FRAME_INDEX, \
+    TIME_TO_WATI_BEFORE_RECONNECT, FRAME_BUFFER_POOL_SIZE, FRAME_BUFFER_POOL_MAX_SIZE
+from fvgvisionai.input.stream_source.cv2_frame_grabber import Cv2FrameGrabber
 
 
 class Cv2StreamReader(AbstractVideoSource):
-    def __init__(self, input_file: str, video_observable: VideoObservable, app_settings: AppSettings):
-        super(Cv2StreamReader, self).__init__(input_file, video_observable, app_settings)
+    def __init__(self, input_file: str, video_observable: VideoObservable, app_settings: AppSettings,
+                 frame_drop_counter: Optional[FrameDropCounter] = None,
+                 frame_schedule: Optional[FrameSchedule] = None,
+                 stage_latency: Optional[StageLatency] = None):
+        super(Cv2StreamReader, self).__init__(input_file, video_observable, app_settings, stage_latency)
         self._frame_resizer = FrameResizer(app_settings)
         self._ffmpeg_process: Optional[subprocess] = None
+        self._frame_drop_counter = frame_drop_counter
+        self._frame_schedule = frame_schedule
+        self._grabber: Optional[Cv2FrameGrabber] = None
+        # pool per i frame decodificati e, se richiesto, per quelli ridimensionati
+        self._decode_pool: Optional[FramePool] = None
+        self._resize_pool: Optional[FramePool] = None
         self._logger = logging.getLogger(__name__)
 
     def read_source(self, exit_signal: threading.Event):
@@ -30,6 +48,7 @@ class Cv2StreamReader(AbstractVideoSource):
         cap: Optional[cv2.VideoCapture] = None
         try:
             read_frame_timer = AppTimer()
+            resize_timer = AppTimer()
 
             self._frame_index = 0
             self._exit_signal = exit_signal
@@ -48,16 +67,31 @@ class Cv2StreamReader(AbstractVideoSource):
                 image_width, image_height = self._frame_resizer.init_image_size(image_source_width, image_source_height)
                 no_connection_image = create_error_no_connection(image_width, image_height)
 
+                self._decode_pool = FramePool((image_source_height, image_source_width, 3),
+                                              FRAME_BUFFER_POOL_SIZE, FRAME_BUFFER_POOL_MAX_SIZE,
+                                              owner=f"reader-{self._camera_index}")
+                if self._frame_resizer.is_resize_required:
+                    self._resize_pool = FramePool((image_height, image_width, 3),
+                                                  FRAME_BUFFER_POOL_SIZE, FRAME_BUFFER_POOL_MAX_SIZE,
+                                                  owner=f"reader-{self._camera_index}")
+
                 self._video_observable.notify_video_parameters(image_width, image_height, declared_elapsed_time)
 
+                self._start_grabber(cap, declared_elapsed_time)
+
                 read_frame_timer.start()
                 while self.continue_to_read(self._frame_index):
-                    ret, frame = cap.read()
+                    decode = self._needs_decode((self._frame_index + 1) % 1_000_000_000)
+                    trace_start = TRACER.begin()
+                    ret, frame, frame_lease = self._read_frame(cap, decode)
+                    TRACER.end("read", trace_start, self._frame_index + 1, self._camera_index)
 
                     if not ret:
+                        self._stop_grabber()
                         if not video_recovery_mode:
                             video_recovery_mode = True
                             cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            self._start_grabber(cap, declared_elapsed_time)
                             continue
                         else:
                             attempt = 1
@@ -81,6 +115,7 @@ class Cv2StreamReader(AbstractVideoSource):
                                     self._logger.warning(
                                         "source video_source is again available.")
                                     opened = True
+                                    self._start_grabber(cap, declared_elapsed_time)
 
                             if not opened:
                                 self._logger.error("source video_source is not available, closing program")
@@ -91,15 +126,33 @@ class Cv2StreamReader(AbstractVideoSource):
 
                     self._frame_index = (self._frame_index + 1) % 1_000_000_000
 
-                    frame = self._frame_resizer.resize_frame(frame)
+                    if frame is None:
+                        # frame solo acquisito, non verra' ne' analizzato ne' mandato in output
+                        if self._grabber is None:
+                            wait_frame_duration(declared_elapsed_time, round(read_frame_timer.stop()))
+                        read_frame_timer.start()
+                        continue
+
+                    self._record_latency(LatencyStage.READ, read_frame_timer.elapsed_time)
+                    resize_timer.start()
+                    with TRACER.span("resize", self._frame_index, self._camera_index):
+                        frame, frame_lease = self._resize_frame(frame, frame_lease)
+                    self._record_latency(LatencyStage.RESIZE, resize_timer.stop())
                     time_to_acquire_frame = round(read_frame_timer.stop())
 
                     self._logger.debug(
                         f"read # {self._frame_index} frame time {time_to_acquire_frame:5.2f} declared {declared_elapsed_time:5.2f} ms")
-                    self._video_observable.notify_video_frame(self._frame_index, frame,
-                                                              max(declared_elapsed_time, time_to_acquire_frame))
-
-                    wait_frame_duration(declared_elapsed_time, time_to_acquire_frame)
+                    with TRACER.span("notify", self._frame_index, self._camera_index):
+                        self._video_observable.notify_video_frame(self._frame_index, frame,
+                                                                  max(declared_elapsed_time, time_to_acquire_frame),
+                                                                  frame_lease=frame_lease)
+                    # chi deve usare il frame dopo la notifica ne ha acquisito il lease
+                    release_lease(frame_lease)
+                    self._frames_read_metric.inc()
+
+                    # con il grabber attivo e' il grabber stesso a rispettare il ritmo della sorgente
+                    if self._grabber is None:
+                        wait_frame_duration(declared_elapsed_time, time_to_acquire_frame)
 
                     read_frame_timer.start()
                 self._logger.warning("frame_read thread is shutting down")
@@ -111,9 +164,56 @@ class Cv2StreamReader(AbstractVideoSource):
             traceback.print_exc()
         finally:
             self._running = False
+            self._stop_grabber()
             if cap is not None:
                 cap.release()
 
+    def _start_grabber(self, cap: cv2.VideoCapture, declared_elapsed_time: int):
+        if self._app_settings.video_source_grabber_enabled:
+            self._grabber = Cv2FrameGrabber(cap, self._app_settings.video_source_grabber_buffer_size,
+                                            declared_elapsed_time, self._frame_drop_counter)
+            self._grabber.start()
+
+    def _stop_grabber(self):
+        if self._grabber is not None:
+            self._grabber.stop()
+            self._grabber = None
+
+    def _needs_decode(self, frame_index: int) -> bool:
+        return self._frame_schedule is None or self._frame_schedule.needs_decode(frame_index)
+
+    def _read_frame(self, cap: cv2.VideoCapture, decode: bool) -> (bool, Optional[ndarray], Optional[FrameLease]):
+        if not decode:
+            if self._grabber is not None:
+                ret, _ = self._grabber.read(False)
+                return ret, None, None
+            return cap.grab(), None, None
+
+        frame_lease = self._decode_pool.acquire()
+        if self._grabber is not None:
+            ret, frame = self._grabber.read(True, frame_lease.frame)
+        else:
+            ret, frame = cap.read(frame_lease.frame)
+
+        return ret, frame, self._check_lease(frame, frame_lease)
+
+    def _resize_frame(self, frame: ndarray, frame_lease: Optional[FrameLease]) -> (ndarray, Optional[FrameLease]):
+        if not self._frame_resizer.is_resize_required:
+            return frame, frame_lease
+
+        resized_lease = self._resize_pool.acquire()
+        resized_frame = self._frame_resizer.resize_frame(frame, resized_lease.frame)
+        release_lease(frame_lease)
+        return resized_frame, self._check_lease(resized_frame, resized_lease)
+
+    @staticmethod
+    def _check_lease(frame: Optional[ndarray], frame_lease: FrameLease) -> Optional[FrameLease]:
+        # opencv rialloca il frame se le dimensioni non corrispondono a quelle del buffer del pool
+        if frame is None or not np.may_share_memory(frame, frame_lease.frame):
+            frame_lease.release()
+            return None
+        return frame_lease
+
     def continue_to_read(self, frame_index: int) -> bool:
         if self._exit_signal is not None and self._exit_signal.is_set():
             return False
@@ -1,77 +1,112 @@
+import json
 import logging
 import subprocess
 import threading
 import time
 import traceback
+from fractions import Fraction
 from typing import Optional
 
-import ffmpegcv
+from numpy import ndarray
+
+from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_pool import FramePool, FrameLease, release_lease
+from fvgvisionai.common.frame_schedule import FrameSchedule
+from fvgvisionai.common.frame_tracer import TRACER
+from fvgvisionai.common.loading_image_utils import create_error_no_connection
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
+from fvgvisionai.common.utils import compute_elapsed_time_ms, wait_frame_duration
+from fvgvisionai.common.video_observable import VideoObservable
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.input.abstract_video_source import AbstractVideoSource
+from fvgvisionai.input.frame_resizer import FrameResizer
+from fvgvisionai.input.input_costants import DEFAULT_SOURCE_FPS, NO_CONNECTION_FRAME_INDEX, \
+    TIME_TO_WATI_BEFORE_RECONNECT, FRAME_BUFFER_POOL_SIZE, FRAME_BUFFER_POOL_MAX_SIZE
+
+# canali per pixel del formato bgr24
+FRAME_CHANNELS = 3
+
+FFMPEG_STOP_TIMEOUT_IN_SEC = 2.0
 
-from common.app_timer import AppTimer
-from common.loading_image_utils import create_error_no_connection
-from common.utils import compute_elapsed_time_ms, wait_frame_duration
-from common.video_observable import VideoObservable
-from config.app_settings import AppSettings
-from input.abstract_video_source import AbstractVideoSource
-from input.frame_resizer import FrameResizer
-from input.input_costants import NO_CONNECTION_FRAME_INDEX, TIME_TO_WATI_BEFORE_RECONNECT
 
 class FFMpegStreamReader(AbstractVideoSource):
-    def __init__(self, input_file: str, video_observable: VideoObservable, app_settings: AppSettings):
-        super(FFMpegStreamReader, self).__init__(input_file, video_observable, app_settings)
+    """Lettura della sorgente tramite un processo ffmpeg che emette frame rawvideo bgr24 su pipe.
+
+    Ogni frame viene letto con readinto() direttamente in un buffer del FramePool, senza allocare bytes per frame.
+    Il ridimensionamento alla risoluzione di output (ed eventualmente a quella del modello) e' fatto da ffmpeg: i due
+    frame vengono impilati verticalmente nello stesso buffer, cosi' da usare una sola pipe.
+    """
+
+    def __init__(self, input_file: str, video_observable: VideoObservable, app_settings: AppSettings,
+                 frame_schedule: Optional[FrameSchedule] = None,
+                 stage_latency: Optional[StageLatency] = None):
+        super(FFMpegStreamReader, self).__init__(input_file, video_observable, app_settings, stage_latency)
         self._frame_resizer = FrameResizer(app_settings)
-        self._ffmpeg_process: Optional[subprocess] = None
+        self._ffmpeg_process: Optional[subprocess.Popen] = None
+        self._frame_schedule = frame_schedule
+        self._frame_pool: Optional[FramePool] = None
+
+        self._source_width = 0
+        self._source_height = 0
+        self._output_width = 0
+        self._output_height = 0
+        self._model_frame_enabled = False
+        self._model_width = app_settings.model_width
+        self._model_height = app_settings.model_height
         self._logger = logging.getLogger(__name__)
 
     def read_source(self, exit_signal: threading.Event):
         self._running = True
 
-        cap: Optional[ffmpegcv.VideoCapture] = None
         try:
             read_frame_timer = AppTimer()
 
             self._frame_index = 0
             self._exit_signal = exit_signal
 
-            # more pythonic, recommand
-            cap = ffmpegcv.VideoCaptureNV(self._input_file)
-
-            # self.print_video_info(cap)
-
-            video_recovery_mode = True
+            video_info = self.probe_video_info()
 
-            if cap.isOpened():
+            if video_info is not None:
                 self._logger.info(f"video_source source {self._input_file} is opened")
-
-                image_source_width, image_source_height, image_source_fps = (
-                    800, 600, 30)  # self.extract_video_info(cap)
+                image_source_width, image_source_height, image_source_fps, codec = video_info
+                self._logger.info(f"codec {codec} is used")
 
                 declared_elapsed_time = compute_elapsed_time_ms(image_source_fps)
                 image_width, image_height = self._frame_resizer.init_image_size(image_source_width, image_source_height)
                 no_connection_image = create_error_no_connection(image_width, image_height)
 
+                self._setup_decoder_sizes(image_source_width, image_source_height, image_width, image_height)
+                buffer_height = self._output_height + (self._model_height if self._model_frame_enabled else 0)
+                self._frame_pool = FramePool((buffer_height, self._output_width, FRAME_CHANNELS),
+                                             FRAME_BUFFER_POOL_SIZE, FRAME_BUFFER_POOL_MAX_SIZE,
+                                             owner=f"reader-{self._camera_index}")
+
                 self._video_observable.notify_video_parameters(image_width, image_height, declared_elapsed_time)
 
+                self._open_process()
+
+                video_recovery_mode = True
+
                 read_frame_timer.start()
                 while self.continue_to_read(self._frame_index):
-                    ret, frame = cap.read()
+                    trace_start = TRACER.begin()
+                    ret, frame, model_frame, frame_lease = self._read_frame()
+                    TRACER.end("read", trace_start, self._frame_index + 1, self._camera_index)
 
                     if not ret:
+                        self._close_process()
                         if not video_recovery_mode:
+                            # fine del file: si riparte dall'inizio
                             video_recovery_mode = True
-                            # cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                            cap = ffmpegcv.VideoCaptureNV(self._input_file)
-
+                            self._open_process()
                             continue
                         else:
                             attempt = 1
                             opened = False
 
-                            while attempt < 60 and not opened:
+                            while attempt < 60 and not opened and not self._exit_signal.is_set():
                                 self._logger.warning(
                                     f"source video_source is not available. Try to reconnect after in {TIME_TO_WATI_BEFORE_RECONNECT} seconds. Attempt # {attempt}")
-                                if cap is not None:
-                                    cap.release()
                                 time.sleep(TIME_TO_WATI_BEFORE_RECONNECT)
 
                                 self._video_observable.notify_video_frame(NO_CONNECTION_FRAME_INDEX,
@@ -80,28 +115,42 @@ class FFMpegStreamReader(AbstractVideoSource):
                                                                               round(read_frame_timer.elapsed_time)))
 
                                 attempt += 1
-                                cap = ffmpegcv.VideoCaptureNV(self._input_file)
-                                if cap.isOpened():
+                                if self.probe_video_info() is not None:
                                     self._logger.warning(
                                         "source video_source is again available.")
+                                    self._open_process()
                                     opened = True
 
                             if not opened:
                                 self._logger.error("source video_source is not available, closing program")
                                 self._exit_signal.set()
                                 break
+                            continue
                     else:
                         video_recovery_mode = False
 
                     self._frame_index = (self._frame_index + 1) % 1_000_000_000
 
-                    frame = self._frame_resizer.resize_frame(frame)
+                    if not self._needs_decode(self._frame_index):
+                        # il frame e' comunque letto dalla pipe, ma non verra' ne' analizzato ne' mandato in output
+                        release_lease(frame_lease)
+                        wait_frame_duration(declared_elapsed_time, round(read_frame_timer.stop()))
+                        read_frame_timer.start()
+                        continue
+
+                    # il frame e' gia' alla risoluzione di output, ridimensionato da ffmpeg
                     time_to_acquire_frame = round(read_frame_timer.stop())
+                    self._record_latency(LatencyStage.READ, time_to_acquire_frame)
 
                     self._logger.debug(
                         f"read # {self._frame_index} frame time {time_to_acquire_frame:5.2f} declared {declared_elapsed_time:5.2f} ms")
-                    self._video_observable.notify_video_frame(self._frame_index, frame,
-                                                              max(declared_elapsed_time, time_to_acquire_frame))
+                    with TRACER.span("notify", self._frame_index, self._camera_index):
+                        self._video_observable.notify_video_frame(self._frame_index, frame,
+                                                                  max(declared_elapsed_time, time_to_acquire_frame),
+                                                                  model_frame, frame_lease)
+                    # chi deve usare il frame dopo la notifica ne ha acquisito il lease
+                    release_lease(frame_lease)
+                    self._frames_read_metric.inc()
 
                     wait_frame_duration(declared_elapsed_time, time_to_acquire_frame)
 
@@ -115,14 +164,138 @@ class FFMpegStreamReader(AbstractVideoSource):
             traceback.print_exc()
         finally:
             self._running = False
-            if cap is not None:
-                cap.release()
+            self._close_process()
 
-    def continue_to_read(self, frame_index: int) -> bool:
-        if self._exit_signal is not None and self._exit_signal.is_set():
-            return False
+    def probe_video_info(self) -> Optional[tuple]:
+        command = ['ffprobe',
+                   '-v', 'error',
+                   *self._build_input_options(),
+                   '-select_streams', 'v:0',
+                   '-show_entries', 'stream=width,height,avg_frame_rate,r_frame_rate,codec_name',
+                   '-of', 'json',
+                   self._input_file]
+        try:
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+                                    timeout=30)
+            streams = json.loads(result.stdout).get("streams", [])
+        except Exception as e:
+            self._logger.error(f"ffprobe is not able to read {self._input_file}: {e}")
+            return None
+
+        if len(streams) == 0:
+            return None
+
+        stream = streams[0]
+        if not self._source_forced_fps_enabled:
+            fps_from_source = self._parse_frame_rate(stream.get("avg_frame_rate")) or self._parse_frame_rate(
+                stream.get("r_frame_rate"))
+            if fps_from_source == 0:
+                self._logger.warning(
+                    f"video_source source is {fps_from_source} fps so to be {DEFAULT_SOURCE_FPS} fps")
+                fps_from_source = DEFAULT_SOURCE_FPS
         else:
-            if self._app_settings.benchmark_enabled:
-                return frame_index < self._app_settings.benchmark_duration_time_ms
-            else:
-                return True
+            fps_from_source = self._source_forced_fps
+            self._logger.warning(f"video_source source is forced to be {self._source_forced_fps} fps")
+
+        return int(stream["width"]), int(stream["height"]), fps_from_source, stream.get("codec_name", "unknown")
+
+    def _build_input_options(self) -> list:
+        if self._input_file.lower().startswith("rtsp://"):
+            return ['-rtsp_transport', 'tcp']
+        return []
+
+    def _setup_decoder_sizes(self, source_width: int, source_height: int, output_width: int, output_height: int):
+        self._source_width = source_width
+        self._source_height = source_height
+        self._output_width = output_width
+        self._output_height = output_height
+
+        self._model_frame_enabled = self._app_settings.video_source_decoder_model_frame_enabled
+        if self._model_frame_enabled and self._model_width > self._output_width:
+            self._logger.warning(
+                f"model width {self._model_width} is greater than output width {self._output_width}, "
+                f"model frame is resized by the processor")
+            self._model_frame_enabled = False
+
+    def _build_video_filter(self) -> Optional[str]:
+        output_scale = f"scale={self._output_width}:{self._output_height}:flags=bilinear"
+        if self._model_frame_enabled:
+            # frame di output sopra, frame del modello sotto (allineato a sinistra)
+            model_scale = (f"scale={self._model_width}:{self._model_height}:flags=bilinear,"
+                           f"pad={self._output_width}:{self._model_height}:0:0")
+            return (f"[0:v]split=2[out][mdl];[out]{output_scale}[out_s];[mdl]{model_scale}[mdl_s];"
+                    f"[out_s][mdl_s]vstack=inputs=2[v]")
+        if self._output_width != self._source_width or self._output_height != self._source_height:
+            return output_scale
+        return None
+
+    def _build_ffmpeg_command(self) -> list:
+        command = ['ffmpeg',
+                   '-hide_banner',
+                   '-loglevel', 'error',
+                   *self._build_input_options(),
+                   '-i', self._input_file,
+                   '-an', '-sn']
+
+        video_filter = self._build_video_filter()
+        if self._model_frame_enabled:
+            command += ['-filter_complex', video_filter, '-map', '[v]']
+        elif video_filter is not None:
+            command += ['-vf', video_filter]
+
+        command += ['-f', 'rawvideo',
+                    '-pix_fmt', 'bgr24',
+                    'pipe:1']
+        return command
+
+    @staticmethod
+    def _parse_frame_rate(value: Optional[str]) -> float:
+        try:
+            return float(Fraction(value))
+        except (TypeError, ValueError, ZeroDivisionError):
+            return 0
+
+    def _open_process(self):
+        command = self._build_ffmpeg_command()
+        self._logger.info(f'ffmpeg reader opened with command: {" ".join(command)}')
+        self._ffmpeg_process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def _close_process(self):
+        if self._ffmpeg_process is None:
+            return
+        try:
+            self._ffmpeg_process.stdout.close()
+            self._ffmpeg_process.terminate()
+            self._ffmpeg_process.wait(FFMPEG_STOP_TIMEOUT_IN_SEC)
+        except subprocess.TimeoutExpired:
+            self._ffmpeg_process.kill()
+        except Exception as e:
+            self._logger.error(f"error closing ffmpeg reader: {e}")
+        finally:
+            self._ffmpeg_process = None
+
+    def _read_frame(self) -> (bool, Optional[ndarray], Optional[ndarray], Optional[FrameLease]):
+        if self._ffmpeg_process is None or self._ffmpeg_process.stdout is None:
+            return False, None, None, None
+
+        frame_lease = self._frame_pool.acquire()
+        frame = frame_lease.frame
+        frame_view = memoryview(frame.reshape(-1))
+        frame_size = frame.nbytes
+        read_bytes = 0
+        while read_bytes < frame_size:
+            count = self._ffmpeg_process.stdout.readinto(frame_view[read_bytes:])
+            if not count:
+                frame_lease.release()
+                return False, None, None, None
+            read_bytes += count
+
+        if not self._model_frame_enabled:
+            return True, frame, None, frame_lease
+
+        # viste sullo stesso buffer del pool, coperte dallo stesso lease
+        return (True, frame[:self._output_height],
+                frame[self._output_height:, :self._model_width], frame_lease)
+
+    def _needs_decode(self, frame_index: int) -> bool:
+        return self._frame_schedule is None or self._frame_schedule.needs_decode(frame_index)
@@ -193,6 +193,8 @@ class NotificationClient:
             "sum_entrances": data.door_people_entered,
             "sum_exits": data.door_people_leaved,
 
+            "latency": data.stage_latency.summary(),
+
             "device_id": self._device_id,
             "camera_id": self._camera_id,
             "model_id": self._model_id
@@ -7,9 +7,14 @@ import traceback
 from abc import ABC
 from typing import Optional
 
+import numpy as np
 from numpy import ndarray
 
 from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_pool import FrameLease
+from fvgvisionai.common.frame_tracer import TRACER
+from fvgvisionai.common.metrics import FRAMES_ENCODED
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.common.video_observable import VideoObserver
 from fvgvisionai.config.app_settings import AppSettings
@@ -17,13 +22,18 @@ from fvgvisionai.output.hls.hls_commons import WAIT_TIME_IN_SEC
 
 
 class FFMpegOutputStreamer(VideoObserver, ABC):
-    def __init__(self, buffer: TripleBuffer, app_settings: AppSettings):
+    def __init__(self, buffer: TripleBuffer, app_settings: AppSettings, stream_path: Optional[str] = None,
+                 stage_latency: Optional[StageLatency] = None):
         # Buffer video per la ricezione dei frame
         self._local_buffer = buffer
+        # Tempi di scrittura dei frame verso ffmpeg
+        self._stage_latency = stage_latency
+        self._camera_index = stage_latency.camera_index if stage_latency is not None else 0
+        self._frames_encoded_metric = FRAMES_ENCODED.labels(camera=self._camera_index, output="hls")
         # Impostazioni dell'applicazione
         self._local_app_settings = app_settings
         # Cliente RTMP per l'invio dei frame
-        self._hls_client = FFMpegHlsGenerator(app_settings.video_output_stream_path,
+        self._hls_client = FFMpegHlsGenerator(stream_path or app_settings.video_output_stream_path,
                                               app_settings.video_output_stream_bandwidth,
                                               app_settings.video_output_stream_hls_gop,
                                               app_settings.video_output_stream_hls_time)
@@ -58,7 +68,8 @@ class FFMpegOutputStreamer(VideoObserver, ABC):
 
         self._hls_client.init(self._video_width, self._video_height, self._output_video_fps)
 
-    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int):
+    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int,
+                            model_frame: Optional[ndarray] = None, frame_lease: Optional[FrameLease] = None):
         # Metodo astratto per l'aggiornamento dei frame video
         pass
 
@@ -69,6 +80,7 @@ class FFMpegOutputStreamer(VideoObserver, ABC):
             # Inizializza l'angolo di rotazione
             angle = 0
             fps_timer = AppTimer()
+            write_timer = AppTimer()
 
             while not self.is_video_parameters_defined() and not exit_signal.is_set():
                 time.sleep(WAIT_TIME_IN_SEC)
@@ -80,10 +92,15 @@ class FFMpegOutputStreamer(VideoObserver, ABC):
 
             while not exit_signal.is_set():
                 fps_timer.start()
-                next_frame_id, next_frame = self._local_buffer.get_ready_frame()
-
-                if next_frame is not None:
-                    sent_frame = self._hls_client.send_frame(next_frame)
+                with self._local_buffer.ready_frame() as (next_frame_id, next_frame):
+                    if next_frame is not None:
+                        write_timer.start()
+                        with TRACER.span("hls_write", next_frame_id, self._camera_index):
+                            sent_frame = self._hls_client.send_frame(next_frame)
+                        if self._stage_latency is not None:
+                            self._stage_latency.record(LatencyStage.HLS_WRITE, write_timer.stop())
+                        if sent_frame:
+                            self._frames_encoded_metric.inc()
                 # else:
                 #    # Se non ci sono frame disponibili, invia un'immagine di caricamento rotante
                 #    rotated_image = rotate_loading_image(self._loading_image, angle)
@@ -212,7 +229,8 @@ class FFMpegHlsGenerator:
     def send_frame(self, frame: ndarray):
         try:
             # Invia un frame al server RTMP attraverso la pipe stdin
-            sent_bytes = self._p.stdin.write(frame.tobytes())
+            # scrive direttamente il buffer del frame, senza copiarlo in un oggetto bytes
+            sent_bytes = self._p.stdin.write(np.ascontiguousarray(frame).data)
             # self._p.stdin.flush()
 
             if sent_bytes <= 0:
@@ -11,6 +11,7 @@ from typing import Optional
 from numpy import ndarray
 
 from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_pool import FrameLease
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.common.video_observable import VideoObserver
 from fvgvisionai.config.app_settings import AppSettings
@@ -59,7 +60,8 @@ class GStreamerOutputStreamer(VideoObserver, ABC):
 
         self._hls_client.init(self._video_width, self._video_height, self._output_video_fps)
 
-    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int):
+    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int,
+                            model_frame: Optional[ndarray] = None, frame_lease: Optional[FrameLease] = None):
         # Metodo astratto per l'aggiornamento dei frame video
         pass
 
@@ -81,10 +83,9 @@ class GStreamerOutputStreamer(VideoObserver, ABC):
 
             while not exit_signal.is_set():
                 fps_timer.start()
-                next_frame_id, next_frame = self._local_buffer.get_ready_frame()
-
-                if next_frame is not None:
-                    sent_frame = self._hls_client.send_frame(next_frame)
+                with self._local_buffer.ready_frame() as (next_frame_id, next_frame):
+                    if next_frame is not None:
+                        sent_frame = self._hls_client.send_frame(next_frame)
                 # else:
                 #    # Se non ci sono frame disponibili, invia un'immagine di caricamento rotante
                 #    rotated_image = rotate_loading_image(self._loading_image, angle)
@@ -1,5 +1,8 @@
+import os
 import threading
+from typing import Optional
 
+from fvgvisionai.common.stage_latency import StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.common.video_observable import VideoObservable
 from fvgvisionai.config.app_settings import AppSettings
@@ -8,15 +11,25 @@ from fvgvisionai.output.hls.ffmpeg_output_streamer import FFMpegOutputStreamer
 
 # Funzione per eseguire il client RTMP in un thread separato
 def run_hls_streamer_thread(video_observable: VideoObservable, buffer: TripleBuffer, app_settings: AppSettings,
-                            exit_event: threading.Event) -> threading.Thread:
-    frame_builder = FFMpegOutputStreamer(buffer, app_settings)
+                            exit_event: threading.Event, camera_index: Optional[int] = None,
+                            stage_latency: Optional[StageLatency] = None) -> threading.Thread:
+    if camera_index is None:
+        stream_path = app_settings.video_output_stream_path
+        thread_name = 'OutputThread'
+    else:
+        # in modalita' multi camera ogni camera ha la sua cartella hls
+        stream_path = os.path.join(app_settings.video_output_stream_path, f"cam{camera_index}")
+        os.makedirs(stream_path, exist_ok=True)
+        thread_name = f'OutputThread-{camera_index}'
+
+    frame_builder = FFMpegOutputStreamer(buffer, app_settings, stream_path, stage_latency)
     #frame_builder = GStreamerOutputStreamer(buffer, app_settings)
 
     video_observable.add_video_observer(frame_builder)
 
     hls_streamer_thread = threading.Thread(target=frame_builder.build_frame,
                                            args=(exit_event,),
-                                           name='OutputThread')
+                                           name=thread_name)
     hls_streamer_thread.daemon = True
     hls_streamer_thread.start()
 
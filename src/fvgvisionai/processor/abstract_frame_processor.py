@@ -1,16 +1,24 @@
 import logging
+import queue
 import threading
+import time
 import traceback
 from abc import abstractmethod, ABC
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from numpy import ndarray
 
 from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
 from fvgvisionai.common.app_timer import AppTimer
-from fvgvisionai.common.atomic_boolean import AtomicBoolean
+from fvgvisionai.common.frame_drop_counter import FrameDropCounter
+from fvgvisionai.common.frame_mailbox import FrameMailbox
+from fvgvisionai.common.frame_pool import FrameLease, FramePool, release_lease
+from fvgvisionai.common.frame_schedule import FrameSchedule
+from fvgvisionai.common.frame_tracer import TRACER
+from fvgvisionai.common.memory_inspector import MEMORY_INSPECTOR
+from fvgvisionai.common.metrics import QUEUE_DEPTH
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.common.video_observable import VideoObserver
 from fvgvisionai.config.app_settings import AppSettings
@@ -18,20 +26,33 @@ from fvgvisionai.input.input_costants import NO_CONNECTION_FRAME_INDEX
 from fvgvisionai.notify.notification_client import NotificationClient
 from fvgvisionai.processor.data_aggregator import DataAggregator
 from fvgvisionai.processor.decorators.time_decorator import TimeDecorator
+from fvgvisionai.processor.latency_controller import LatencyController
 from fvgvisionai.processor.subprocessors.in_zone_sub_processor import AlarmStatus
 
+# frame annotati: triple buffer (3), output che li stanno leggendo e il frame in elaborazione
+OUTPUT_FRAME_POOL_SIZE = 5
+OUTPUT_FRAME_POOL_MAX_SIZE = 8
+
+# frame in attesa del micro-batch: il batch in raccolta e quello successivo
+MICRO_BATCH_QUEUED_BATCHES = 2
+MICRO_BATCH_POLL_TIME_IN_SEC = 0.5
+
+PROCESS_POLL_TIME_IN_SEC = 0.5
+
 
 class AbstractFrameProcessor(VideoObserver, ABC):
     def __init__(self, buffer: TripleBuffer, notification_client: Optional[NotificationClient],
                  benchmark_monitor: Optional[BenchmarkMonitor],
-                 app_settings: AppSettings):
+                 app_settings: AppSettings,
+                 stage_latency: Optional[StageLatency] = None):
         super().__init__()
         self._app_settings = app_settings
         self._logger = logging.getLogger(__name__)
-        self._process_executor = ThreadPoolExecutor(thread_name_prefix="process")
 
-        self._ready = AtomicBoolean()
-        self._ready.set(True)
+        # un solo thread elabora i frame, ricevendo sempre l'ultimo arrivato
+        self._mailbox: Optional[FrameMailbox] = None
+        self._process_thread: Optional[threading.Thread] = None
+        self._process_exit = threading.Event()
 
         self._buffer = buffer
 
@@ -43,12 +64,23 @@ class AbstractFrameProcessor(VideoObserver, ABC):
         if self.is_benchmark_enabled():
             self._benchmark.start()
 
-        self._data_aggregator = DataAggregator()
+        self._data_aggregator = DataAggregator(stage_latency)
+        self._frame_drop_counter = FrameDropCounter(self._data_aggregator.stage_latency.camera_index)
+        self._frame_schedule = FrameSchedule(app_settings)
+        self._output_pool: Optional[FramePool] = None
+        self._latency_controller: Optional[LatencyController] = None
+
+        self._micro_batch_size = app_settings.model_micro_batch_size
+        self._micro_batch_wait_s = app_settings.model_micro_batch_wait_ms / 1000.0
+        self._micro_batch_queue: Optional[queue.Queue] = None
+        self._micro_batch_thread: Optional[threading.Thread] = None
+        self._micro_batch_exit = threading.Event()
 
         self._global_process_timer = AppTimer()
         self._global_process_timer.start()
 
         self.processor_timer = AppTimer()
+        self._swap_timer = AppTimer()
 
         self._time_decorator = TimeDecorator()
 
@@ -58,15 +90,120 @@ class AbstractFrameProcessor(VideoObserver, ABC):
         # Indica se il frame che e' arrivato e' valido o meno (vedi mancanza di rete)
         self._video_source_available = True
 
-    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int):
-        if video_frame is not None and self.is_ready():
-            self._process_executor.submit(self.process_frame,
-                                          frame_index, video_frame,
-                                          elapsed_time)
+        MEMORY_INSPECTOR.register_frame_holder(f"processor_queues-{self.stage_latency.camera_index}",
+                                               self._queued_frames_memory)
+
+    def receive_video_frame(self, frame_index: int, video_frame: Optional[ndarray], elapsed_time: int,
+                            model_frame: Optional[ndarray] = None, frame_lease: Optional[FrameLease] = None):
+        if video_frame is not None:
+            self._frame_drop_counter.add_processor_offered()
+            if self._micro_batch_size > 1:
+                self._enqueue_for_micro_batch(frame_index, video_frame, elapsed_time, model_frame, frame_lease)
+            else:
+                self._submit_frame(frame_index, video_frame, elapsed_time, model_frame, frame_lease)
+
+    def _submit_frame(self, frame_index: int, video_frame: ndarray, elapsed_time: int,
+                      model_frame: Optional[ndarray], frame_lease: Optional[FrameLease]):
+        """Consegna il frame al thread di elaborazione; di default tramite la casella dell'ultimo frame."""
+        self._offer_to_mailbox(frame_index, video_frame, elapsed_time, model_frame, frame_lease)
+
+    def _offer_to_mailbox(self, frame_index: int, video_frame: ndarray, elapsed_time: int,
+                          model_frame: Optional[ndarray], frame_lease: Optional[FrameLease]):
+        if self._process_thread is None:
+            self._mailbox = FrameMailbox()
+            self._register_queue_depth("mailbox", lambda: self._mailbox.pending)
+            self._process_thread = threading.Thread(target=self._run_process, name="process", daemon=True)
+            self._process_thread.start()
+
+        # il frame del reader deve restare valido fino al termine dell'elaborazione
+        if frame_lease is not None:
+            frame_lease.retain()
+        replaced = self._mailbox.offer((frame_index, video_frame, elapsed_time, model_frame, frame_lease))
+        if replaced is not None:
+            # il frame precedente non e' mai stato preso in carico
+            release_lease(replaced[4])
+            self._frame_drop_counter.add_processor_dropped()
+
+    def _queued_frames(self) -> List[Optional[ndarray]]:
+        """Frame del reader in attesa nelle code del processor (casella, micro-batch)."""
+        frames = []
+        pending_item = self._mailbox.pending_item if self._mailbox is not None else None
+        if pending_item is not None:
+            frames.append(pending_item[1])
+        if self._micro_batch_queue is not None:
+            frames.extend(item[1] for item in list(self._micro_batch_queue.queue))
+        return frames
+
+    def _queued_frames_memory(self) -> (int, int):
+        """Frame trattenuti nelle code del processor e loro byte."""
+        frames = [frame for frame in self._queued_frames() if frame is not None]
+        return len(frames), sum(frame.nbytes for frame in frames)
+
+    def _register_queue_depth(self, name: str, function):
+        QUEUE_DEPTH.labels(camera=self.stage_latency.camera_index, queue=name).set_function(function)
+
+    def _run_process(self):
+        while not self._process_exit.is_set():
+            item = self._mailbox.take(PROCESS_POLL_TIME_IN_SEC)
+            if item is not None:
+                self.process_frame(*item)
+
+    def _enqueue_for_micro_batch(self, frame_index: int, video_frame: ndarray, elapsed_time: int,
+                                 model_frame: Optional[ndarray], frame_lease: Optional[FrameLease]):
+        if self._micro_batch_thread is None:
+            self._micro_batch_queue = queue.Queue(maxsize=self._micro_batch_size * MICRO_BATCH_QUEUED_BATCHES)
+            self._register_queue_depth("micro-batch", self._micro_batch_queue.qsize)
+            self._micro_batch_thread = threading.Thread(target=self._run_micro_batches, name="micro-batch",
+                                                        daemon=True)
+            self._micro_batch_thread.start()
+
+        # il frame del reader deve restare valido fino al termine dell'elaborazione
+        if frame_lease is not None:
+            frame_lease.retain()
+        try:
+            self._micro_batch_queue.put_nowait((frame_index, video_frame, elapsed_time, model_frame, frame_lease))
+        except queue.Full:
+            release_lease(frame_lease)
+            self._frame_drop_counter.add_processor_dropped()
+
+    def _run_micro_batches(self):
+        """Raccoglie fino a MODEL_MICRO_BATCH_SIZE frame consecutivi, attendendo al massimo MODEL_MICRO_BATCH_WAIT_MS
+        dal primo, e li elabora in ordine dopo un'unica inferenza batch."""
+        while not self._micro_batch_exit.is_set():
+            try:
+                batch = [self._micro_batch_queue.get(timeout=MICRO_BATCH_POLL_TIME_IN_SEC)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self._micro_batch_wait_s
+            while len(batch) < self._micro_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._micro_batch_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._prefetch_batch(batch)
+            except Exception as e:
+                self._logger.error("Unexpected error %s " % e)
+                traceback.print_exc()
+
+            for frame_index, video_frame, elapsed_time, model_frame, frame_lease in batch:
+                self.process_frame(frame_index, video_frame, elapsed_time, model_frame, frame_lease)
+
+    def _prefetch_batch(self, batch: list):
+        """Inferenza batch sui frame (frame_index, frame, elapsed_time, model_frame, lease) prima della loro
+        elaborazione in ordine; di default nessuna."""
+        pass
 
-    def process_frame(self, frame_index: int, source_frame: ndarray, acquisition_frame_time: int):
+    def process_frame(self, frame_index: int, source_frame: ndarray, acquisition_frame_time: int,
+                      model_frame: Optional[ndarray] = None, frame_lease: Optional[FrameLease] = None):
+        trace_start = TRACER.begin()
         try:
-            self._ready.set(False)
+            self._frame_drop_counter.add_processor_processed()
             self._video_source_available = frame_index != NO_CONNECTION_FRAME_INDEX
 
             # Se sorgente video_source non disponibile, impostiamo frame di cortesia ed usciamo
@@ -81,71 +218,134 @@ class AbstractFrameProcessor(VideoObserver, ABC):
             self._logger.debug(f"elaborazione frame #{frame_index} - start")
 
             if source_frame is not None and source_frame.size > 0:
-                raised_hand_alarm_status, zone_alarm_status = self._evaluate_frame(frame_index, source_frame)
+                raised_hand_alarm_status, zone_alarm_status = self._evaluate_frame(frame_index, source_frame,
+                                                                                   model_frame)
             else:
                 self._logger.warning("frame is None")
                 zone_alarm_status = AlarmStatus.NORMAL
                 raised_hand_alarm_status = AlarmStatus.NORMAL
 
-            # Benchmark e notification non saranno mai abilitate assieme, quindi uno dei due si deve prender carico
-            # di pulire i dati aggregati
-            if self.is_benchmark_enabled():
-                benchmark_registered = self._benchmark.measure_performance(frame_index, source_frame,
-                                                                           self._data_aggregator)
-                # Puliamo i dati
-                if benchmark_registered:
-                    self._data_aggregation_datetime_start = datetime.now()
-                    self._data_aggregator.clear_data()
-
-            if self.is_notification_enabled():
-                self._notification_client.handle_alarms(raised_hand_alarm_status, zone_alarm_status)
-
-                notification_sent = self._notification_client.handle_notification(self._data_aggregation_datetime_start,
-                                                                                  self._data_aggregator)
-                # Puliamo i dati
-                if notification_sent:
-                    self._data_aggregation_datetime_start = datetime.now()
-                    self._data_aggregator.clear_data()
-
             process_time = self.processor_timer.stop()
-            self._data_aggregator.measure_time_frame_acquisition(acquisition_frame_time)
-            self._data_aggregator.measure_time_frame_processing(process_time)
-
-            self._logger.debug(f"elaborazione frame #{frame_index} in {process_time:.0f} ms  - end")
+            self._complete_frame(frame_index, source_frame, acquisition_frame_time, process_time,
+                                 raised_hand_alarm_status, zone_alarm_status)
 
         except Exception as e:
             self._logger.error("unexpected error %s " % e)
             traceback.print_exc()
         finally:
-            self._ready.set(True)
+            release_lease(frame_lease)
+            TRACER.end("process", trace_start, frame_index, self.stage_latency.camera_index)
+
+    def _complete_frame(self, frame_index: int, source_frame: ndarray, acquisition_frame_time: int,
+                        process_time: float, raised_hand_alarm_status: AlarmStatus, zone_alarm_status: AlarmStatus):
+        trace_start = TRACER.begin()
+        # Benchmark e notification non saranno mai abilitate assieme, quindi uno dei due si deve prender carico
+        # di pulire i dati aggregati
+        if self.is_benchmark_enabled():
+            benchmark_registered = self._benchmark.measure_performance(frame_index, source_frame,
+                                                                       self._data_aggregator)
+            # Puliamo i dati
+            if benchmark_registered:
+                self._data_aggregation_datetime_start = datetime.now()
+                self._data_aggregator.clear_data()
+
+        if self.is_notification_enabled():
+            self._notification_client.handle_alarms(raised_hand_alarm_status, zone_alarm_status)
+
+            notification_sent = self._notification_client.handle_notification(self._data_aggregation_datetime_start,
+                                                                              self._data_aggregator)
+            # Puliamo i dati
+            if notification_sent:
+                self._data_aggregation_datetime_start = datetime.now()
+                self._data_aggregator.clear_data()
 
-    def _evaluate_frame(self, frame_index: int, source_frame: ndarray) -> (AlarmStatus, AlarmStatus):
-        current_frame, zone_alarm_status, raised_hand_alarm_status = self._execute_frame_analysis(source_frame,
-                                                                                                  self._data_aggregator)
-        if current_frame is not None:
-            self._buffer.set_new_frame(frame_index, current_frame)
+        self._data_aggregator.measure_dropped_frames(*self._frame_drop_counter.pop())
+        self._data_aggregator.measure_time_frame_acquisition(acquisition_frame_time)
+        self._data_aggregator.measure_time_frame_processing(process_time)
+        self.measure_processing_time(process_time)
+        TRACER.end("complete", trace_start, frame_index, self.stage_latency.camera_index)
+
+        self._logger.debug(f"elaborazione frame #{frame_index} in {process_time:.0f} ms  - end")
+
+    @abstractmethod
+    def _evaluate_frame(self, frame_index: int, source_frame: ndarray,
+                        model_frame: Optional[ndarray] = None) -> (AlarmStatus, AlarmStatus):
+        """Analizza il frame, pubblica quello annotato e restituisce gli allarmi (mano alzata, zona)."""
+        pass
+
+    def _publish_frame(self, frame_index: int, frame: ndarray, frame_lease: Optional[FrameLease]):
+        self._swap_timer.start()
+        with TRACER.span("publish", frame_index, self.stage_latency.camera_index):
+            self._buffer.set_new_frame(frame_index, frame, frame_lease)
             self._buffer.swap_buffers()
-        return raised_hand_alarm_status, zone_alarm_status
+        self._data_aggregator.stage_latency.record(LatencyStage.SWAP, self._swap_timer.stop())
+
+    def _acquire_output_lease(self, source_frame: ndarray) -> FrameLease:
+        if self._output_pool is None or self._output_pool.shape != source_frame.shape:
+            frames_in_flight = self._frames_in_flight()
+            self._output_pool = FramePool(source_frame.shape, OUTPUT_FRAME_POOL_SIZE + frames_in_flight,
+                                          OUTPUT_FRAME_POOL_MAX_SIZE + frames_in_flight, source_frame.dtype,
+                                          owner=f"processor-{self.stage_latency.camera_index}")
+        return self._output_pool.acquire()
+
+    def _frames_in_flight(self) -> int:
+        """Frame annotati in elaborazione contemporaneamente oltre a quello corrente; di default nessuno."""
+        return 0
+
+    @property
+    def frame_drop_counter(self) -> FrameDropCounter:
+        return self._frame_drop_counter
+
+    @property
+    def frame_schedule(self) -> FrameSchedule:
+        return self._frame_schedule
+
+    @property
+    def stage_latency(self) -> StageLatency:
+        return self._data_aggregator.stage_latency
 
     def is_benchmark_enabled(self):
-        return self._app_settings.benchmark_enabled
+        return self._app_settings.benchmark_enabled and self._benchmark is not None
 
     def is_notification_enabled(self):
         return self._notification_client is not None
 
     def setup_video_parameters(self, video_width: int, video_height: int, source_frame_rate_declared: int):
         self._data_aggregator.time_frame_source_declared = source_frame_rate_declared
+        self._frame_schedule.setup(source_frame_rate_declared)
 
         self._time_decorator.init_image_size(video_width, video_height)
 
-    @abstractmethod
-    def _execute_frame_analysis(self, frame: ndarray, data_aggregator: DataAggregator) -> \
-            (Optional[ndarray], AlarmStatus, AlarmStatus):
+    def measure_processing_time(self, process_time: float):
+        """Tempo di elaborazione di un frame, usato dal controllo della latenza se abilitato."""
+        if self._latency_controller is not None and self._latency_controller.measure(process_time):
+            self._on_latency_level_changed()
+
+    def _on_latency_level_changed(self):
         pass
 
+    def close(self):
+        """Rilascia le risorse del processor al termine della lettura della sorgente."""
+        if self._process_thread is not None:
+            self._process_exit.set()
+            # il frame rimasto nella casella non verra' elaborato
+            replaced = self._mailbox.close()
+            if replaced is not None:
+                release_lease(replaced[4])
+            self._process_thread.join()
+            self._process_thread = None
+            self._process_exit.clear()
+
+        if self._micro_batch_thread is not None:
+            self._micro_batch_exit.set()
+            self._micro_batch_thread.join()
+            self._micro_batch_thread = None
+            self._micro_batch_exit.clear()
+
+            # i frame rimasti in coda non verranno elaborati
+            while not self._micro_batch_queue.empty():
+                release_lease(self._micro_batch_queue.get_nowait()[4])
+
     def _show_time_box(self, source_frame: ndarray):
         if self._app_settings.show_time:
             self._time_decorator.draw(source_frame)
-
-    def is_ready(self):
-        return self._ready.get()
@@ -0,0 +1,192 @@
+import traceback
+from abc import abstractmethod, ABC
+from typing import List, Optional
+
+import numpy as np
+from numpy import ndarray
+
+from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
+from fvgvisionai.common.frame_pool import FrameLease, release_lease
+from fvgvisionai.common.stage_latency import StageLatency
+from fvgvisionai.common.triple_buffer import TripleBuffer
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.input.input_costants import NO_CONNECTION_FRAME_INDEX
+from fvgvisionai.notify.notification_client import NotificationClient
+from fvgvisionai.processor.abstract_frame_processor import AbstractFrameProcessor
+from fvgvisionai.processor.data_aggregator import DataAggregator
+from fvgvisionai.processor.frame_pipeline import FramePipeline, PipelineFrame
+from fvgvisionai.processor.subprocessors.in_zone_sub_processor import AlarmStatus
+
+
+class AbstractLocalFrameProcessor(AbstractFrameProcessor, ABC):
+    """Processor che analizza i frame nel processo corrente, disegnando le annotazioni su un buffer del pool di
+    output.
+
+    L'elaborazione e' divisa negli stadi _infer_frame, _analyse_frame e _render_frame: eseguiti in sequenza dal
+    thread di elaborazione, oppure su frame consecutivi dai thread della pipeline (MODEL_PIPELINE_ENABLED).
+    """
+
+    def __init__(self, buffer: TripleBuffer, notification_client: Optional[NotificationClient],
+                 benchmark_monitor: Optional[BenchmarkMonitor],
+                 app_settings: AppSettings,
+                 stage_latency: Optional[StageLatency] = None):
+        super().__init__(buffer=buffer,
+                         notification_client=notification_client,
+                         benchmark_monitor=benchmark_monitor,
+                         app_settings=app_settings,
+                         stage_latency=stage_latency)
+        self._pipeline_enabled = app_settings.model_pipeline_enabled
+        self._pipeline: Optional[FramePipeline] = None
+
+    def _submit_frame(self, frame_index: int, video_frame: ndarray, elapsed_time: int,
+                      model_frame: Optional[ndarray], frame_lease: Optional[FrameLease]):
+        if self._pipeline_enabled:
+            self._submit_to_pipeline(frame_index, video_frame, elapsed_time, model_frame, frame_lease)
+        else:
+            super()._submit_frame(frame_index, video_frame, elapsed_time, model_frame, frame_lease)
+
+    def _submit_to_pipeline(self, frame_index: int, video_frame: ndarray, elapsed_time: int,
+                            model_frame: Optional[ndarray], frame_lease: Optional[FrameLease]):
+        if self._pipeline is None:
+            self._pipeline = FramePipeline([self._pipeline_inference, self._pipeline_analytics,
+                                            self._pipeline_rendering],
+                                           on_complete=self._complete_pipeline_frame,
+                                           camera_index=self.stage_latency.camera_index)
+            for index, name in enumerate(self._pipeline.stage_names):
+                self._register_queue_depth(f"pipeline-{name}", lambda index=index: self._pipeline.queue_size(index))
+            self._pipeline.start()
+
+        # il frame del reader deve restare valido fino al termine dello stadio di inferenza
+        if frame_lease is not None:
+            frame_lease.retain()
+        if not self._pipeline.submit(PipelineFrame(frame_index, video_frame, elapsed_time, model_frame, frame_lease)):
+            release_lease(frame_lease)
+            self._frame_drop_counter.add_processor_dropped()
+
+    def _pipeline_inference(self, item: PipelineFrame):
+        # il frame di cortesia viene pubblicato cosi' com'e' dall'ultimo stadio
+        if item.frame_index == NO_CONNECTION_FRAME_INDEX or item.frame is None or item.frame.size == 0:
+            return
+
+        # le annotazioni vengono disegnate su un buffer del pool di output, per cui il frame del reader si puo'
+        # rilasciare subito dopo l'inferenza
+        item.output_lease = self._acquire_output_lease(item.frame)
+        np.copyto(item.output_lease.frame, item.frame)
+        item.inference = self._infer_frame(item.frame_index, item.output_lease.frame, self._data_aggregator,
+                                           item.model_frame)
+
+        item.frame = item.output_lease.frame
+        item.model_frame = None
+        release_lease(item.frame_lease)
+        item.frame_lease = None
+
+    def _pipeline_analytics(self, item: PipelineFrame):
+        # senza lease di output il frame non e' passato per lo stadio di inferenza
+        if item.output_lease is not None:
+            item.analysis = self._analyse_frame(item.frame_index, item.inference, self._data_aggregator)
+
+    def _pipeline_rendering(self, item: PipelineFrame):
+        self._video_source_available = item.frame_index != NO_CONNECTION_FRAME_INDEX
+        if not self._video_source_available:
+            self._buffer.set_new_frame(item.frame_index, item.frame)
+            self._buffer.swap_buffers()
+            return
+
+        if item.output_lease is None:
+            return
+
+        current_frame, _, _ = self._render_frame(item.frame_index, item.frame, item.analysis, self._data_aggregator)
+        if current_frame is not None:
+            # il triple buffer diventa possessore del lease
+            lease_published = current_frame is item.output_lease.frame
+            self._publish_frame(item.frame_index, current_frame, item.output_lease if lease_published else None)
+            if lease_published:
+                item.output_lease = None
+
+    def _complete_pipeline_frame(self, item: PipelineFrame):
+        self._frame_drop_counter.add_processor_processed()
+        if item.frame_index == NO_CONNECTION_FRAME_INDEX:
+            return
+        if item.frame is None or item.frame.size == 0:
+            self._logger.warning("frame is None")
+
+        zone_alarm_status = AlarmStatus.NORMAL
+        raised_hand_alarm_status = AlarmStatus.NORMAL
+        if item.analysis is not None:
+            zone_alarm_status = item.analysis.zone_alarm_status
+            raised_hand_alarm_status = item.analysis.raised_hand_alarm_status
+
+        # gli stadi lavorano in parallelo, per cui il ritmo della pipeline e' dato dallo stadio piu' lento
+        self._complete_frame(item.frame_index, item.frame, item.acquisition_time, max(item.stage_times),
+                             raised_hand_alarm_status, zone_alarm_status)
+
+    def _queued_frames(self) -> List[Optional[ndarray]]:
+        frames = super()._queued_frames()
+        if self._pipeline is not None:
+            frames.extend(item.frame for item in self._pipeline.queued_frames())
+        return frames
+
+    def _frames_in_flight(self) -> int:
+        # con la pipeline ci sono piu' frame annotati in elaborazione contemporaneamente
+        return self._pipeline.max_frames_in_flight if self._pipeline is not None else 0
+
+    def close(self):
+        if self._pipeline is not None:
+            self._pipeline.stop()
+            self._pipeline = None
+        super().close()
+
+    def _evaluate_frame(self, frame_index: int, source_frame: ndarray,
+                        model_frame: Optional[ndarray] = None) -> (AlarmStatus, AlarmStatus):
+        # le annotazioni vengono disegnate su un buffer del pool di output e non sul frame del reader
+        output_lease = self._acquire_output_lease(source_frame)
+        np.copyto(output_lease.frame, source_frame)
+
+        lease_published = False
+        try:
+            current_frame, zone_alarm_status, raised_hand_alarm_status = self._execute_frame_analysis(
+                frame_index, output_lease.frame, self._data_aggregator, model_frame)
+            if current_frame is not None:
+                # il triple buffer diventa possessore del lease
+                lease_published = current_frame is output_lease.frame
+                self._publish_frame(frame_index, current_frame, output_lease if lease_published else None)
+        finally:
+            if not lease_published:
+                output_lease.release()
+        return raised_hand_alarm_status, zone_alarm_status
+
+    def analyse_frame(self, frame_index: int, frame: ndarray, data_aggregator: DataAggregator,
+                      model_frame: Optional[ndarray] = None) -> (Optional[ndarray], AlarmStatus, AlarmStatus):
+        """Analisi del frame senza pubblicazione sul triple buffer, usata dal processo separato del modello."""
+        return self._execute_frame_analysis(frame_index, frame, data_aggregator, model_frame)
+
+    def _execute_frame_analysis(self, frame_index: int, frame: ndarray, data_aggregator: DataAggregator,
+                                model_frame: Optional[ndarray] = None) -> \
+            (Optional[ndarray], AlarmStatus, AlarmStatus):
+        try:
+            inference = self._infer_frame(frame_index, frame, data_aggregator, model_frame)
+            analysis = self._analyse_frame(frame_index, inference, data_aggregator)
+            return self._render_frame(frame_index, frame, analysis, data_aggregator)
+
+        except Exception as e:
+            self._logger.error("Unexpected error %s " % e)
+            traceback.print_exc()
+            return None, AlarmStatus.NORMAL, AlarmStatus.NORMAL
+
+    @abstractmethod
+    def _infer_frame(self, frame_index: int, source_frame: ndarray, data_aggregator: DataAggregator,
+                     model_frame: Optional[ndarray] = None) -> object:
+        """Inferenza del modello sul frame; il risultato e' passato a _analyse_frame."""
+        pass
+
+    @abstractmethod
+    def _analyse_frame(self, frame_index: int, inference: object, data_aggregator: DataAggregator) -> object:
+        """Analisi degli scenari sul risultato dell'inferenza; il risultato e' passato a _render_frame."""
+        pass
+
+    @abstractmethod
+    def _render_frame(self, frame_index: int, source_frame: ndarray, analysis: object,
+                      data_aggregator: DataAggregator) -> (Optional[ndarray], AlarmStatus, AlarmStatus):
+        """Disegna le annotazioni sul frame e restituisce il frame da pubblicare (None se nessuno) e gli
+        allarmi."""
+        pass
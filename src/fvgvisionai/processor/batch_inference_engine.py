@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+import traceback
+from typing import List, Optional
+
+from numpy import ndarray
+from ultralytics.engine.results import Results
+
+from fvgvisionai.common.memory_inspector import MEMORY_INSPECTOR
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.processor.ultralytics_model import load_model
+
+WAIT_TIME_IN_SEC = 0.5
+
+
+class InferenceRequest:
+    def __init__(self, model_frame: ndarray):
+        self.model_frame = model_frame
+        self.result: Optional[Results] = None
+        self._done = threading.Event()
+
+    def complete(self, result: Optional[Results]):
+        self.result = result
+        self._done.set()
+
+    def wait(self) -> Optional[Results]:
+        self._done.wait()
+        return self.result
+
+
+class BatchInferenceEngine:
+    """Modello condiviso tra piu' camere.
+
+    Ogni camera deposita l'ultimo frame da analizzare nel proprio slot; il thread dell'engine raccoglie i frame
+    pendenti (attendendo al massimo MODEL_BATCH_WAIT_MS le camere mancanti) ed esegue una sola inferenza batch.
+    """
+
+    def __init__(self, app_settings: AppSettings, cameras_count: int):
+        self._app_settings = app_settings
+        self._model, self._model_file_name = load_model(app_settings)
+
+        self._categories_list: List[int] = [item.model_class for item in app_settings.model_categories]
+        self._batch_wait_s = app_settings.model_batch_wait_ms / 1000.0
+
+        self._requests: List[Optional[InferenceRequest]] = [None] * cameras_count
+        self._condition = threading.Condition()
+        self._running = False
+        self._exit_signal = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._logger = logging.getLogger(__name__)
+
+        MEMORY_INSPECTOR.register_frame_holder("inference_requests", self._pending_frames_memory)
+
+    def _pending_frames_memory(self) -> (int, int):
+        """Frame delle richieste in attesa dell'inferenza batch e loro byte."""
+        frames = [request.model_frame for request in list(self._requests) if request is not None]
+        return len(frames), sum(frame.nbytes for frame in frames)
+
+    @property
+    def model_file_name(self) -> str:
+        return self._model_file_name
+
+    @property
+    def cameras_count(self) -> int:
+        return len(self._requests)
+
+    def start(self, exit_signal: threading.Event) -> threading.Thread:
+        self._running = True
+        self._exit_signal = exit_signal
+        self._stop_event.clear()
+        engine_thread = threading.Thread(target=self._run,
+                                         name='InferenceThread')
+        engine_thread.daemon = True
+        engine_thread.start()
+        self._thread = engine_thread
+        return engine_thread
+
+    def stop(self):
+        """Ferma il thread dell'engine, sbloccando le camere ancora in attesa del risultato."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    def _is_exiting(self) -> bool:
+        return self._exit_signal.is_set() or self._stop_event.is_set()
+
+    def infer(self, camera_index: int, model_frame: ndarray) -> Optional[Results]:
+        request = InferenceRequest(model_frame)
+        with self._condition:
+            if not self._running:
+                return None
+            previous_request = self._requests[camera_index]
+            if previous_request is not None:
+                # vince sempre l'ultimo frame della camera
+                previous_request.complete(None)
+            self._requests[camera_index] = request
+            self._condition.notify_all()
+        return request.wait()
+
+    def _pending_count(self) -> int:
+        return sum(1 for request in self._requests if request is not None)
+
+    def _collect_batch(self) -> List[tuple]:
+        with self._condition:
+            while self._pending_count() == 0 and not self._is_exiting():
+                self._condition.wait(WAIT_TIME_IN_SEC)
+
+            # attende che le altre camere depositino il loro frame, fino al tempo massimo configurato
+            deadline = time.monotonic() + self._batch_wait_s
+            while self._pending_count() < len(self._requests) and not self._is_exiting():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = [(index, request) for index, request in enumerate(self._requests) if request is not None]
+            self._requests = [None] * len(self._requests)
+            return batch
+
+    def _run(self):
+        while not self._is_exiting():
+            batch = self._collect_batch()
+            if len(batch) == 0:
+                continue
+
+            try:
+                results = self._model([request.model_frame for _, request in batch], verbose=False,
+                                      imgsz=self._app_settings.model_resolution.value["resolution"],
+                                      conf=self._app_settings.model_confidence,
+                                      iou=self._app_settings.model_iou,
+                                      classes=self._categories_list)
+                for (_, request), result in zip(batch, results):
+                    request.complete(result.cpu())
+                self._logger.debug(f"batch inference on {len(batch)} cameras")
+            except Exception as e:
+                self._logger.error("Unexpected error %s " % e)
+                traceback.print_exc()
+                for _, request in batch:
+                    request.complete(None)
+
+        # sblocca le camere ancora in attesa
+        with self._condition:
+            self._running = False
+            for request in self._requests:
+                if request is not None:
+                    request.complete(None)
+            self._requests = [None] * len(self._requests)
+        self._logger.warning("inference thread is shutting down")
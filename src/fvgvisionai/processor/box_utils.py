@@ -0,0 +1,66 @@
+import numpy as np
+from numpy import ndarray
+
+
+def box_iou(boxes_a: ndarray, boxes_b: ndarray) -> ndarray:
+    """IoU tra tutti i box (A, 4) e (B, 4) in formato x1, y1, x2, y2."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-7)
+
+
+def non_max_suppression(boxes: ndarray, scores: ndarray, iou_threshold: float, max_detections: int) -> ndarray:
+    """NMS greedy: ad ogni passo l'IoU del box migliore viene calcolata in un'unica operazione con tutti i box
+    rimasti. Restituisce gli indici dei box mantenuti, ordinati per confidenza decrescente."""
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    keep = []
+    while order.size > 0 and len(keep) < max_detections:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+
+        inter_w = np.clip(np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0]),
+                          0, None)
+        inter_h = np.clip(np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1]),
+                          0, None)
+        intersection = inter_w * inter_h
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-7)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def fuse_boxes(boxes: ndarray, scores: ndarray, classes: ndarray, ios_threshold: float) -> (ndarray, ndarray):
+    """Fusione greedy dei box della stessa classe che si sovrappongono, come quelli di un oggetto tagliato dal bordo di
+    un tile. La sovrapposizione e' l'intersezione rispetto al box piu' piccolo (IoS), per cui anche una parte
+    dell'oggetto viene unita all'oggetto intero. Restituisce gli indici dei box migliori di ogni gruppo, per confidenza
+    decrescente, ed i box fusi (unione dei box del gruppo)."""
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    keep = []
+    fused = []
+    while order.size > 0:
+        best = order[0]
+        rest = order[1:]
+
+        inter_w = np.clip(np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0]),
+                          0, None)
+        inter_h = np.clip(np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1]),
+                          0, None)
+        ios = inter_w * inter_h / (np.minimum(areas[best], areas[rest]) + 1e-7)
+        merged = (ios > ios_threshold) & (classes[rest] == classes[best])
+
+        group = boxes[np.concatenate(([best], rest[merged]))]
+        keep.append(best)
+        fused.append(np.concatenate((group[:, :2].min(axis=0), group[:, 2:].max(axis=0))))
+
+        order = rest[~merged]
+
+    return np.array(keep, dtype=np.int64), np.array(fused, dtype=boxes.dtype).reshape(-1, 4)
@@ -0,0 +1,33 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+
+def fit_crop_region(x1: float, y1: float, x2: float, y2: float, frame_width: int, frame_height: int,
+                    aspect_ratio: float, min_width: float = 0, min_height: float = 0) -> Tuple[int, int, int, int]:
+    """Regione x1, y1, x2, y2 che contiene il rettangolo indicato, con dimensione minima e proporzioni del modello
+    (cosi' il ridimensionamento e' uniforme), spostata e limitata per restare dentro al frame."""
+    width = max(x2 - x1, min_width)
+    height = max(y2 - y1, min_height)
+    width, height = max(width, height * aspect_ratio), max(height, width / aspect_ratio)
+    width, height = min(width, frame_width), min(height, frame_height)
+
+    center_x = min(max((x1 + x2) / 2, width / 2), frame_width - width / 2)
+    center_y = min(max((y1 + y2) / 2, height / 2), frame_height - height / 2)
+    return (int(center_x - width / 2), int(center_y - height / 2),
+            int(center_x + width / 2), int(center_y + height / 2))
+
+
+def polygons_region(polygons: list, margin: int, frame_width: int, frame_height: int, aspect_ratio: float,
+                    min_width: int, min_height: int) -> Optional[Tuple[int, int, int, int]]:
+    """Rettangolo che contiene tutti i poligoni, allargato del margine; None se coincide con il frame intero."""
+    points: ndarray = np.concatenate([np.asarray(polygon).reshape(-1, 2) for polygon in polygons])
+    x1, y1 = points.min(axis=0) - margin
+    x2, y2 = points.max(axis=0) + margin
+
+    region = fit_crop_region(max(x1, 0), max(y1, 0), min(x2, frame_width), min(y2, frame_height),
+                             frame_width, frame_height, aspect_ratio, min_width, min_height)
+    if region == (0, 0, frame_width, frame_height):
+        return None
+    return region
@@ -1,12 +1,13 @@
-from typing import List
+from typing import Optional
 
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.common.stage_latency import StageLatency
+from fvgvisionai.processor.detections import Detections
 from fvgvisionai.processor.measure import IntMeasure, FloatMeasure
 from fvgvisionai.processor.ultralytics_classes import PERSON, BICYCLE, CAR
 
 
 class DataAggregator:
-    def __init__(self):
+    def __init__(self, stage_latency: Optional[StageLatency] = None):
         self.people_down = IntMeasure()
         self.people_counter = IntMeasure()
         self.bikes_counter = IntMeasure()
@@ -17,6 +18,14 @@ class DataAggregator:
         self.door_people_entered = 0
         self.door_people_leaved = 0
 
+        self.frames_dropped_by_reader = 0
+        self.frames_dropped_by_processor = 0
+        self.frames_offered_to_processor = 0
+        self.frames_processed = 0
+
+        self.motion_score = FloatMeasure()
+        self.frames_skipped_by_motion = 0
+
         self.time_in_zone = IntMeasure()
 
         self.min_time_in_zone = 0
@@ -24,8 +33,12 @@ class DataAggregator:
         self.avg_time_in_zone = 0
 
         self.time_frame_source_declared = 0
-        self.time_frame_acquisition = FloatMeasure()
-        self.time_frame_processing = FloatMeasure()
+        # i tempi registrano anche i percentili
+        self.time_frame_acquisition = FloatMeasure(quantiles=True)
+        self.time_frame_processing = FloatMeasure(quantiles=True)
+
+        # tempi degli stadi, condivisi con reader ed output della stessa sorgente
+        self.stage_latency = stage_latency if stage_latency is not None else StageLatency()
 
     def clear_data(self):
         self.people_down.clear()
@@ -36,13 +49,20 @@ class DataAggregator:
 
         self.door_people_entered = 0
         self.door_people_leaved = 0
+        self.frames_dropped_by_reader = 0
+        self.frames_dropped_by_processor = 0
+        self.frames_offered_to_processor = 0
+        self.frames_processed = 0
+        self.motion_score.clear()
+        self.frames_skipped_by_motion = 0
         self.time_frame_acquisition.clear()
         self.time_frame_processing.clear()
+        self.stage_latency.clear()
 
-    def measure_objects_counter(self, list_objects: List[DetectedObject]):
-        self.people_counter.add(sum(1 for obj in list_objects if obj.label_num == PERSON))
-        self.bikes_counter.add(sum(1 for obj in list_objects if obj.label_num == BICYCLE))
-        self.cars_counter.add(sum(1 for obj in list_objects if obj.label_num == CAR))
+    def measure_objects_counter(self, detections: Detections):
+        self.people_counter.add(detections.count(PERSON))
+        self.bikes_counter.add(detections.count(BICYCLE))
+        self.cars_counter.add(detections.count(CAR))
 
     def measure_items_in_zone(self, value: int, min_time_in_zone: int, max_time_in_zone: int, avg_time_in_zone: int):
         self.people_in_zone_counter.add(value)
@@ -55,6 +75,18 @@ class DataAggregator:
         self.door_people_entered += people_entering
         self.door_people_leaved += people_leaving
 
+    def measure_dropped_frames(self, dropped_by_reader: int, dropped_by_processor: int,
+                               offered_to_processor: int = 0, processed: int = 0):
+        self.frames_dropped_by_reader += dropped_by_reader
+        self.frames_dropped_by_processor += dropped_by_processor
+        self.frames_offered_to_processor += offered_to_processor
+        self.frames_processed += processed
+
+    def measure_motion(self, motion_score: float, analysed: bool):
+        self.motion_score.add(motion_score)
+        if not analysed:
+            self.frames_skipped_by_motion += 1
+
     def measure_time_frame_acquisition(self, time_acquired_frame: float):
         self.time_frame_acquisition.add(time_acquired_frame)
 
@@ -64,6 +96,29 @@ class DataAggregator:
     def measure_people_with_raised_hands(self, people_raised_hand: int):
         self.people_with_raised_hands.add(people_raised_hand)
 
+    def merge_measures(self, other: 'DataAggregator'):
+        """Aggiunge le misure della scena calcolate da un altro aggregatore (es. quello del processo del modello).
+        I tempi e i frame scartati restano quelli misurati da questo aggregatore, ai tempi degli stadi vengono aggiunti
+        quelli eseguiti dall'altro."""
+        self.people_down.extend(other.people_down)
+        self.people_counter.extend(other.people_counter)
+        self.bikes_counter.extend(other.bikes_counter)
+        self.cars_counter.extend(other.cars_counter)
+        self.people_in_zone_counter.extend(other.people_in_zone_counter)
+        self.people_with_raised_hands.extend(other.people_with_raised_hands)
+        self.time_in_zone.extend(other.time_in_zone)
+
+        self.door_people_entered += other.door_people_entered
+        self.door_people_leaved += other.door_people_leaved
+        self.motion_score.extend(other.motion_score)
+        self.frames_skipped_by_motion += other.frames_skipped_by_motion
+        self.stage_latency.merge(other.stage_latency)
+
+        if other.people_in_zone_counter.length > 0:
+            self.min_time_in_zone = other.min_time_in_zone
+            self.max_time_in_zone = other.max_time_in_zone
+            self.avg_time_in_zone = other.avg_time_in_zone
+
     @property
     def time_frame_acquisition_average(self) -> float:
         return self.time_frame_acquisition.average
@@ -72,6 +127,11 @@ class DataAggregator:
     def time_frame_processing_average(self) -> float:
         return self.time_frame_processing.average
 
+    @property
+    def processor_drop_ratio(self) -> float:
+        """Frazione dei frame offerti al processor che sono stati scartati."""
+        return self.frames_dropped_by_processor / max(self.frames_offered_to_processor, 1)
+
     @property
     def aggregation_size(self) -> float:
         return self.time_frame_processing.length
@@ -86,6 +146,12 @@ class DataAggregator:
         copied_instance.people_in_zone_counter = self.people_in_zone_counter.copy()
         copied_instance.door_people_entered = self.door_people_entered
         copied_instance.door_people_leaved = self.door_people_leaved
+        copied_instance.frames_dropped_by_reader = self.frames_dropped_by_reader
+        copied_instance.frames_dropped_by_processor = self.frames_dropped_by_processor
+        copied_instance.frames_offered_to_processor = self.frames_offered_to_processor
+        copied_instance.frames_processed = self.frames_processed
+        copied_instance.motion_score = self.motion_score.copy()
+        copied_instance.frames_skipped_by_motion = self.frames_skipped_by_motion
 
         copied_instance.min_time_in_zone = self.min_time_in_zone
         copied_instance.max_time_in_zone = self.max_time_in_zone
@@ -94,6 +160,7 @@ class DataAggregator:
         copied_instance.time_frame_source_declared = self.time_frame_source_declared
         copied_instance.time_frame_acquisition = self.time_frame_acquisition.copy()
         copied_instance.time_frame_processing = self.time_frame_processing.copy()
+        copied_instance.stage_latency = self.stage_latency.copy()
         copied_instance.people_with_raised_hands = self.people_with_raised_hands.copy()
 
         return copied_instance
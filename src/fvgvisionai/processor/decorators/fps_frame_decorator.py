@@ -7,10 +7,11 @@ from fvgvisionai.processor.decorators.abstract_frame_decorator import AbstractFr
 class FpsFrameDecorator(AbstractFrameDecorator):
     def __init__(self,
                  sample_text="MDL: 00000 fps, 00000 ms"):
-        super().__init__(FrameDecoratorPosition.BOTTOM_RIGHT, sample_text, row=3)
+        super().__init__(FrameDecoratorPosition.BOTTOM_RIGHT, sample_text, row=4)
 
     def draw(self, frame: ndarray,
-             input_time_ms: float, stream_time_ms: float, process_time_ms: float, output_fps: float):
+             input_time_ms: float, stream_time_ms: float, process_time_ms: float, output_fps: float,
+             processor_drop_ratio: float = 0.0):
         cv2.rectangle(frame, (
             self.text_start_x - self.text_row_spacing,
             self.text_start_y - self.text_height - self.text_row_spacing),
@@ -30,3 +31,8 @@ class FpsFrameDecorator(AbstractFrameDecorator):
                     cv2.FONT_HERSHEY_SIMPLEX,
                     self._font_scale,
                     (255, 255, 255), self._font_thickness, lineType=cv2.LINE_AA)
+        cv2.putText(frame, f"DRP: {processor_drop_ratio * 100:#5.1f} %",
+                    (self.text_start_x, self.text_start_y + (self.text_height + self.text_row_spacing) * 3),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    self._font_scale,
+                    (255, 255, 255), self._font_thickness, lineType=cv2.LINE_AA)
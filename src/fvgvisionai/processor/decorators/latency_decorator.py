@@ -0,0 +1,38 @@
+import cv2
+from numpy import ndarray
+
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
+from fvgvisionai.processor.decorators.abstract_frame_decorator import AbstractFrameDecorator, FrameDecoratorPosition
+
+# righe occupate dal box dell'ora, sopra a questo box
+TIME_BOX_ROWS = 2
+
+
+class LatencyFrameDecorator(AbstractFrameDecorator):
+    def __init__(self,
+                 sample_text="HLS_WRITE 0000.0 0000.0 0000.0 0000.0"):
+        super().__init__(FrameDecoratorPosition.TOP_RIGHT, sample_text, row=len(LatencyStage) + 1)
+
+    def init_image_size(self, image_width: int, image_height: int):
+        super().init_image_size(image_width, image_height)
+        self.text_start_y += (self.text_height + self.text_row_spacing) * TIME_BOX_ROWS
+
+    def draw(self, frame: ndarray, stage_latency: StageLatency):
+        cv2.rectangle(frame, (
+            self.text_start_x - self.text_row_spacing,
+            self.text_start_y),
+                      (self.image_out_width,
+                       self.text_start_y + (self.text_height + self.text_row_spacing) * (self.text_row + 1)),
+                      (0, 0, 0), -1)
+
+        lines = [f"{'ms':9s} {'p50':>6s} {'p95':>6s} {'p99':>6s} {'max':>6s}"]
+        for stage in LatencyStage:
+            p50, p95, p99, max_value = stage_latency.percentiles(stage)
+            lines.append(f"{stage.name:9s} {p50:6.1f} {p95:6.1f} {p99:6.1f} {max_value:6.1f}")
+
+        for index, element in enumerate(lines):
+            cv2.putText(frame, element,
+                        (self.text_start_x,
+                         self.text_start_y + (self.text_height + self.text_row_spacing) * (index + 1)),
+                        cv2.FONT_HERSHEY_SIMPLEX, self._font_scale,
+                        (255, 255, 255), self._font_thickness, lineType=cv2.LINE_AA)
@@ -5,7 +5,7 @@ from numpy import ndarray
 
 from fvgvisionai.processor.categories import ModelCategory
 from fvgvisionai.processor.decorators.abstract_frame_decorator import AbstractFrameDecorator, FrameDecoratorPosition
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.detections import Detections
 from fvgvisionai.processor.subprocessors.detected_object_sub_processor import format_duration
 from fvgvisionai.processor.subprocessors.in_zone_sub_processor import AlarmStatus
 
@@ -35,7 +35,7 @@ class ObjectCounterDecorator(AbstractFrameDecorator):
         self._scenario_raise_hands_enabled = scenario_raise_hands_enabled
 
     def draw(self, frame: ndarray,
-             detected_objects: List[DetectedObject],
+             detected_objects: Detections,
              in_zone_people: int,
              in_zone_avg_time: int,
              people_entering: int, people_leaving: int,
@@ -46,7 +46,7 @@ class ObjectCounterDecorator(AbstractFrameDecorator):
         lines_and_status: List[tuple] = []
 
         for category in self._show_category_list:
-            counter = sum(1 for obj in detected_objects if obj.label_num == category.model_class)
+            counter = detected_objects.count(category.model_class)
             category_string = f"{category.label.title()} #:".ljust(10)
             counter_string = f"{counter:3d}"
             lines_and_status.append((category_string, counter_string, default_color))
@@ -5,7 +5,7 @@ from numpy import ndarray
 
 from fvgvisionai.processor.categories import ModelCategory
 from fvgvisionai.processor.decorators.abstract_frame_decorator import AbstractFrameDecorator, FrameDecoratorPosition
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.detections import Detections
 from fvgvisionai.processor.subprocessors.in_zone_sub_processor import AlarmStatus
 
 
@@ -19,7 +19,7 @@ class ParkingDecorator(AbstractFrameDecorator):
         self._show_category_set = set(obj.model_class for obj in show_category)
 
     def draw(self, frame: ndarray,
-             detected_objects: List[DetectedObject],
+             detected_objects: Detections,
              in_zone_people: int,
              in_zone_avg_time: int,
              people_entering: int, people_leaving: int,
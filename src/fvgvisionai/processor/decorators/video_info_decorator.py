@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 import cv2
 from numpy import ndarray
@@ -33,7 +33,8 @@ class VideoInfoDecorator(AbstractFrameDecorator):
         self._zone_enabled = zone_enabled
         self._door_enabled = door_enabled
 
-    def draw(self, frame: ndarray, image_source_width, image_source_height, model_width: int, model_height: int):
+    def draw(self, frame: ndarray, image_source_width, image_source_height, model_width: int, model_height: int,
+             motion_info: Optional[str] = None):
         cv2.rectangle(frame,
                       (self.text_start_x, self.text_start_y - self.text_height - self.text_baseline),
                       (self.text_start_x + self.text_width,
@@ -50,6 +51,8 @@ class VideoInfoDecorator(AbstractFrameDecorator):
             f"IN res:   {image_source_width:4d} x {image_source_height:4d}",
             f"MDL res: {model_width:4d} x {model_height:4d}",
             f"OUT res: {self.image_out_width:4d} x {self.image_out_height:4d}"]
+        if motion_info is not None:
+            lines.append(f"MOTION: {motion_info}")
 
         for index, element in enumerate(lines):
             cv2.putText(frame, element,
@@ -1,48 +1,138 @@
-from typing import List, Optional
+from typing import List, Optional, TYPE_CHECKING
 
-from numpy import int32
-from ultralytics.engine.results import Keypoints
+from numpy import ndarray
+
+from fvgvisionai.processor.categories import categories_dict
+
+if TYPE_CHECKING:
+    from fvgvisionai.processor.detections import Detections
 
 
 class DetectedObject:
-    def __init__(self, object_id: int, label_num: int, label_str: str, color: list, conf: float, bbox_xy: List[int32],
-                 bbox_wh: List[int32], keypoints: Optional[Keypoints]) -> None:
+    __slots__ = ("_detections", "_index")
+
+    def __init__(self, detections: 'Detections', index: int) -> None:
         """
-        class of objects detected by the object detection algorithm
+        view on a single object detected by the object detection algorithm, stored in a Detections row
 
         attributes:
-            __init__ id: id assigned to object, useful only with tracking
-            __init__ label_num: number of object category
-            __init__ label_str: label of object category
-            __init__ conf: confidence of the detection
-            __init__ bbox_xy: bounding box corners coordinates [x1,y1,x2,y2]
-            __init__ bbox_wh: bounding box center and width/height [x,y,w,h]
-            TODO
-            is_down: bool variable telling if person is on the ground
+            id: id assigned to object, useful only with tracking
+            label_num: number of object category
+            label_str: label of object category
+            conf: confidence of the detection
+            bbox_xy: bounding box corners coordinates [x1,y1,x2,y2]
+            bbox_wh: bounding box center and width/height [x,y,w,h]
+            keypoints: pose keypoints [x,y,conf] at model resolution, only with pose enabled
             is_in_zone: bool variable telling if object is inside zone
             time_in_zone: amount of time inside the zone
-            info: empty dict to fill with object's information
         """
-        self.id = object_id
-        self.label_num = label_num
-        self.label_str = label_str
-        self.conf = conf
-        self.color = color
-        self.bbox_xy = bbox_xy  # left upper corner and right lower corner
-        self.bbox_wh = bbox_wh  # center of bbox together with width and height
-        self.keypoints: Optional[Keypoints] = keypoints
-        self.track = []
-        self.is_moving = False
-        self.direction = "-"
-        self.speed = 0
-        self.is_down = False
-        self.is_in_zone = False
-        self.time_in_zone = 0
-        self.info = {}
-
-        self.raised_hands = False
-        self.is_door_entering_zone = False
-        self.is_door_leaving_zone = False
-
-        self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2 = self.bbox_xy
-        self.bbox_x, self.bbox_y, self.bbox_w, self.bbox_h = self.bbox_wh
+        self._detections = detections
+        self._index = index
+
+    @property
+    def id(self) -> int:
+        return int(self._detections.ids[self._index])
+
+    @property
+    def label_num(self) -> int:
+        return int(self._detections.cls[self._index])
+
+    @property
+    def label_str(self) -> str:
+        return categories_dict[self.label_num].label
+
+    @property
+    def color(self) -> list:
+        return list(categories_dict[self.label_num].color)
+
+    @property
+    def conf(self) -> float:
+        return float(self._detections.conf[self._index])
+
+    @property
+    def bbox_xy(self) -> List[float]:
+        # left upper corner and right lower corner
+        return self._detections.xyxy[self._index].tolist()
+
+    @property
+    def bbox_wh(self) -> List[float]:
+        # center of bbox together with width and height
+        return self._detections.xywh[self._index].tolist()
+
+    @property
+    def bbox_x1(self) -> float:
+        return self._detections.xyxy[self._index, 0]
+
+    @property
+    def bbox_y1(self) -> float:
+        return self._detections.xyxy[self._index, 1]
+
+    @property
+    def bbox_x2(self) -> float:
+        return self._detections.xyxy[self._index, 2]
+
+    @property
+    def bbox_y2(self) -> float:
+        return self._detections.xyxy[self._index, 3]
+
+    @property
+    def bbox_x(self) -> float:
+        return self._detections.xywh[self._index, 0]
+
+    @property
+    def bbox_y(self) -> float:
+        return self._detections.xywh[self._index, 1]
+
+    @property
+    def bbox_w(self) -> float:
+        return self._detections.xywh[self._index, 2]
+
+    @property
+    def bbox_h(self) -> float:
+        return self._detections.xywh[self._index, 3]
+
+    @property
+    def keypoints(self) -> Optional[ndarray]:
+        if self._detections.keypoints is None:
+            return None
+        return self._detections.keypoints[self._index]
+
+    @property
+    def is_in_zone(self) -> bool:
+        return bool(self._detections.is_in_zone[self._index])
+
+    @is_in_zone.setter
+    def is_in_zone(self, value: bool):
+        self._detections.is_in_zone[self._index] = value
+
+    @property
+    def time_in_zone(self) -> int:
+        return int(self._detections.time_in_zone[self._index])
+
+    @time_in_zone.setter
+    def time_in_zone(self, value: int):
+        self._detections.time_in_zone[self._index] = value
+
+    @property
+    def raised_hands(self) -> bool:
+        return bool(self._detections.raised_hands[self._index])
+
+    @raised_hands.setter
+    def raised_hands(self, value: bool):
+        self._detections.raised_hands[self._index] = value
+
+    @property
+    def is_door_entering_zone(self) -> bool:
+        return bool(self._detections.is_door_entering_zone[self._index])
+
+    @is_door_entering_zone.setter
+    def is_door_entering_zone(self, value: bool):
+        self._detections.is_door_entering_zone[self._index] = value
+
+    @property
+    def is_door_leaving_zone(self) -> bool:
+        return bool(self._detections.is_door_leaving_zone[self._index])
+
+    @is_door_leaving_zone.setter
+    def is_door_leaving_zone(self, value: bool):
+        self._detections.is_door_leaving_zone[self._index] = value
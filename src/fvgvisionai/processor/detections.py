@@ -0,0 +1,115 @@
+from typing import Iterable, List, Optional
+
+import numpy as np
+from numpy import ndarray
+
+from fvgvisionai.processor.detected_object import DetectedObject
+
+# keypoint coco del modello pose, ognuno con x, y e confidenza
+POSE_KEYPOINTS_SHAPE = (17, 3)
+
+
+class Detections:
+    """Detection di un frame memorizzate per colonne: un array numpy contiguo per ogni attributo.
+
+    Coordinate dei box gia' riportate alla risoluzione del frame sorgente, keypoint (N, 17, 3) in float16 alla
+    risoluzione del modello.
+    Lo stato calcolato dagli scenari (zona, porta, mani alzate) e' anch'esso per colonne; DetectedObject e' solo una
+    vista su una riga, da creare dove serve disegnare il singolo oggetto.
+    """
+
+    __slots__ = ("xyxy", "xywh", "cls", "conf", "ids", "keypoints",
+                 "is_in_zone", "time_in_zone", "raised_hands", "is_door_entering_zone", "is_door_leaving_zone",
+                 "_class_counts")
+
+    def __init__(self, xyxy: ndarray, xywh: ndarray, cls: ndarray, conf: ndarray, ids: ndarray,
+                 keypoints: Optional[ndarray] = None):
+        self.xyxy = xyxy
+        self.xywh = xywh
+        self.cls = cls
+        self.conf = conf
+        self.ids = ids
+        self.keypoints = keypoints
+
+        size = len(cls)
+        self.is_in_zone = np.zeros(size, dtype=bool)
+        self.time_in_zone = np.zeros(size, dtype=np.int64)
+        self.raised_hands = np.zeros(size, dtype=bool)
+        self.is_door_entering_zone = np.zeros(size, dtype=bool)
+        self.is_door_leaving_zone = np.zeros(size, dtype=bool)
+
+        # conteggio per classe calcolato una sola volta per frame
+        self._class_counts = np.bincount(cls)
+
+    @staticmethod
+    def empty(pose_enabled: bool = False) -> 'Detections':
+        return Detections(xyxy=np.empty((0, 4)), xywh=np.empty((0, 4)),
+                          cls=np.empty(0, dtype=np.int64), conf=np.empty(0), ids=np.empty(0, dtype=np.int64),
+                          keypoints=np.empty((0,) + POSE_KEYPOINTS_SHAPE, dtype=np.float16) if pose_enabled else None)
+
+    @staticmethod
+    def from_results(list_res_detect: list, ratio_width: float, ratio_height: float,
+                     pose_enabled: bool, offset_x: float = 0, offset_y: float = 0) -> 'Detections':
+        """Costruisce le detection dai Results di ultralytics, con un'unica scalatura vettoriale dei box dalla
+        risoluzione del modello a quella del frame sorgente. L'offset e' l'origine nel frame sorgente della regione
+        analizzata, se il modello ha ricevuto solo una parte del frame."""
+        if len(list_res_detect) == 0:
+            return Detections.empty(pose_enabled)
+
+        xyxy_list, xywh_list, cls_list, conf_list, ids_list, keypoints_list = [], [], [], [], [], []
+        for element in list_res_detect:
+            boxes = element.boxes.numpy()
+            cls = boxes.cls.astype(np.int64)
+
+            xyxy_list.append(boxes.xyxy)
+            xywh_list.append(boxes.xywh)
+            cls_list.append(cls)
+            conf_list.append(boxes.conf)
+            # senza tracking l'id dell'oggetto e' la sua classe
+            ids_list.append(cls if boxes.id is None else boxes.id.astype(np.int64))
+            if pose_enabled:
+                if element.keypoints is not None:
+                    # i keypoint con confidenza bassa sono gia' azzerati da ultralytics
+                    keypoints_list.append(element.keypoints.data.numpy().astype(np.float16))
+                else:
+                    keypoints_list.append(np.zeros((len(cls),) + POSE_KEYPOINTS_SHAPE, dtype=np.float16))
+
+        # le coordinate sono troncate alla risoluzione del modello e poi scalate, come per i box disegnati
+        ratio = np.array([ratio_width, ratio_height, ratio_width, ratio_height])
+        xyxy = np.concatenate(xyxy_list).astype(np.int32) * ratio + np.array([offset_x, offset_y, offset_x, offset_y])
+        xywh = np.concatenate(xywh_list).astype(np.int32) * ratio + np.array([offset_x, offset_y, 0, 0])
+
+        return Detections(xyxy=xyxy, xywh=xywh,
+                          cls=np.concatenate(cls_list),
+                          conf=np.round(np.concatenate(conf_list), 2),
+                          ids=np.concatenate(ids_list),
+                          keypoints=np.concatenate(keypoints_list) if pose_enabled else None)
+
+    @staticmethod
+    def from_boxes(xyxy: ndarray, cls: ndarray, conf: ndarray, ids: ndarray,
+                   keypoints: Optional[ndarray] = None) -> 'Detections':
+        """Costruisce le detection da box x1, y1, x2, y2 gia' alla risoluzione del frame sorgente."""
+        xywh = np.concatenate(((xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]), axis=1)
+        return Detections(xyxy=xyxy, xywh=xywh, cls=cls, conf=conf, ids=ids, keypoints=keypoints)
+
+    def __len__(self) -> int:
+        return len(self.cls)
+
+    def count(self, model_class: int) -> int:
+        if model_class >= len(self._class_counts):
+            return 0
+        return int(self._class_counts[model_class])
+
+    def indexes_of(self, model_classes: Iterable[int]) -> ndarray:
+        return np.flatnonzero(np.isin(self.cls, list(model_classes)))
+
+    def feet_points(self, indexes: ndarray) -> ndarray:
+        """Punto in basso al centro del box (i piedi) degli oggetti indicati, come coordinate x, y intere."""
+        x, y, _, h = self.xywh[indexes].T
+        return np.stack((x, y + (h / 2).astype(np.int32)), axis=1).astype(np.int32)
+
+    def view(self, index: int) -> DetectedObject:
+        return DetectedObject(self, index)
+
+    def views_of(self, model_classes: Iterable[int]) -> List[DetectedObject]:
+        return [DetectedObject(self, index) for index in self.indexes_of(model_classes)]
@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+import traceback
+from typing import Callable, List, Optional
+
+from numpy import ndarray
+
+from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_pool import FrameLease, release_lease
+from fvgvisionai.common.frame_tracer import TRACER
+
+PIPELINE_STAGE_NAMES = ["inference", "analytics", "rendering"]
+PIPELINE_POLL_TIME_IN_SEC = 0.5
+
+
+class PipelineFrame:
+    """Frame in transito nella pipeline, con i risultati degli stadi gia' eseguiti."""
+
+    __slots__ = ("frame_index", "frame", "acquisition_time", "model_frame", "frame_lease", "output_lease",
+                 "inference", "analysis", "stage_times", "failed")
+
+    def __init__(self, frame_index: int, frame: Optional[ndarray], acquisition_time: int,
+                 model_frame: Optional[ndarray], frame_lease: Optional[FrameLease]):
+        self.frame_index = frame_index
+        self.frame = frame
+        self.acquisition_time = acquisition_time
+        self.model_frame = model_frame
+        self.frame_lease = frame_lease
+        self.output_lease: Optional[FrameLease] = None
+        self.inference = None
+        self.analysis = None
+        self.stage_times: List[float] = []
+        self.failed = False
+
+    def release(self):
+        """Rilascia i lease ancora posseduti dal frame; quello pubblicato sul triple buffer va prima azzerato."""
+        release_lease(self.frame_lease)
+        release_lease(self.output_lease)
+        self.frame_lease = None
+        self.output_lease = None
+
+
+class FramePipeline:
+    """Esecuzione concorrente degli stadi di elaborazione: inferenza, analisi e disegno.
+
+    Ogni stadio ha un proprio thread e riceve i frame dallo stadio precedente tramite una coda di un solo elemento:
+    mentre il modello analizza il frame N, l'analisi elabora il frame N-1 ed il disegno il frame N-2. Con un solo
+    thread per stadio i frame attraversano gli stadi nell'ordine di arrivo, per cui tracker e contatori li ricevono in
+    sequenza. Se lo stadio di inferenza e' occupato il frame in ingresso viene scartato.
+    """
+
+    def __init__(self, stages: List[Callable[[PipelineFrame], None]],
+                 on_complete: Callable[[PipelineFrame], None], camera_index: int = 0):
+        self._logger = logging.getLogger(__name__)
+        self._camera_index = camera_index
+        self._stages = stages
+        self._on_complete = on_complete
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=1) for _ in stages]
+        self._threads: List[threading.Thread] = []
+        self._exit = threading.Event()
+
+    @property
+    def max_frames_in_flight(self) -> int:
+        # un frame in ogni coda ed uno in elaborazione in ogni stadio
+        return 2 * len(self._stages)
+
+    @property
+    def stage_names(self) -> List[str]:
+        return PIPELINE_STAGE_NAMES[:len(self._stages)]
+
+    def queued_frames(self) -> List[PipelineFrame]:
+        """Frame in attesa davanti agli stadi, senza prelevarli."""
+        return [frame for stage_queue in self._queues for frame in list(stage_queue.queue)]
+
+    def queue_size(self, index: int) -> int:
+        """Frame in attesa davanti allo stadio indicato."""
+        return self._queues[index].qsize()
+
+    def start(self):
+        for index, name in enumerate(self.stage_names):
+            thread = threading.Thread(target=self._run_stage, args=(index,), name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, frame: PipelineFrame) -> bool:
+        """Accoda il frame al primo stadio; False se lo stadio ha gia' un frame in attesa."""
+        try:
+            self._queues[0].put_nowait(frame)
+            return True
+        except queue.Full:
+            return False
+
+    def stop(self):
+        self._exit.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        # i frame rimasti nelle code non verranno elaborati
+        for stage_queue in self._queues:
+            while not stage_queue.empty():
+                stage_queue.get_nowait().release()
+        self._exit.clear()
+
+    def _run_stage(self, index: int):
+        stage = self._stages[index]
+        stage_name = self.stage_names[index]
+        last_stage = index == len(self._stages) - 1
+        timer = AppTimer()
+
+        while not self._exit.is_set():
+            try:
+                frame: PipelineFrame = self._queues[index].get(timeout=PIPELINE_POLL_TIME_IN_SEC)
+            except queue.Empty:
+                continue
+
+            timer.start()
+            trace_start = TRACER.begin()
+            try:
+                if not frame.failed:
+                    stage(frame)
+            except Exception as e:
+                # il frame prosegue comunque, per il conteggio e per rilasciare i lease
+                frame.failed = True
+                self._logger.error("Unexpected error %s " % e)
+                traceback.print_exc()
+            frame.stage_times.append(timer.stop())
+            TRACER.end(stage_name, trace_start, frame.frame_index, self._camera_index)
+
+            if not last_stage:
+                self._forward(index + 1, frame)
+                continue
+
+            try:
+                self._on_complete(frame)
+            except Exception as e:
+                self._logger.error("Unexpected error %s " % e)
+                traceback.print_exc()
+            finally:
+                frame.release()
+
+    def _forward(self, index: int, frame: PipelineFrame):
+        # lo stadio attende quello successivo, cosi' la pipeline non accumula frame oltre le code
+        while not self._exit.is_set():
+            try:
+                self._queues[index].put(frame, timeout=PIPELINE_POLL_TIME_IN_SEC)
+                return
+            except queue.Full:
+                continue
+        frame.release()
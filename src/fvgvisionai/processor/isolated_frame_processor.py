@@ -0,0 +1,301 @@
+import logging
+import multiprocessing
+import queue
+import time
+import traceback
+from typing import Optional
+
+import numpy as np
+from numpy import ndarray
+
+from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
+from fvgvisionai.common.shared_frame_ring import SharedFrameRing
+from fvgvisionai.common.stage_latency import StageLatency
+from fvgvisionai.common.triple_buffer import TripleBuffer
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.config.colored_formatter import ColoredFormatter
+from fvgvisionai.notify.notification_client import NotificationClient
+from fvgvisionai.processor.abstract_frame_processor import AbstractFrameProcessor
+from fvgvisionai.processor.data_aggregator import DataAggregator
+from fvgvisionai.processor.subprocessors.in_zone_sub_processor import AlarmStatus
+
+# canali per pixel del formato bgr24
+FRAME_CHANNELS = 3
+
+# Un solo slot per direzione: ogni richiesta attende la propria risposta prima della successiva ed il processo del
+# modello elabora le richieste in ordine, per cui non legge ne' scrive lo slot mentre il processo principale lo usa.
+# Solo una richiesta scaduta puo' trovare lo slot di input sovrascritto, ma la sua risposta viene comunque scartata.
+SHARED_RING_SLOTS = 1
+SHARED_RING_SLOT = 0
+
+# il caricamento del modello (e l'eventuale conversione tensorrt) puo' richiedere diversi minuti
+WORKER_START_TIMEOUT_IN_SEC = 600
+WORKER_RESPONSE_TIMEOUT_IN_SEC = 30
+WORKER_STOP_TIMEOUT_IN_SEC = 5
+WAIT_TIME_IN_SEC = 0.5
+
+# attesa prima di riavviare il processo del modello terminato, raddoppiata ad ogni avvio fallito
+WORKER_RESTART_BACKOFF_IN_SEC = 5
+WORKER_RESTART_MAX_BACKOFF_IN_SEC = 300
+
+WORKER_READY_MESSAGE = "ready"
+
+
+def run_inference_worker(app_settings: AppSettings, video_width: int, video_height: int,
+                         source_frame_rate_declared: int, input_ring_name: str, output_ring_name: str,
+                         request_queue: multiprocessing.Queue, response_queue: multiprocessing.Queue):
+    """Corpo del processo del modello: legge i frame dal ring di input e scrive i frame annotati nel ring di output."""
+    # il processo e' avviato con spawn, per cui il logging va configurato di nuovo
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.getLevelName(app_settings.logging_level))
+    ch.setFormatter(ColoredFormatter())
+    root_logger.addHandler(ch)
+    logger = logging.getLogger(__name__)
+
+    # torch e ultralytics vengono caricati solo nel processo del modello
+    from fvgvisionai.processor.ultralytics_processor import UltralyticsFrameProcessor
+
+    shape = (video_height, video_width, FRAME_CHANNELS)
+    input_ring = SharedFrameRing(shape, SHARED_RING_SLOTS, input_ring_name)
+    output_ring = SharedFrameRing(shape, SHARED_RING_SLOTS, output_ring_name)
+    try:
+        processor = UltralyticsFrameProcessor(TripleBuffer(), None, None, app_settings)
+        processor.setup_video_parameters(video_width, video_height, source_frame_rate_declared)
+        response_queue.put(WORKER_READY_MESSAGE)
+        logger.info(f"inference process is ready for {video_width}x{video_height} frames")
+
+        while True:
+            request = request_queue.get()
+            if request is None:
+                break
+            (request_id, frame_index, time_frame_acquisition, time_frame_processing,
+             last_frame_processing_time) = request
+
+            # le misure della scena vengono restituite per ogni frame, i tempi servono solo al box fps
+            data_aggregator = DataAggregator()
+            data_aggregator.time_frame_source_declared = source_frame_rate_declared
+            data_aggregator.measure_time_frame_acquisition(time_frame_acquisition)
+            data_aggregator.measure_time_frame_processing(time_frame_processing)
+
+            # il tempo di elaborazione e' misurato dal processo principale: il controllo della latenza riceve quello
+            # dell'ultimo frame, come nel processo principale, e non la media usata dal box fps
+            if last_frame_processing_time is not None:
+                processor.measure_processing_time(last_frame_processing_time)
+
+            output_frame = output_ring.frame(SHARED_RING_SLOT)
+            np.copyto(output_frame, input_ring.frame(SHARED_RING_SLOT))
+            try:
+                current_frame, zone_alarm_status, raised_hand_alarm_status = processor.analyse_frame(
+                    frame_index, output_frame, data_aggregator)
+            except Exception as e:
+                logger.error("Unexpected error %s " % e)
+                traceback.print_exc()
+                current_frame, zone_alarm_status, raised_hand_alarm_status = \
+                    None, AlarmStatus.NORMAL, AlarmStatus.NORMAL
+
+            annotated = current_frame is not None
+            if annotated and current_frame is not output_frame:
+                np.copyto(output_frame, current_frame)
+
+            response_queue.put((request_id, annotated, zone_alarm_status, raised_hand_alarm_status,
+                                data_aggregator))
+    except Exception as e:
+        logger.error("Unexpected error %s " % e)
+        traceback.print_exc()
+    finally:
+        input_ring.close()
+        output_ring.close()
+
+
+class IsolatedFrameProcessor(AbstractFrameProcessor):
+    """Processor che esegue UltralyticsFrameProcessor in un processo separato.
+
+    Il processo principale resta dedicato a lettura, output e notifiche: il modello non compete per il GIL con i
+    thread di I/O. I frame passano per due blocchi di shared memory di un frame (frame sorgente verso il modello,
+    frame annotati indietro), mentre sulle code viaggiano solo gli identificativi delle richieste, gli allarmi e le
+    misure della scena: le detection restano nel processo del modello, che disegna anche le annotazioni.
+
+    Lo scambio e' sincrono, un frame alla volta: il thread di elaborazione attende la risposta prima di inviare il
+    frame successivo, per cui le copie in shared memory e l'inferenza non si sovrappongono e il ritmo massimo e'
+    1 / (copia + analisi + copia di ritorno). In cambio il frame pubblicato e gli allarmi restano quelli del frame
+    appena consegnato, senza un frame di ritardo, come con il processor nel processo principale.
+    """
+
+    def __init__(self, buffer: TripleBuffer,
+                 notification_client: Optional[NotificationClient],
+                 benchmark_monitor: Optional[BenchmarkMonitor],
+                 app_settings: AppSettings,
+                 stage_latency: Optional[StageLatency] = None):
+        super().__init__(buffer=buffer,
+                         notification_client=notification_client,
+                         benchmark_monitor=benchmark_monitor,
+                         app_settings=app_settings,
+                         stage_latency=stage_latency)
+        # spawn e' richiesto da CUDA, il processo figlio non deve ereditare lo stato del processo principale
+        self._context = multiprocessing.get_context("spawn")
+        self._worker: Optional[multiprocessing.Process] = None
+        self._request_queue: Optional[multiprocessing.Queue] = None
+        self._response_queue: Optional[multiprocessing.Queue] = None
+        self._input_ring: Optional[SharedFrameRing] = None
+        self._output_ring: Optional[SharedFrameRing] = None
+
+        self._video_width = 0
+        self._video_height = 0
+        self._source_frame_rate_declared = 0
+        self._request_id = 0
+        # tempo di elaborazione dell'ultimo frame, inviato al controllo della latenza del processo del modello
+        self._last_processing_time: Optional[float] = None
+
+        # avvii falliti consecutivi e istante a partire dal quale si puo' ritentare
+        self._worker_start_failures = 0
+        self._next_worker_start = 0.0
+
+    def setup_video_parameters(self, video_width: int, video_height: int, source_frame_rate_declared: int):
+        super().setup_video_parameters(video_width, video_height, source_frame_rate_declared)
+
+        parameters_changed = (video_width, video_height, source_frame_rate_declared) != (
+            self._video_width, self._video_height, self._source_frame_rate_declared)
+        self._video_width = video_width
+        self._video_height = video_height
+        self._source_frame_rate_declared = source_frame_rate_declared
+
+        if parameters_changed:
+            # nuova sorgente: il processo va ricreato con le nuove dimensioni dei frame
+            self._worker_start_failures = 0
+            self._next_worker_start = 0.0
+            self._start_worker()
+        else:
+            self._ensure_worker()
+
+    def close(self):
+        super().close()
+        self._stop_worker()
+
+    def _evaluate_frame(self, frame_index: int, source_frame: ndarray,
+                        model_frame: Optional[ndarray] = None) -> (AlarmStatus, AlarmStatus):
+        # il frame del modello prodotto dal decoder non viene inviato, il processo del modello lo ricalcola
+        if not self._ensure_worker():
+            return AlarmStatus.NORMAL, AlarmStatus.NORMAL
+
+        self._request_id = (self._request_id + 1) % 1_000_000_000
+
+        np.copyto(self._input_ring.frame(SHARED_RING_SLOT), source_frame)
+        self._request_queue.put((self._request_id, frame_index,
+                                 self._data_aggregator.time_frame_acquisition_average,
+                                 self._data_aggregator.time_frame_processing_average,
+                                 self._last_processing_time))
+
+        response = self._wait_response(self._request_id)
+        if response is None:
+            return AlarmStatus.NORMAL, AlarmStatus.NORMAL
+
+        _, annotated, zone_alarm_status, raised_hand_alarm_status, worker_data_aggregator = response
+        self._data_aggregator.merge_measures(worker_data_aggregator)
+
+        if annotated:
+            # il triple buffer diventa possessore del lease
+            output_lease = self._acquire_output_lease(source_frame)
+            np.copyto(output_lease.frame, self._output_ring.frame(SHARED_RING_SLOT))
+            self._publish_frame(frame_index, output_lease.frame, output_lease)
+
+        return raised_hand_alarm_status, zone_alarm_status
+
+    def measure_processing_time(self, process_time: float):
+        super().measure_processing_time(process_time)
+        self._last_processing_time = process_time
+
+    def _wait_response(self, request_id: int) -> Optional[tuple]:
+        start_time = time.monotonic()
+        while time.monotonic() - start_time < WORKER_RESPONSE_TIMEOUT_IN_SEC:
+            try:
+                response = self._response_queue.get(timeout=WAIT_TIME_IN_SEC)
+            except queue.Empty:
+                if not self._is_worker_alive():
+                    self._logger.error("inference process is terminated")
+                    return None
+                continue
+
+            # le risposte in ritardo di richieste gia' scadute vengono scartate
+            if response[0] == request_id:
+                return response
+
+        self._logger.error(f"inference process did not answer in {WORKER_RESPONSE_TIMEOUT_IN_SEC} seconds")
+        return None
+
+    def _ensure_worker(self) -> bool:
+        """Riavvia il processo del modello se e' terminato, rispettando l'attesa tra un avvio fallito e l'altro:
+        ogni avvio puo' bloccare il thread di elaborazione fino a WORKER_START_TIMEOUT_IN_SEC."""
+        if self._is_worker_alive():
+            return True
+        if time.monotonic() < self._next_worker_start:
+            return False
+
+        self._logger.error("inference process is not running, restarting it")
+        if self._start_worker():
+            return True
+
+        self._worker_start_failures += 1
+        backoff = min(WORKER_RESTART_BACKOFF_IN_SEC * 2 ** (self._worker_start_failures - 1),
+                      WORKER_RESTART_MAX_BACKOFF_IN_SEC)
+        self._next_worker_start = time.monotonic() + backoff
+        self._logger.error(f"inference process will be restarted in {backoff} seconds")
+        return False
+
+    def _start_worker(self) -> bool:
+        self._stop_worker()
+
+        shape = (self._video_height, self._video_width, FRAME_CHANNELS)
+        self._input_ring = SharedFrameRing(shape, SHARED_RING_SLOTS)
+        self._output_ring = SharedFrameRing(shape, SHARED_RING_SLOTS)
+        self._request_queue = self._context.Queue()
+        self._response_queue = self._context.Queue()
+
+        self._worker = self._context.Process(target=run_inference_worker,
+                                             args=(self._app_settings, self._video_width, self._video_height,
+                                                   self._source_frame_rate_declared,
+                                                   self._input_ring.name, self._output_ring.name,
+                                                   self._request_queue, self._response_queue),
+                                             name='InferenceProcess')
+        self._worker.daemon = True
+        self._worker.start()
+        self._logger.info(f"inference process started with pid {self._worker.pid}")
+
+        start_time = time.monotonic()
+        while time.monotonic() - start_time < WORKER_START_TIMEOUT_IN_SEC:
+            try:
+                if self._response_queue.get(timeout=WAIT_TIME_IN_SEC) == WORKER_READY_MESSAGE:
+                    self._worker_start_failures = 0
+                    return True
+            except queue.Empty:
+                if not self._is_worker_alive():
+                    break
+
+        self._logger.error("inference process is not able to start")
+        self._stop_worker()
+        return False
+
+    def _stop_worker(self):
+        if self._worker is not None:
+            try:
+                if self._worker.is_alive():
+                    self._request_queue.put(None)
+                    self._worker.join(WORKER_STOP_TIMEOUT_IN_SEC)
+                if self._worker.is_alive():
+                    self._worker.terminate()
+                    self._worker.join(WORKER_STOP_TIMEOUT_IN_SEC)
+            except Exception as e:
+                self._logger.error(f"error stopping inference process: {e}")
+            finally:
+                self._worker = None
+
+        # il processo principale e' il proprietario dei ring e li rimuove
+        for ring in (self._input_ring, self._output_ring):
+            if ring is not None:
+                ring.close()
+        self._input_ring = None
+        self._output_ring = None
+
+    def _is_worker_alive(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
@@ -0,0 +1,96 @@
+import logging
+from typing import List, NamedTuple
+
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.config.app_settings_utils import ModelResolution
+
+# numero di elaborazioni misurate prima di ogni decisione
+MEASURE_WINDOW = 30
+
+# si torna al livello precedente solo con un buon margine, per evitare oscillazioni
+RECOVERY_RATIO = 0.5
+
+# passi della scala di degrado: frame saltati dal modello e frame annotati pubblicati in output
+SKIP_STRIDES = [2, 3]
+OUTPUT_STRIDES = [2, 3]
+
+
+class LatencyLevel(NamedTuple):
+    skip_stride: int
+    model_resolution: ModelResolution
+    output_stride: int
+
+
+class LatencyController:
+    """Controllo in retroazione del tempo di elaborazione dei frame.
+
+    Il budget e' una frazione (MODEL_LATENCY_TARGET) dell'intervallo tra i frame della sorgente. Se la media del tempo
+    di elaborazione lo supera si scende di un livello nella scala di degrado: prima si salta l'analisi di alcuni frame,
+    poi si riduce la risoluzione del modello ed infine si pubblicano meno frame annotati. Con margine sufficiente si
+    risale di un livello.
+    """
+
+    def __init__(self, app_settings: AppSettings, resolution_change_enabled: bool):
+        self._logger = logging.getLogger(__name__)
+        self._target = app_settings.model_latency_target
+
+        base_resolution = app_settings.model_resolution
+        resolutions = [base_resolution]
+        if resolution_change_enabled:
+            # solo le risoluzioni inferiori a quella configurata, dalla piu' grande alla piu' piccola
+            resolutions += sorted((resolution for resolution in ModelResolution
+                                   if resolution.value["resolution"][0] < base_resolution.value["resolution"][0]),
+                                  key=lambda resolution: resolution.value["resolution"][0], reverse=True)
+
+        self._levels: List[LatencyLevel] = [LatencyLevel(1, base_resolution, 1)]
+        self._levels += [LatencyLevel(stride, base_resolution, 1) for stride in SKIP_STRIDES]
+        self._levels += [LatencyLevel(SKIP_STRIDES[-1], resolution, 1) for resolution in resolutions[1:]]
+        self._levels += [LatencyLevel(SKIP_STRIDES[-1], resolutions[-1], stride) for stride in OUTPUT_STRIDES]
+
+        self._level_index = 0
+        self._budget = 0.0
+        self._measures: List[float] = []
+
+    @property
+    def level(self) -> LatencyLevel:
+        return self._levels[self._level_index]
+
+    @property
+    def level_index(self) -> int:
+        return self._level_index
+
+    def setup(self, source_frame_rate_declared: int):
+        # source_frame_rate_declared e' l'intervallo tra i frame in ms
+        self._budget = self._target * max(source_frame_rate_declared, 1)
+        self._measures = []
+        self._logger.info(f"latency budget is {self._budget:.1f} ms, {len(self._levels)} degradation levels")
+
+    def measure(self, process_time: float) -> bool:
+        """Registra il tempo di elaborazione di un frame e restituisce True se il livello e' cambiato."""
+        if self._budget <= 0:
+            return False
+
+        self._measures.append(process_time)
+        if len(self._measures) < MEASURE_WINDOW:
+            return False
+
+        average = sum(self._measures) / len(self._measures)
+        self._measures = []
+
+        if average > self._budget and self._level_index < len(self._levels) - 1:
+            self._change_level(self._level_index + 1, average)
+            return True
+        if average < self._budget * RECOVERY_RATIO and self._level_index > 0:
+            self._change_level(self._level_index - 1, average)
+            return True
+        return False
+
+    def _change_level(self, level_index: int, average: float):
+        previous = self.level
+        self._level_index = level_index
+        current = self.level
+        self._logger.warning(
+            f"processing time {average:.1f} ms with budget {self._budget:.1f} ms: latency level {level_index} "
+            f"(analysis 1/{previous.skip_stride} -> 1/{current.skip_stride}, "
+            f"model {previous.model_resolution.value['name']} -> {current.model_resolution.value['name']}, "
+            f"output 1/{previous.output_stride} -> 1/{current.output_stride})")
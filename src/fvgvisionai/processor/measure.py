@@ -1,99 +1,144 @@
-from typing import List
+import math
+from typing import Optional
+
+from fvgvisionai.common.log_histogram import LogHistogram
+
+
+class StreamingMeasure:
+    """Statistiche di una serie di valori calcolate al momento dell'inserimento, con memoria costante: numero, somma,
+    minimo, massimo, ultimo valore e varianza (algoritmo di Welford). Con quantiles=True i valori vengono registrati
+    anche in un LogHistogram per i percentili.
+
+    Due misure si uniscono senza i valori originali, per cui la copia ha sempre la stessa dimensione.
+    """
+
+    def __init__(self, quantiles: bool = False):
+        self._count = 0
+        self._sum = 0
+        self._min = 0
+        self._max = 0
+        self._last = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._histogram: Optional[LogHistogram] = LogHistogram() if quantiles else None
+
+    def add(self, value):
+        if self._count == 0:
+            self._min = value
+            self._max = value
+        elif value < self._min:
+            self._min = value
+        elif value > self._max:
+            self._max = value
+        self._count += 1
+        self._sum += value
+        self._last = value
+
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+        if self._histogram is not None:
+            self._histogram.record(value)
+
+    def extend(self, other: 'StreamingMeasure'):
+        if other._count == 0:
+            return
+        if self._count == 0:
+            self._min = other._min
+            self._max = other._max
+        else:
+            self._min = min(self._min, other._min)
+            self._max = max(self._max, other._max)
+
+        # unione delle varianze di Chan et al.
+        count = self._count + other._count
+        delta = other._mean - self._mean
+        self._mean += delta * other._count / count
+        self._m2 += other._m2 + delta * delta * self._count * other._count / count
+        self._count = count
+        self._sum += other._sum
+        self._last = other._last
+
+        if self._histogram is not None and other._histogram is not None:
+            self._histogram.merge(other._histogram)
 
+    def clear(self):
+        self._count = 0
+        self._sum = 0
+        self._min = 0
+        self._max = 0
+        self._last = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        if self._histogram is not None:
+            self._histogram.clear()
 
-class IntMeasure:
-    def __init__(self):
-        self._data: List[int] = []
+    @property
+    def max(self):
+        return self._max
 
-    def add(self, value: int):
-        self._data.append(value)
+    @property
+    def min(self):
+        return self._min
 
-    def clear(self, ):
-        self._data = []
+    @property
+    def sum(self):
+        return self._sum
 
     @property
-    def average(self) -> int:
-        if not self._data:
-            return 0
-        return round(sum(self._data) / len(self._data))
+    def length(self) -> int:
+        return self._count
 
     @property
-    def max(self) -> int:
-        if not self._data:
-            return 0
-        return max(self._data)
+    def last_value(self):
+        return self._last
 
     @property
-    def min(self) -> int:
-        if not self._data:
+    def variance(self) -> float:
+        if self._count < 2:
             return 0
-        return min(self._data)
+        return self._m2 / (self._count - 1)
 
     @property
-    def sum(self) -> int:
-        return sum(self._data)
+    def std_dev(self) -> float:
+        return math.sqrt(self.variance)
 
     @property
-    def length(self) -> int:
-        return len(self._data)
+    def histogram(self) -> Optional[LogHistogram]:
+        return self._histogram
 
-    @property
-    def last_value(self) -> int:
-        if not self._data:
+    def percentile(self, percentile: float) -> float:
+        """Percentile (0-100) dei valori; 0 se la misura non registra i percentili o e' vuota."""
+        if self._histogram is None:
             return 0
-        return self._data[-1]
+        return round(self._histogram.percentile(percentile), 2)
 
     def copy(self):
-        copied_instance = IntMeasure()
-        copied_instance._data = self._data.copy()  # Copia la lista _data
+        copied_instance = self.__class__()
+        copied_instance._count = self._count
+        copied_instance._sum = self._sum
+        copied_instance._min = self._min
+        copied_instance._max = self._max
+        copied_instance._last = self._last
+        copied_instance._mean = self._mean
+        copied_instance._m2 = self._m2
+        copied_instance._histogram = self._histogram.copy() if self._histogram is not None else None
 
         return copied_instance
 
 
-class FloatMeasure:
-    def __init__(self):
-        self._data: List[float] = []
-
-    def add(self, value: float):
-        self._data.append(value)
-
-    def clear(self):
-        self._data = []
-
+class IntMeasure(StreamingMeasure):
     @property
-    def average(self) -> float:
-        if not self._data:
-            return 0
-        return round(sum(self._data) / len(self._data), 2)
-
-    @property
-    def max(self) -> float:
-        if not self._data:
-            return 0
-        return max(self._data)
-
-    @property
-    def min(self) -> float:
-        if not self._data:
+    def average(self) -> int:
+        if self._count == 0:
             return 0
-        return min(self._data)
+        return round(self._sum / self._count)
 
-    @property
-    def sum(self) -> float:
-        return sum(self._data)
 
+class FloatMeasure(StreamingMeasure):
     @property
-    def length(self) -> int:
-        return len(self._data)
-
-    @property
-    def last_value(self) -> float:
-        if not self._data:
+    def average(self) -> float:
+        if self._count == 0:
             return 0
-        return self._data[-1]
-
-    def copy(self):
-        copied_instance = FloatMeasure()
-        copied_instance._data = self._data.copy()  # Copia la lista _data
-
-        return copied_instance
+        return round(self._sum / self._count, 2)
@@ -0,0 +1,128 @@
+from enum import Enum
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from numpy import ndarray
+
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.processor.crop_region import fit_crop_region
+
+# larghezza del frame ridotto su cui si calcola il movimento
+MOTION_FRAME_WIDTH = 160
+
+# differenza minima di luminosita' perche' un pixel sia considerato in movimento
+MOTION_PIXEL_THRESHOLD = 25
+
+# peso del frame corrente nella media mobile dello sfondo
+BACKGROUND_LEARNING_RATE = 0.05
+
+# margine attorno alla zona in movimento e dimensione minima del ritaglio, in frazione del frame
+CROP_MARGIN = 0.1
+CROP_MIN_FRACTION = 0.25
+
+# oltre questa frazione dell'area del frame il ritaglio non porta vantaggi e si usa il frame intero
+CROP_MAX_AREA_FRACTION = 0.6
+
+
+class MotionDecision(Enum):
+    MOTION = {"value": 0, "message": "MOTION", "analyse": True}
+    OBJECTS = {"value": 1, "message": "OBJECTS", "analyse": True}
+    REFRESH = {"value": 2, "message": "REFRESH", "analyse": True}
+    IDLE = {"value": 3, "message": "IDLE", "analyse": False}
+
+
+class MotionScheduler:
+    """Decide se analizzare il frame in base al movimento della scena, al posto della maschera MODEL_SKIP_FRAMES_MASK.
+
+    Il movimento e' la frazione di pixel che differiscono da uno sfondo a media mobile, calcolata su un frame ridotto in
+    scala di grigi. Il modello viene eseguito ad ogni frame se c'e' movimento o se ci sono oggetti rilevati, altrimenti
+    solo ogni MODEL_MOTION_IDLE_INTERVAL frame.
+    """
+
+    def __init__(self, app_settings: AppSettings):
+        self._threshold = app_settings.model_motion_threshold
+        self._idle_interval = max(1, app_settings.model_motion_idle_interval)
+        self._crop_enabled = app_settings.model_motion_crop_enabled
+        self._model_aspect_ratio = app_settings.model_width / app_settings.model_height
+
+        self._background: Optional[ndarray] = None
+        self._motion_mask: Optional[ndarray] = None
+        self._motion_score = 0.0
+        self._decision = MotionDecision.REFRESH
+        self._frames_since_analysis = 0
+
+    @property
+    def motion_score(self) -> float:
+        return self._motion_score
+
+    @property
+    def decision(self) -> MotionDecision:
+        return self._decision
+
+    def evaluate(self, frame: ndarray, objects_detected: bool) -> bool:
+        """Aggiorna lo sfondo con il frame e restituisce True se il frame deve essere analizzato dal modello."""
+        self._motion_score = self._compute_motion_score(frame)
+
+        if self._motion_score >= self._threshold:
+            self._decision = MotionDecision.MOTION
+        elif objects_detected:
+            self._decision = MotionDecision.OBJECTS
+        elif self._frames_since_analysis + 1 >= self._idle_interval:
+            # anche con la scena ferma il modello va eseguito ogni tanto, ad esempio per oggetti entrati lentamente
+            self._decision = MotionDecision.REFRESH
+        else:
+            self._decision = MotionDecision.IDLE
+
+        analyse = self._decision.value["analyse"]
+        self._frames_since_analysis = 0 if analyse else self._frames_since_analysis + 1
+        return analyse
+
+    def crop_region(self, frame_width: int, frame_height: int,
+                    boxes: ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Regione x1, y1, x2, y2 del frame da analizzare: la zona in movimento unita ai box degli oggetti rilevati,
+        allargata alle proporzioni del modello. None se va analizzato il frame intero."""
+        if not self._crop_enabled or self._decision == MotionDecision.REFRESH or self._motion_mask is None:
+            return None
+
+        points = cv2.findNonZero(self._motion_mask)
+        if points is None and len(boxes) == 0:
+            return None
+
+        scale = frame_width / self._motion_mask.shape[1]
+        regions = []
+        if points is not None:
+            x, y, w, h = cv2.boundingRect(points)
+            regions.append(np.array([x, y, x + w, y + h]) * scale)
+        if len(boxes) > 0:
+            regions.append(np.concatenate((boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0))))
+        regions = np.stack(regions)
+        x1, y1 = regions[:, :2].min(axis=0)
+        x2, y2 = regions[:, 2:].max(axis=0)
+
+        margin_x = CROP_MARGIN * frame_width
+        margin_y = CROP_MARGIN * frame_height
+        region = fit_crop_region(x1 - margin_x, y1 - margin_y, x2 + margin_x, y2 + margin_y,
+                                 frame_width, frame_height, self._model_aspect_ratio,
+                                 CROP_MIN_FRACTION * frame_width, CROP_MIN_FRACTION * frame_height)
+        x1, y1, x2, y2 = region
+        if (x2 - x1) * (y2 - y1) >= CROP_MAX_AREA_FRACTION * frame_width * frame_height:
+            return None
+        return region
+
+    def _compute_motion_score(self, frame: ndarray) -> float:
+        frame_height, frame_width = frame.shape[:2]
+        small_height = max(1, round(frame_height * MOTION_FRAME_WIDTH / frame_width))
+        small = cv2.resize(frame, (MOTION_FRAME_WIDTH, small_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._motion_mask = np.zeros(gray.shape, dtype=np.uint8)
+            return 0.0
+
+        difference = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, self._motion_mask = cv2.threshold(difference, MOTION_PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY)
+        cv2.accumulateWeighted(gray, self._background, BACKGROUND_LEARNING_RATE)
+
+        return cv2.countNonZero(self._motion_mask) / self._motion_mask.size
@@ -0,0 +1,253 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import yaml
+from numpy import ndarray
+
+from fvgvisionai.processor.box_utils import box_iou
+from fvgvisionai.processor.detections import Detections
+
+# deviazioni standard del rumore relative all'altezza del box (come in DeepSORT)
+STD_WEIGHT_POSITION = 1 / 20
+STD_WEIGHT_VELOCITY = 1 / 160
+
+# un nuovo track viene mostrato solo dopo la seconda associazione (tranne al primo frame analizzato)
+MIN_HITS = 2
+
+# le coordinate del box (cx, cy, w, h) sono filtrate indipendentemente, ognuna con stato (posizione, velocita')
+BOX_COORDINATES = 4
+
+
+def greedy_match(iou: ndarray, min_iou: float) -> (ndarray, ndarray):
+    """Associazione greedy per IoU decrescente; restituisce le coppie (righe, colonne) associate."""
+    iou = iou.copy()
+    rows, cols = [], []
+    while iou.size > 0:
+        row, col = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[row, col] < min_iou:
+            break
+        rows.append(row)
+        cols.append(col)
+        iou[row, :] = -1
+        iou[:, col] = -1
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+
+def xyxy_to_cxcywh(boxes: ndarray) -> ndarray:
+    return np.concatenate(((boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]), axis=1)
+
+
+def cxcywh_to_xyxy(boxes: ndarray) -> ndarray:
+    return np.concatenate((boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, :2] + boxes[:, 2:] / 2), axis=1)
+
+
+class MotionTracker:
+    """Tracker su CPU in stile ByteTrack, eseguito ad ogni frame.
+
+    Ogni track ha un filtro di Kalman a velocita' costante; le quattro coordinate del box sono filtrate in modo
+    indipendente, per cui predizione e correzione di tutti i track sono operazioni numpy vettoriali. Sui frame non
+    analizzati dal modello le posizioni sono predette, su quelli analizzati vengono corrette dalle detection associate
+    per IoU (prima quelle ad alta confidenza, poi le altre). Gli id dei track sono assegnati dal tracker.
+    """
+
+    def __init__(self, tracker_config_file: str, frame_rate: int):
+        with open(tracker_config_file, 'r') as file:
+            tracker_config = yaml.safe_load(file)
+
+        self._high_threshold = tracker_config["track_high_thresh"]
+        # detection con confidenza non superiore non vengono mai associate
+        self._low_threshold = tracker_config["track_low_thresh"]
+        self._new_track_threshold = tracker_config["new_track_thresh"]
+        # match_thresh e' la soglia sul costo 1 - IoU
+        self._min_iou = 1 - tracker_config["match_thresh"]
+        self._max_time_lost = max(1, round(frame_rate / 30 * tracker_config["track_buffer"]))
+
+        self._next_id = 1
+        self._last_frame_index: Optional[int] = None
+        self._first_update = True
+
+        self._mean = np.empty((0, BOX_COORDINATES, 2))
+        self._covariance = np.empty((0, BOX_COORDINATES, 2, 2))
+        self._ids = np.empty(0, dtype=np.int64)
+        self._cls = np.empty(0, dtype=np.int64)
+        self._conf = np.empty(0)
+        self._hits = np.empty(0, dtype=np.int64)
+        self._matched = np.empty(0, dtype=bool)
+        self._last_update_frame = np.empty(0, dtype=np.int64)
+        self._keypoints: Optional[ndarray] = None
+        self._keypoints_center = np.empty((0, 2))
+        # rapporto frame / modello con cui sono stati misurati i keypoint, che restano alla risoluzione del modello
+        self._keypoints_ratio = np.empty((0, 2))
+
+    @property
+    def track_count(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Byte occupati dagli stati dei track."""
+        arrays = [self._mean, self._covariance, self._ids, self._cls, self._conf, self._hits, self._matched,
+                  self._last_update_frame, self._keypoints_center, self._keypoints_ratio]
+        if self._keypoints is not None:
+            arrays.append(self._keypoints)
+        return sum(array.nbytes for array in arrays)
+
+    def predict(self, frame_index: int) -> Detections:
+        """Stima le posizioni dei track al frame indicato, senza detection."""
+        self._predict(frame_index)
+        return self._build_detections()
+
+    def update(self, frame_index: int, detections: Detections,
+               keypoints_ratio: Tuple[float, float] = (1.0, 1.0)) -> Detections:
+        """Stima le posizioni al frame indicato e le corregge con le detection del modello; keypoints_ratio e' il
+        rapporto tra le coordinate del frame e quelle del modello (larghezza, altezza) dei keypoint delle detection."""
+        self._predict(frame_index)
+
+        track_count = len(self._ids)
+        self._matched = np.zeros(track_count, dtype=bool)
+        detection_matched = np.zeros(len(detections), dtype=bool)
+
+        if track_count > 0 and len(detections) > 0:
+            iou = box_iou(cxcywh_to_xyxy(self._mean[:, :, 0]), detections.xyxy)
+            # si associano solo track e detection della stessa classe
+            iou[self._cls[:, None] != detections.cls[None, :]] = 0
+
+            high = detections.conf >= self._high_threshold
+            low = ~high & (detections.conf > self._low_threshold)
+            for selected in (high, low):
+                stage_iou = iou.copy()
+                stage_iou[self._matched, :] = 0
+                stage_iou[:, ~selected | detection_matched] = 0
+                rows, cols = greedy_match(stage_iou, self._min_iou)
+                self._correct(rows, cols, detections, frame_index, keypoints_ratio)
+                self._matched[rows] = True
+                detection_matched[cols] = True
+
+        # rimozione dei track persi da troppo tempo
+        alive = frame_index - self._last_update_frame <= self._max_time_lost
+        self._select_tracks(alive)
+
+        new_tracks = np.flatnonzero(~detection_matched & (detections.conf >= self._new_track_threshold))
+        self._create_tracks(new_tracks, detections, frame_index, keypoints_ratio)
+        self._first_update = False
+
+        return self._build_detections()
+
+    def _predict(self, frame_index: int):
+        steps = 1 if self._last_frame_index is None else max(0, frame_index - self._last_frame_index)
+        self._last_frame_index = frame_index
+        if steps == 0 or len(self._ids) == 0:
+            return
+
+        height = self._mean[:, 3, 0][:, None]
+        std_position = STD_WEIGHT_POSITION * height
+        std_velocity = STD_WEIGHT_VELOCITY * height
+
+        for _ in range(steps):
+            # x = F x, P = F P F' + Q con F = [[1, 1], [0, 1]], per tutti i track e tutte le coordinate
+            self._mean[:, :, 0] += self._mean[:, :, 1]
+            covariance = self._covariance
+            p00 = covariance[..., 0, 0] + covariance[..., 0, 1] + covariance[..., 1, 0] + covariance[..., 1, 1]
+            p01 = covariance[..., 0, 1] + covariance[..., 1, 1]
+            covariance[..., 0, 0] = p00 + std_position ** 2
+            covariance[..., 0, 1] = p01
+            covariance[..., 1, 0] = p01
+            covariance[..., 1, 1] += std_velocity ** 2
+
+        # il box non puo' avere dimensioni negative
+        self._mean[:, 2:, 0] = np.maximum(self._mean[:, 2:, 0], 1)
+
+    def _correct(self, rows: ndarray, cols: ndarray, detections: Detections, frame_index: int,
+                 keypoints_ratio: Tuple[float, float]):
+        if len(rows) == 0:
+            return
+
+        measurement = xyxy_to_cxcywh(detections.xyxy[cols])
+        mean = self._mean[rows]
+        covariance = self._covariance[rows]
+
+        # z = H x con H = [1, 0]: guadagno e correzione per ogni coordinate
+        measurement_variance = (STD_WEIGHT_POSITION * measurement[:, 3:4]) ** 2
+        innovation_variance = covariance[..., 0, 0] + measurement_variance
+        gain = covariance[..., :, 0] / innovation_variance[..., None]
+        innovation = measurement - mean[:, :, 0]
+        mean += gain * innovation[..., None]
+        covariance -= gain[..., :, None] * covariance[..., None, 0, :]
+
+        self._mean[rows] = mean
+        self._covariance[rows] = covariance
+        self._cls[rows] = detections.cls[cols]
+        self._conf[rows] = detections.conf[cols]
+        self._hits[rows] += 1
+        self._last_update_frame[rows] = frame_index
+        if self._keypoints is not None:
+            self._keypoints[rows] = detections.keypoints[cols]
+            self._keypoints_center[rows] = mean[:, :2, 0]
+            self._keypoints_ratio[rows] = keypoints_ratio
+
+    def _create_tracks(self, indexes: ndarray, detections: Detections, frame_index: int,
+                       keypoints_ratio: Tuple[float, float]):
+        count = len(indexes)
+        if count == 0:
+            return
+
+        measurement = xyxy_to_cxcywh(detections.xyxy[indexes])
+        mean = np.zeros((count, BOX_COORDINATES, 2))
+        mean[:, :, 0] = measurement
+        height = measurement[:, 3:4]
+        covariance = np.zeros((count, BOX_COORDINATES, 2, 2))
+        covariance[..., 0, 0] = (2 * STD_WEIGHT_POSITION * height) ** 2
+        covariance[..., 1, 1] = (10 * STD_WEIGHT_VELOCITY * height) ** 2
+
+        self._mean = np.concatenate((self._mean, mean))
+        self._covariance = np.concatenate((self._covariance, covariance))
+        self._ids = np.concatenate((self._ids, np.arange(self._next_id, self._next_id + count)))
+        self._next_id += count
+        self._cls = np.concatenate((self._cls, detections.cls[indexes]))
+        self._conf = np.concatenate((self._conf, detections.conf[indexes]))
+        # al primo frame analizzato i track sono subito confermati
+        hits = MIN_HITS if self._first_update else 1
+        self._hits = np.concatenate((self._hits, np.full(count, hits, dtype=np.int64)))
+        self._matched = np.concatenate((self._matched, np.ones(count, dtype=bool)))
+        self._last_update_frame = np.concatenate((self._last_update_frame, np.full(count, frame_index)))
+        if detections.keypoints is not None:
+            if self._keypoints is None:
+                self._keypoints = np.empty((0,) + detections.keypoints.shape[1:], dtype=detections.keypoints.dtype)
+            self._keypoints = np.concatenate((self._keypoints, detections.keypoints[indexes]))
+            self._keypoints_center = np.concatenate((self._keypoints_center, measurement[:, :2]))
+            self._keypoints_ratio = np.concatenate((self._keypoints_ratio, np.tile(keypoints_ratio, (count, 1))))
+
+    def _select_tracks(self, selected: ndarray):
+        self._mean = self._mean[selected]
+        self._covariance = self._covariance[selected]
+        self._ids = self._ids[selected]
+        self._cls = self._cls[selected]
+        self._conf = self._conf[selected]
+        self._hits = self._hits[selected]
+        self._matched = self._matched[selected]
+        self._last_update_frame = self._last_update_frame[selected]
+        if self._keypoints is not None:
+            self._keypoints = self._keypoints[selected]
+            self._keypoints_center = self._keypoints_center[selected]
+            self._keypoints_ratio = self._keypoints_ratio[selected]
+
+    def _build_detections(self) -> Detections:
+        # sono mostrati i track confermati ed associati all'ultimo frame analizzato
+        visible = (self._hits >= MIN_HITS) & self._matched
+        boxes = self._mean[visible, :, 0]
+
+        keypoints = None
+        if self._keypoints is not None:
+            # i keypoint seguono lo spostamento del centro del box, riportato dalle coordinate del frame a quelle
+            # del modello; quelli non definiti restano a (0, 0)
+            keypoints = self._keypoints[visible].copy()
+            shift = ((boxes[:, :2] - self._keypoints_center[visible]) /
+                     self._keypoints_ratio[visible]).astype(keypoints.dtype)
+            defined = (keypoints[..., 0] != 0) | (keypoints[..., 1] != 0)
+            keypoints[..., :2] += np.where(defined[..., None], shift[:, None, :], 0)
+
+        return Detections.from_boxes(xyxy=cxcywh_to_xyxy(boxes),
+                                     cls=self._cls[visible],
+                                     conf=self._conf[visible],
+                                     ids=self._ids[visible],
+                                     keypoints=keypoints)
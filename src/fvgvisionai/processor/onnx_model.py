@@ -0,0 +1,171 @@
+import logging
+from typing import List, Optional
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+import torch
+from numpy import ndarray
+from ultralytics.engine.results import Results
+
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.processor.box_utils import non_max_suppression
+from fvgvisionai.processor.categories import categories_dict
+
+# colore del bordo del letterbox, lo stesso usato da ultralytics
+LETTERBOX_COLOR = 114
+
+# keypoint coco del modello pose, ognuno con x, y e confidenza
+POSE_KEYPOINTS = 17
+POSE_KEYPOINT_VALUES = 3
+
+MAX_DETECTIONS = 300
+
+# spostamento dei box per classe, cosi' una sola NMS non sopprime box di classi diverse
+NMS_CLASS_OFFSET = 7680
+
+PIXEL_SCALE = np.float32(1 / 255)
+
+
+def build_onnx_model_file_name(app_settings: AppSettings) -> str:
+    if app_settings.model_filename is not None:
+        return app_settings.model_filename.split("/")[-1]
+
+    pose_suffix = "-pose" if app_settings.scenario_pose_enabled else ""
+    return (f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}{pose_suffix}"
+            f"-{app_settings.model_resolution.value['suffix']}.onnx")
+
+
+def load_onnx_model(app_settings: AppSettings) -> ('OnnxModel', str):
+    model_file_name = build_onnx_model_file_name(app_settings)
+    model = OnnxModel(f"./assets/models/{model_file_name}", app_settings)
+    logging.getLogger(__name__).info(f"Used model is {model_file_name}")
+    return model, model_file_name
+
+
+class OnnxModel:
+    """Modello yolo esportato in onnx ed eseguito con onnxruntime su CPU.
+
+    Letterbox, decodifica dell'output e NMS sono eseguiti con numpy. Il risultato e' un Results di ultralytics, per
+    cui detection, tracking e keypoint vengono elaborati come quelli del modello pytorch.
+    """
+
+    def __init__(self, model_path: str, app_settings: AppSettings):
+        self._logger = logging.getLogger(__name__)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if app_settings.model_onnx_intra_op_threads > 0:
+            options.intra_op_num_threads = app_settings.model_onnx_intra_op_threads
+        if app_settings.model_onnx_inter_op_threads > 0:
+            options.inter_op_num_threads = app_settings.model_onnx_inter_op_threads
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        self._session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        input_height, input_width = model_input.shape[2], model_input.shape[3]
+        if not isinstance(input_height, int) or not isinstance(input_width, int):
+            # modello esportato con dimensioni dinamiche
+            input_height, input_width = app_settings.model_resolution.value["resolution"]
+        self._input_height = input_height
+        self._input_width = input_width
+        # con batch dinamico (yolo export dynamic=True) piu' frame vengono analizzati con un'unica esecuzione
+        self._dynamic_batch = not isinstance(model_input.shape[0], int)
+        self._logger.info(f"onnx model input {self._input_name} is {self._input_width}x{self._input_height}")
+
+        self._pose_enabled = app_settings.scenario_pose_enabled
+        self._confidence = app_settings.model_confidence
+        self._iou = app_settings.model_iou
+        self._classes = np.array([category.model_class for category in app_settings.model_categories])
+        self._names = {model_class: category.label for model_class, category in categories_dict.items()}
+
+        # buffer riutilizzati ad ogni frame
+        self._canvas = np.full((self._input_height, self._input_width, 3), LETTERBOX_COLOR, dtype=np.uint8)
+        self._input_tensor = np.empty((1, 3, self._input_height, self._input_width), dtype=np.float32)
+        self._letterbox_geometry: Optional[tuple] = None
+
+    def predict(self, frame: ndarray) -> Results:
+        scale, left, top = self._letterbox(frame, self._input_tensor[0])
+
+        # output (1, 4 + classi, ancore) per detect, (1, 4 + 1 + 17 * 3, ancore) per pose
+        output = self._session.run(None, {self._input_name: self._input_tensor})[0][0].T
+        return self._build_results(frame, output, scale, left, top)
+
+    def predict_batch(self, frames: List[ndarray]) -> List[Results]:
+        if not self._dynamic_batch or len(frames) == 1:
+            return [self.predict(frame) for frame in frames]
+
+        input_tensor = np.empty((len(frames), 3, self._input_height, self._input_width), dtype=np.float32)
+        geometries = [self._letterbox(frame, input_tensor[index]) for index, frame in enumerate(frames)]
+        outputs = self._session.run(None, {self._input_name: input_tensor})[0]
+        return [self._build_results(frame, output.T, *geometry)
+                for frame, output, geometry in zip(frames, outputs, geometries)]
+
+    def _build_results(self, frame: ndarray, output: ndarray, scale: float, left: int, top: int) -> Results:
+        boxes, scores, classes, keypoints = self._decode(output)
+
+        # coordinate riportate dal letterbox al frame ricevuto
+        frame_height, frame_width = frame.shape[:2]
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - left) / scale, 0, frame_width)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - top) / scale, 0, frame_height)
+
+        result_boxes = np.concatenate((boxes, scores[:, None], classes[:, None]), axis=1).astype(np.float32)
+        result_keypoints = None
+        if self._pose_enabled:
+            keypoints[..., 0] = (keypoints[..., 0] - left) / scale
+            keypoints[..., 1] = (keypoints[..., 1] - top) / scale
+            result_keypoints = torch.from_numpy(np.ascontiguousarray(keypoints, dtype=np.float32))
+
+        return Results(orig_img=frame, path="", names=self._names,
+                       boxes=torch.from_numpy(result_boxes), keypoints=result_keypoints)
+
+    def _letterbox(self, frame: ndarray, input_slot: ndarray) -> (float, int, int):
+        frame_height, frame_width = frame.shape[:2]
+        scale = min(self._input_height / frame_height, self._input_width / frame_width)
+        resized_width = round(frame_width * scale)
+        resized_height = round(frame_height * scale)
+        left = (self._input_width - resized_width) // 2
+        top = (self._input_height - resized_height) // 2
+
+        geometry = (resized_width, resized_height, left, top)
+        if geometry != self._letterbox_geometry:
+            # il bordo va ridisegnato solo se cambia la geometria
+            self._canvas.fill(LETTERBOX_COLOR)
+            self._letterbox_geometry = geometry
+
+        canvas_view = self._canvas[top:top + resized_height, left:left + resized_width]
+        if resized_width != frame_width or resized_height != frame_height:
+            canvas_view[...] = cv2.resize(frame, (resized_width, resized_height), interpolation=cv2.INTER_LINEAR)
+        else:
+            canvas_view[...] = frame
+
+        # BGR -> RGB, HWC -> CHW e normalizzazione in [0, 1] in una sola operazione
+        np.multiply(self._canvas[..., ::-1].transpose(2, 0, 1), PIXEL_SCALE, out=input_slot, dtype=np.float32)
+        return scale, left, top
+
+    def _decode(self, output: ndarray) -> (ndarray, ndarray, ndarray, Optional[ndarray]):
+        if self._pose_enabled:
+            scores = output[:, 4]
+            classes = np.zeros(len(output), dtype=np.int64)
+        else:
+            class_scores = output[:, 4:]
+            classes = class_scores.argmax(axis=1)
+            scores = class_scores[np.arange(len(class_scores)), classes]
+
+        selected = (scores > self._confidence) & np.isin(classes, self._classes)
+        output = output[selected]
+        scores = scores[selected]
+        classes = classes[selected]
+
+        # cx, cy, w, h -> x1, y1, x2, y2
+        boxes = np.empty((len(output), 4), dtype=np.float32)
+        boxes[:, :2] = output[:, :2] - output[:, 2:4] / 2
+        boxes[:, 2:] = output[:, :2] + output[:, 2:4] / 2
+
+        keep = non_max_suppression(boxes + classes[:, None] * NMS_CLASS_OFFSET, scores, self._iou, MAX_DETECTIONS)
+
+        keypoints = None
+        if self._pose_enabled:
+            keypoints = output[keep, 5:].reshape(-1, POSE_KEYPOINTS, POSE_KEYPOINT_VALUES)
+        return boxes[keep], scores[keep], classes[keep].astype(np.float32), keypoints
@@ -0,0 +1,50 @@
+from typing import List, Optional
+
+from numpy import ndarray
+
+from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
+from fvgvisionai.common.stage_latency import StageLatency
+from fvgvisionai.common.triple_buffer import TripleBuffer
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.notify.notification_client import NotificationClient
+from fvgvisionai.processor.onnx_model import load_onnx_model
+from fvgvisionai.processor.ultralytics_model import CameraTracker
+from fvgvisionai.processor.ultralytics_processor import UltralyticsFrameProcessor
+
+
+class OnnxFrameProcessor(UltralyticsFrameProcessor):
+    """Processor con il modello yolo eseguito da onnxruntime su CPU.
+
+    Scenari, sub-processor e decoratori sono quelli di UltralyticsFrameProcessor: cambia solo l'esecuzione del
+    modello, mentre il tracking usa lo stesso tracker di ultralytics tramite CameraTracker (o MotionTracker).
+    """
+
+    def __init__(self, buffer: TripleBuffer,
+                 notification_client: Optional[NotificationClient],
+                 benchmark_monitor: Optional[BenchmarkMonitor],
+                 app_settings: AppSettings,
+                 stage_latency: Optional[StageLatency] = None):
+        super().__init__(buffer=buffer,
+                         notification_client=notification_client,
+                         benchmark_monitor=benchmark_monitor,
+                         app_settings=app_settings,
+                         stage_latency=stage_latency)
+
+    def setup_video_parameters(self, video_width: int, video_height: int, source_frame_rate_declared: int):
+        super().setup_video_parameters(video_width, video_height, source_frame_rate_declared)
+
+        if self._tracking_enabled and not self._motion_tracker_enabled and self._camera_tracker is None:
+            self._camera_tracker = CameraTracker(frame_rate=round(1000 / max(source_frame_rate_declared, 1)))
+
+    def _load_model(self) -> (object, str):
+        return load_onnx_model(self._app_settings)
+
+    def _run_model(self, model_frame: ndarray) -> list:
+        result = self._model.predict(model_frame)
+        if self._camera_tracker is not None:
+            result = self._camera_tracker.update(result)
+        return [result]
+
+    def _predict_batch(self, frames: List[ndarray]) -> list:
+        # con un modello esportato a batch fisso i frame vengono analizzati uno alla volta
+        return self._model.predict_batch(frames)
@@ -1,4 +1,3 @@
-import traceback
 from abc import ABC
 from typing import Optional
 
@@ -8,10 +7,11 @@ from numpy import ndarray
 
 from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
 from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.stage_latency import StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.config.app_settings import AppSettings
 from fvgvisionai.notify.notification_client import NotificationClient
-from fvgvisionai.processor.abstract_frame_processor import AbstractFrameProcessor
+from fvgvisionai.processor.abstract_local_frame_processor import AbstractLocalFrameProcessor
 from fvgvisionai.processor.data_aggregator import DataAggregator
 from fvgvisionai.processor.decorators.fps_frame_decorator import FpsFrameDecorator
 from fvgvisionai.processor.decorators.video_info_decorator import VideoInfoDecorator
@@ -19,15 +19,17 @@ from fvgvisionai.processor.subprocessors.in_zone_sub_processor import AlarmStatu
 from fvgvisionai.processor.ultralytics_processor import boolean_array_to_binary_sequences
 
 
-class PassthroughProcessor(AbstractFrameProcessor, ABC):
+class PassthroughProcessor(AbstractLocalFrameProcessor, ABC):
     def __init__(self, buffer: TripleBuffer,
                  notification_client: Optional[NotificationClient],
                  benchmark_monitor: Optional[BenchmarkMonitor],
-                 app_settings: AppSettings):
+                 app_settings: AppSettings,
+                 stage_latency: Optional[StageLatency] = None):
         super().__init__(buffer=buffer,
                          notification_client=notification_client,
                          benchmark_monitor=benchmark_monitor,
-                         app_settings=app_settings)
+                         app_settings=app_settings,
+                         stage_latency=stage_latency)
 
         self._image_source_width = 0
         self._image_source_height = 0
@@ -62,42 +64,43 @@ class PassthroughProcessor(AbstractFrameProcessor, ABC):
         self._fps_decorator.init_image_size(video_width, video_height)
         self._video_info_decorator.init_image_size(video_width, video_height)
 
-    def _execute_frame_analysis(self, source_frame: ndarray,
-                                data_aggregator: DataAggregator) -> (Optional[ndarray], AlarmStatus, AlarmStatus):
-        try:
-
-            # Process scenario zone
-            objects_in_zone, min_time_in_zone, max_time_in_zone, avg_time_in_zone = 0, 0, 0, 0
-            data_aggregator.measure_items_in_zone(objects_in_zone,
-                                                  min_time_in_zone, max_time_in_zone, avg_time_in_zone)
-
-            # Process scenario door
-            people_entering, people_leaving = 0, 0
-            data_aggregator.measure_people_near_door(people_entering, people_leaving)
-
-            # Process scenario raise hands
-            people_raised_hand = 0
-            data_aggregator.measure_people_with_raised_hands(people_raised_hand)
-
-            #
-            # Drawing operations
-            #
-            if self._app_settings.show_video_info_enabled:
-                self._video_info_decorator.draw(source_frame,
-                                                self._image_source_width, self._image_source_height,
-                                                0, 0)
-            if self._app_settings.show_fps_enabled:
-                self._fps_decorator.draw(source_frame,
-                                         data_aggregator.time_frame_source_declared,
-                                         data_aggregator.time_frame_acquisition_average,
-                                         data_aggregator.time_frame_processing_average,
-                                         self._app_settings.video_output_fps)
-
-            self._show_time_box(source_frame)
-
-            return source_frame, AlarmStatus.NORMAL, AlarmStatus.NORMAL
-
-        except Exception as e:
-            self._logger.error("Unexpected error %s " % e)
-            traceback.print_exc()
-            return None, None
\ No newline at end of file
+    def _infer_frame(self, frame_index: int, source_frame: ndarray, data_aggregator: DataAggregator,
+                     model_frame: Optional[ndarray] = None) -> object:
+        # nessun modello
+        return None
+
+    def _analyse_frame(self, frame_index: int, inference: object, data_aggregator: DataAggregator) -> object:
+        # Process scenario zone
+        objects_in_zone, min_time_in_zone, max_time_in_zone, avg_time_in_zone = 0, 0, 0, 0
+        data_aggregator.measure_items_in_zone(objects_in_zone,
+                                              min_time_in_zone, max_time_in_zone, avg_time_in_zone)
+
+        # Process scenario door
+        people_entering, people_leaving = 0, 0
+        data_aggregator.measure_people_near_door(people_entering, people_leaving)
+
+        # Process scenario raise hands
+        people_raised_hand = 0
+        data_aggregator.measure_people_with_raised_hands(people_raised_hand)
+        return None
+
+    def _render_frame(self, frame_index: int, source_frame: ndarray, analysis: object,
+                      data_aggregator: DataAggregator) -> (Optional[ndarray], AlarmStatus, AlarmStatus):
+        #
+        # Drawing operations
+        #
+        if self._app_settings.show_video_info_enabled:
+            self._video_info_decorator.draw(source_frame,
+                                            self._image_source_width, self._image_source_height,
+                                            0, 0)
+        if self._app_settings.show_fps_enabled:
+            self._fps_decorator.draw(source_frame,
+                                     data_aggregator.time_frame_source_declared,
+                                     data_aggregator.time_frame_acquisition_average,
+                                     data_aggregator.time_frame_processing_average,
+                                     self._app_settings.video_output_fps,
+                                     data_aggregator.processor_drop_ratio)
+
+        self._show_time_box(source_frame)
+
+        return source_frame, AlarmStatus.NORMAL, AlarmStatus.NORMAL
@@ -1,4 +1,6 @@
+import sys
 from abc import ABC
+from typing import Iterable
 
 
 class AbstractSubProcessor(ABC):
@@ -8,3 +10,17 @@ class AbstractSubProcessor(ABC):
     @property
     def is_enabled(self):
         return self._enabled
+
+    @property
+    def tracked_objects(self) -> int:
+        """Oggetti di cui il sub processor conserva lo stato tra un frame e l'altro."""
+        return 0
+
+    @property
+    def tracked_objects_bytes(self) -> int:
+        """Byte occupati dallo stato degli oggetti tracciati."""
+        return 0
+
+    @staticmethod
+    def _container_bytes(containers: Iterable) -> int:
+        return sum(sys.getsizeof(container) for container in containers)
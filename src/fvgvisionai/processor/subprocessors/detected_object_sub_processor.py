@@ -7,6 +7,7 @@ from numpy import ndarray
 from fvgvisionai.common.video_utils import draw_icon
 from fvgvisionai.processor.categories import categories_dict, ModelCategory
 from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.detections import Detections
 
 RAISED_HAND_COLOR = (0, 0, 255)
 # Definire il colore del rettangolo (in formato BGR)
@@ -50,10 +51,9 @@ class DetectedObjectSubProcessor:
 
         self._logger = logging.getLogger(__name__)
 
-    def draw(self, frame: ndarray, detected_objects: List[DetectedObject]):
-        for item in detected_objects:
-            if item.label_num in self._show_category_set:
-                self._draw_detected_object_box(item, frame)
+    def draw(self, frame: ndarray, detections: Detections):
+        for item in detections.views_of(self._show_category_set):
+            self._draw_detected_object_box(item, frame)
 
     def _draw_detected_object_box(self, detected_object: DetectedObject, frame: ndarray):
         """
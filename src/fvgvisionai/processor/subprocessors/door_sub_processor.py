@@ -1,12 +1,17 @@
 import logging
-from typing import List, Set
+from typing import Set, Optional
 
 import cv2
 from numpy import ndarray
 
 from fvgvisionai.config.app_settings import AppSettings
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.detections import Detections
 from fvgvisionai.processor.subprocessors.abstract_sub_processor import AbstractSubProcessor
+from fvgvisionai.processor.subprocessors.zone_index import ZoneIndex
+
+# etichette della ZoneIndex della porta
+DOOR_ENTERING_LABEL = 1
+DOOR_LEAVING_LABEL = 2
 
 
 class DoorSubProcessor(AbstractSubProcessor):
@@ -27,52 +32,56 @@ class DoorSubProcessor(AbstractSubProcessor):
         self._total_people_leaving: int = 0
 
         self._people_inside: int = 0
+        self._door_index: Optional[ZoneIndex] = None
         self._logger = logging.getLogger(__name__)
 
-    def detected_objects_near_door_zone(self, list_objects: List[DetectedObject]) -> [int, int, int, int]:
+    @property
+    def tracked_objects(self) -> int:
+        return len(self._previous_people_in_leaving_zone) + len(self._previous_people_in_entering_zone)
+
+    @property
+    def tracked_objects_bytes(self) -> int:
+        return self._container_bytes([self._previous_people_in_leaving_zone, self._previous_people_in_entering_zone])
+
+    def init_image_size(self, width: int, height: int):
+        # a parita' di punto la zona di ingresso ha la precedenza, come nel test sequenziale
+        self._door_index = ZoneIndex([self._door_poly2, self._door_poly1], width, height)
+
+    def detected_objects_near_door_zone(self, detections: Detections) -> [int, int, int, int]:
         entering_obj_set: Set[int] = set()
         leaving_obj_set: Set[int] = set()
 
         entering_obj_count = 0
         leaving_obj_count = 0
-        for obj in (obj for obj in list_objects if obj.label_num in self._category_set):
-            # lower point of bounding box, representing the feet
-            feet_bb = (obj.bbox_x, obj.bbox_y + int(obj.bbox_h / 2))
 
+        indexes = detections.indexes_of(self._category_set)
+        object_ids = detections.ids[indexes].tolist()
+        # lower point of bounding box, representing the feet
+        door_labels = self._door_index.lookup(detections.feet_points(indexes)).tolist()
+
+        for position, (object_id, door_label) in enumerate(zip(object_ids, door_labels)):
             # people entering
             # if feet of person enter 1st threshold, add them to dict of people entering
-            point_in_enter_polygon = cv2.pointPolygonTest(contour=self._app_settings.scenario_door_enter_poly,
-                                                          pt=feet_bb,
-                                                          measureDist=False)
+            if door_label == DOOR_ENTERING_LABEL:
+                entering_obj_set.add(object_id)
 
-            # people leaving
-            # same logic as before but reversing the order of the thresholds
-            point_in_leaving_polygon = cv2.pointPolygonTest(contour=self._app_settings.scenario_door_leaving_poly,
-                                                            pt=feet_bb,
-                                                            measureDist=False)
-
-            obj.is_door_entering_zone = False
-            obj.is_door_leaving_zone = False
-            if point_in_enter_polygon >= 0:
-                entering_obj_set.add(obj.id)
-
-                if obj.id in self._previous_people_in_leaving_zone:
-                    self._previous_people_in_leaving_zone.remove(obj.id)
+                if object_id in self._previous_people_in_leaving_zone:
+                    self._previous_people_in_leaving_zone.remove(object_id)
                     self._people_inside += 1
                     entering_obj_count += 1
-                    obj.is_door_entering_zone = True
-                    obj.is_door_leaving_zone = False
-            elif point_in_leaving_polygon >= 0:
-                leaving_obj_set.add(obj.id)
+                    detections.is_door_entering_zone[indexes[position]] = True
+            # people leaving
+            # same logic as before but reversing the order of the thresholds
+            elif door_label == DOOR_LEAVING_LABEL:
+                leaving_obj_set.add(object_id)
 
-                if obj.id in self._previous_people_in_entering_zone:
-                    self._previous_people_in_entering_zone.remove(obj.id)
+                if object_id in self._previous_people_in_entering_zone:
+                    self._previous_people_in_entering_zone.remove(object_id)
                     self._people_inside -= 1
                     if self._people_inside < 0:
                         self._people_inside = 0
                     leaving_obj_count += 1
-                    obj.is_door_entering_zone = False
-                    obj.is_door_leaving_zone = True
+                    detections.is_door_leaving_zone[indexes[position]] = True
 
         self._previous_people_in_leaving_zone = leaving_obj_set
         self._previous_people_in_entering_zone = entering_obj_set
@@ -1,14 +1,16 @@
 import logging
-from typing import List, Set, Dict
+from typing import Set, Dict, Optional
 
 import cv2
+import numpy as np
 from numpy import ndarray
 
 from fvgvisionai.common.app_alarm import AlarmStatus, AppAlarm
 from fvgvisionai.common.app_timer import AppTimer
 from fvgvisionai.config.app_settings import AppSettings
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.detections import Detections
 from fvgvisionai.processor.subprocessors.abstract_sub_processor import AbstractSubProcessor
+from fvgvisionai.processor.subprocessors.zone_index import ZoneIndex, NO_ZONE
 
 
 class InZoneSubProcessor(AbstractSubProcessor):
@@ -22,6 +24,7 @@ class InZoneSubProcessor(AbstractSubProcessor):
         self._process_timer = AppTimer()
         self._process_timer.start()
         self._start_time_for_entities_in_zone: Dict[int, float] = {}
+        self._zone_index: Optional[ZoneIndex] = None
 
         def is_danger(people_in_zone: int) -> bool:
             return people_in_zone > app_settings.scenario_zone_danger_limit
@@ -31,54 +34,54 @@ class InZoneSubProcessor(AbstractSubProcessor):
                                app_settings.scenario_zone_time_limit)
         self._logger = logging.getLogger(__name__)
 
-    def detected_objects_in_zone(self, in_frame_objects: List[DetectedObject]) -> [AlarmStatus, int, int, int, int]:
-        entities_in_zone = 0
+    @property
+    def tracked_objects(self) -> int:
+        return len(self._start_time_for_entities_in_zone)
+
+    @property
+    def tracked_objects_bytes(self) -> int:
+        return self._container_bytes([self._start_time_for_entities_in_zone])
+
+    def init_image_size(self, width: int, height: int):
+        self._zone_index = ZoneIndex([self._zone_poly], width, height)
+
+    def detected_objects_in_zone(self, detections: Detections) -> [AlarmStatus, int, int, int, int]:
         current_elapsed_time = self._process_timer.elapsed_time
-        people_in_scene: Set[int] = set()
-
-        min_time_in_zone = 1_000_000.0
-        max_time_in_zone = 0.0
-        total_time_in_zone = 0.0
-        for obj in (obj for obj in in_frame_objects if obj.label_num in self._category_set):
-            people_in_scene.add(obj.id)
-            if self.is_in_zone(obj):
-                obj.is_in_zone = True
-                entities_in_zone += 1
-                if obj.id not in self._start_time_for_entities_in_zone:
-                    self._start_time_for_entities_in_zone[obj.id] = current_elapsed_time
-                obj.time_in_zone = round((current_elapsed_time - self._start_time_for_entities_in_zone[obj.id]) / 1000)
+
+        indexes = detections.indexes_of(self._category_set)
+        object_ids = detections.ids[indexes].tolist()
+        in_zone = self._zone_index.lookup(detections.feet_points(indexes)) != NO_ZONE
+        time_in_zone = np.zeros(len(indexes), dtype=np.int64)
+
+        for position, (object_id, is_in_zone) in enumerate(zip(object_ids, in_zone.tolist())):
+            if is_in_zone:
+                start_time = self._start_time_for_entities_in_zone.setdefault(object_id, current_elapsed_time)
+                time_in_zone[position] = round((current_elapsed_time - start_time) / 1000)
             else:
-                obj.is_in_zone = False
-                obj.time_in_zone = 0
-                if obj.id in self._start_time_for_entities_in_zone:
-                    self._start_time_for_entities_in_zone.pop(obj.id)
+                self._start_time_for_entities_in_zone.pop(object_id, None)
 
-            if obj.time_in_zone > 0:
-                max_time_in_zone = max(max_time_in_zone, obj.time_in_zone)
-                min_time_in_zone = min(min_time_in_zone, obj.time_in_zone)
-                total_time_in_zone += obj.time_in_zone
+        detections.is_in_zone[indexes] = in_zone
+        detections.time_in_zone[indexes] = time_in_zone
 
+        entities_in_zone = int(np.count_nonzero(in_zone))
         if entities_in_zone > 0:
-            avg_time_in_zone = round(total_time_in_zone / max(entities_in_zone, 1))
+            times = time_in_zone[time_in_zone > 0]
+            min_time_in_zone = int(times.min()) if len(times) > 0 else 1_000_000.0
+            max_time_in_zone = int(times.max()) if len(times) > 0 else 0.0
+            avg_time_in_zone = round(int(times.sum()) / max(entities_in_zone, 1))
         else:
             min_time_in_zone = 0
             max_time_in_zone = 0
             avg_time_in_zone = 0
 
-        # Rimuove gli elementi dal dizionario che non sono presenti nel set
+        # Rimuove gli elementi dal dizionario che non sono presenti nella scena
+        people_in_scene: Set[int] = set(object_ids)
         self._start_time_for_entities_in_zone = {k: v for k, v in self._start_time_for_entities_in_zone.items() if
                                                  k in people_in_scene}
         alarm_status = self._alarm.manage(entities_in_zone)
 
         return alarm_status, entities_in_zone, min_time_in_zone, max_time_in_zone, avg_time_in_zone
 
-    def is_in_zone(self, obj: DetectedObject) -> bool:
-        x, y, _, h = obj.bbox_wh
-        point_in_polygon = cv2.pointPolygonTest(contour=self._zone_poly,
-                                                pt=(x, y + int((h / 2))),
-                                                measureDist=False)
-        return point_in_polygon >= 0
-
     def draw(self, frame: ndarray) -> ndarray:
         cv2.polylines(img=frame, pts=[self._zone_poly], isClosed=True, color=(255, 0, 0), thickness=2)
 
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Set, Dict
+from typing import Set, Dict, Optional
 
 import cv2
 import numpy as np
@@ -9,8 +9,9 @@ from fvgvisionai.common.app_alarm import AlarmStatus, AppAlarm
 from fvgvisionai.common.app_timer import AppTimer
 from fvgvisionai.common.video_utils import draw_icon
 from fvgvisionai.config.app_settings import AppSettings
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.detections import Detections
 from fvgvisionai.processor.subprocessors.abstract_sub_processor import AbstractSubProcessor
+from fvgvisionai.processor.subprocessors.zone_index import ZoneIndex, NO_ZONE
 
 
 class ParkingSubProcessor(AbstractSubProcessor):
@@ -27,6 +28,7 @@ class ParkingSubProcessor(AbstractSubProcessor):
         self._process_timer = AppTimer()
         self._process_timer.start()
         self._start_time_for_entities_in_parking: Dict[int, float] = {}
+        self._parking_index: Optional[ZoneIndex] = None
 
         def is_danger(item_in_zone: int) -> bool:
             return item_in_zone > app_settings.scenario_parking_danger_limit
@@ -36,73 +38,58 @@ class ParkingSubProcessor(AbstractSubProcessor):
                                app_settings.scenario_parking_time_limit)
         self._logger = logging.getLogger(__name__)
 
-    def detected_objects_parked(self, in_frame_objects: List[DetectedObject]) -> [AlarmStatus, int, int, int, int]:
-        entities_in_zone = 0
+    @property
+    def tracked_objects(self) -> int:
+        return len(self._start_time_for_entities_in_parking)
+
+    @property
+    def tracked_objects_bytes(self) -> int:
+        return self._container_bytes([self._start_time_for_entities_in_parking, self._parking_busy])
+
+    def init_image_size(self, width: int, height: int):
+        self._parking_index = ZoneIndex(self._parking_poly, width, height)
+
+    def detected_objects_parked(self, detections: Detections) -> [AlarmStatus, int, int, int, int]:
         current_elapsed_time = self._process_timer.elapsed_time
-        people_in_scene: Set[int] = set()
-
-        min_time_in_zone = 1_000_000.0
-        max_time_in_zone = 0.0
-        total_time_in_zone = 0.0
-
-        self._parking_busy.clear()
-        for obj in (obj for obj in in_frame_objects if obj.label_num in self._category_set):
-            people_in_scene.add(obj.id)
-            if self.is_in_parking(obj):
-                obj.is_in_zone = True
-                entities_in_zone += 1
-                if obj.id not in self._start_time_for_entities_in_parking:
-                    self._start_time_for_entities_in_parking[obj.id] = current_elapsed_time
-                obj.time_in_zone = round(
-                    (current_elapsed_time - self._start_time_for_entities_in_parking[obj.id]) / 1000)
+
+        indexes = detections.indexes_of(self._category_set)
+        object_ids = detections.ids[indexes].tolist()
+        parking_labels = self._parking_index.lookup(detections.feet_points(indexes))
+        in_parking = parking_labels != NO_ZONE
+        time_in_zone = np.zeros(len(indexes), dtype=np.int64)
+
+        # le etichette partono da 1, l'indice del parcheggio da 0
+        self._parking_busy = set((parking_labels[in_parking] - 1).tolist())
+
+        for position, (object_id, is_in_parking) in enumerate(zip(object_ids, in_parking.tolist())):
+            if is_in_parking:
+                start_time = self._start_time_for_entities_in_parking.setdefault(object_id, current_elapsed_time)
+                time_in_zone[position] = round((current_elapsed_time - start_time) / 1000)
             else:
-                obj.is_in_zone = False
-                obj.time_in_zone = 0
-                if obj.id in self._start_time_for_entities_in_parking:
-                    self._start_time_for_entities_in_parking.pop(obj.id)
+                self._start_time_for_entities_in_parking.pop(object_id, None)
 
-            if obj.time_in_zone > 0:
-                max_time_in_zone = max(max_time_in_zone, obj.time_in_zone)
-                min_time_in_zone = min(min_time_in_zone, obj.time_in_zone)
-                total_time_in_zone += obj.time_in_zone
+        detections.is_in_zone[indexes] = in_parking
+        detections.time_in_zone[indexes] = time_in_zone
 
+        entities_in_zone = int(np.count_nonzero(in_parking))
         if entities_in_zone > 0:
-            avg_time_in_zone = round(total_time_in_zone / max(entities_in_zone, 1))
+            times = time_in_zone[time_in_zone > 0]
+            min_time_in_zone = int(times.min()) if len(times) > 0 else 1_000_000.0
+            max_time_in_zone = int(times.max()) if len(times) > 0 else 0.0
+            avg_time_in_zone = round(int(times.sum()) / max(entities_in_zone, 1))
         else:
             min_time_in_zone = 0
             max_time_in_zone = 0
             avg_time_in_zone = 0
 
-        # Rimuove gli elementi dal dizionario che non sono presenti nel set
-        self._start_time_for_entities_in_zone = {k: v for k, v in self._start_time_for_entities_in_parking.items() if
-                                                 k in people_in_scene}
+        # Rimuove gli elementi dal dizionario che non sono presenti nella scena
+        people_in_scene: Set[int] = set(object_ids)
+        self._start_time_for_entities_in_parking = {k: v for k, v in self._start_time_for_entities_in_parking.items()
+                                                    if k in people_in_scene}
         alarm_status = self._alarm.manage(entities_in_zone)
 
         return alarm_status, entities_in_zone, min_time_in_zone, max_time_in_zone, avg_time_in_zone
 
-    def is_in_parking(self, obj: DetectedObject) -> bool:
-        x, y, _, h = obj.bbox_wh
-
-        # Inizializziamo una variabile per verificare la presenza del punto in almeno un poligono
-        point_in_any_polygon = False
-        index = 0
-
-        # Iteriamo attraverso tutti i poligoni
-        for polygon in self._parking_poly:
-            point_in_polygon = cv2.pointPolygonTest(contour=polygon,
-                                                    pt=(x, y + int((h / 2))),
-                                                    measureDist=False)
-
-            # Se il punto è dentro al poligono corrente, settiamo la variabile a True e usciamo dal loop
-            if point_in_polygon >= 0:
-                self._parking_busy.add(index)
-                point_in_any_polygon = True
-                break
-
-            index += 1
-
-        return point_in_any_polygon
-
     def draw(self, frame: ndarray) -> ndarray:
         index = 0
         for polygon in self._parking_poly:
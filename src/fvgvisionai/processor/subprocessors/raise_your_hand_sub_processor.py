@@ -1,13 +1,13 @@
 import logging
-import traceback
-from typing import List
 
 import numpy as np
+from numpy import ndarray
 
 from fvgvisionai.common.app_alarm import AppAlarm, AlarmStatus
 from fvgvisionai.config.app_settings import AppSettings
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.detections import Detections
 from fvgvisionai.processor.subprocessors.abstract_sub_processor import AbstractSubProcessor
+from fvgvisionai.processor.ultralytics_classes import PERSON
 
 # coco keypoint indexes
 KP_NOSE = 0
@@ -28,6 +28,12 @@ KP_RIGHT_KNEE = 14
 KP_LEFT_ANKLE = 15
 KP_RIGHT_ANKLE = 16
 
+# candidate reference points for the head height
+REFERENCE_KEYPOINTS = [KP_NOSE, KP_LEFT_EYE, KP_RIGHT_EYE, KP_LEFT_EAR, KP_RIGHT_EAR]
+
+# tolerance in degrees for the angle of the arm relative to the vertical
+ARM_ANGLE_THRESHOLD = 30
+
 
 def is_danger(raised_hands: int) -> bool:
     return raised_hands > 0
@@ -40,73 +46,43 @@ class RaiseYourHandSubProcessor(AbstractSubProcessor):
         self._alarm = AppAlarm(is_danger)
         self._logger = logging.getLogger(__name__)
 
-    def detected_raised_hands(self, list_objects: List[DetectedObject]) -> [AlarmStatus, int]:
-        counter = 0
-        for obj in (obj for obj in list_objects if obj.label_num == 0):
-            obj.raised_hands = False
-            for bboxe_pose, keyps_pose in zip(obj.bbox_xy, obj.keypoints):
-                h = keyps_pose.orig_shape[0]
-                w = keyps_pose.orig_shape[1]
-
-                # keypoint data
-                xyn = keyps_pose.xyn[0]
-
-                # useful keypoint coordinates
-                nose_x, nose_y = self._extract_kp_xy(xyn, KP_NOSE, w, h)
-                lwri_x, lwri_y = self._extract_kp_xy(xyn, KP_LEFT_WRIST, w, h)
-                rwri_x, rwri_y = self._extract_kp_xy(xyn, KP_RIGHT_WRIST, w, h)
-                lelb_x, lelb_y = self._extract_kp_xy(xyn, KP_LEFT_ELBOW, w, h)
-                relb_x, relb_y = self._extract_kp_xy(xyn, KP_RIGHT_ELBOW, w, h)
-                lear_x, lear_y = self._extract_kp_xy(xyn, KP_LEFT_EAR, w, h)
-                rear_x, rear_y = self._extract_kp_xy(xyn, KP_RIGHT_EAR, w, h)
-                leye_x, leye_y = self._extract_kp_xy(xyn, KP_LEFT_EYE, w, h)
-                reye_x, reye_y = self._extract_kp_xy(xyn, KP_RIGHT_EYE, w, h)
-
-                # select one point among eyes, ears and nose as height threshold point to determine raised hand (some may be undefined)
-                ref_x, ref_y = 0, 0
-                for point in [(nose_x, nose_y), (leye_x, leye_y)], (reye_x, reye_y), (lear_x, lear_y), (rear_x, rear_y):
-                    if point != (0, 0):
-                        ref_x, ref_y = point[0], point[1]
-
-                # start of raised hand logic: evaluation of wrist height with respect to the selected reference and forearm angle with respect to the vertical
-                # tolerance in degrees for the angle of the arm relative to the vertical
-                threshold = 30
-                # detected object flag
-
-                # ref_y puo' essere una tupla
-                if isinstance(ref_y, tuple):
-                    ref_y = ref_y[1]
-
-                if ref_x != 0:
-                    # right arm
-                    if rwri_y != 0 and rwri_x != 0 and relb_y != 0 and relb_x != 0:
-                        r_angle = round(np.degrees(np.arctan2((rwri_y - relb_y), (rwri_x - relb_x))))
-                        if abs(-90 - r_angle) <= threshold and rwri_y < ref_y:
-                            obj.raised_hands = True
-
-                    # left arm
-                    if lwri_y != 0 and lwri_x != 0 and lelb_y != 0 and lelb_x != 0:
-                        l_angle = round(np.degrees(np.arctan2((lwri_y - lelb_y), (lwri_x - lelb_x))))
-                        if abs(-90 - l_angle) <= threshold and lwri_y < ref_y:
-                            obj.raised_hands = True
-            if obj.raised_hands:
-                counter += 1
+    def detected_raised_hands(self, detections: Detections) -> [AlarmStatus, int]:
+        persons = detections.indexes_of([PERSON])
+        if len(persons) == 0 or detections.keypoints is None:
+            return self._alarm.manage(0), 0
+
+        # keypoint coordinates of all persons (N, 17), in pixels at model resolution; undefined keypoints are (0, 0)
+        keypoints = detections.keypoints[persons, :, :2].astype(np.int32)
+        kp_x = keypoints[..., 0]
+        kp_y = keypoints[..., 1]
+
+        # select the last defined point among nose, eyes and ears as height threshold point to determine raised hand
+        reference_defined = (kp_x[:, REFERENCE_KEYPOINTS] != 0) | (kp_y[:, REFERENCE_KEYPOINTS] != 0)
+        last_defined = len(REFERENCE_KEYPOINTS) - 1 - np.argmax(reference_defined[:, ::-1], axis=1)
+        reference_index = np.array(REFERENCE_KEYPOINTS)[last_defined]
+        rows = np.arange(len(persons))
+        ref_x = kp_x[rows, reference_index]
+        ref_y = kp_y[rows, reference_index]
+        has_reference = reference_defined.any(axis=1) & (ref_x != 0)
+
+        # start of raised hand logic: evaluation of wrist height with respect to the selected reference and forearm
+        # angle with respect to the vertical
+        raised_hands = has_reference & (
+                self._is_arm_raised(kp_x, kp_y, ref_y, KP_RIGHT_WRIST, KP_RIGHT_ELBOW) |
+                self._is_arm_raised(kp_x, kp_y, ref_y, KP_LEFT_WRIST, KP_LEFT_ELBOW))
+
+        detections.raised_hands[persons] = raised_hands
+        counter = int(np.count_nonzero(raised_hands))
 
         alarm_status = self._alarm.manage(counter)
 
         return alarm_status, counter
 
-    def _extract_kp_xy(self, t, i, w, h):
-        """
-        Keypoint extraction from xyn tensor contained in pose results
-        Args:
-            t (tensor): xyn object from pose result
-            i (int): index of the keypoint to extract
-            w,h (int): frame dimensions, necessary to calculate the kp in pixels
-        """
-        try:
-            return int(t[i][0] * w), int(t[i][1] * h)
-        except Exception as e:
-            self._logger.error("Unexpected error %s " % e)
-            traceback.print_exc()
-            return 0, 0
+    @staticmethod
+    def _is_arm_raised(kp_x: ndarray, kp_y: ndarray, ref_y: ndarray, wrist: int, elbow: int) -> ndarray:
+        wrist_x, wrist_y = kp_x[:, wrist], kp_y[:, wrist]
+        elbow_x, elbow_y = kp_x[:, elbow], kp_y[:, elbow]
+
+        defined = (wrist_x != 0) & (wrist_y != 0) & (elbow_x != 0) & (elbow_y != 0)
+        angle = np.rint(np.degrees(np.arctan2(wrist_y - elbow_y, wrist_x - elbow_x)))
+        return defined & (np.abs(-90 - angle) <= ARM_ANGLE_THRESHOLD) & (wrist_y < ref_y)
@@ -0,0 +1,126 @@
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+from numpy import ndarray
+from ultralytics.engine.results import Results
+
+from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.processor.box_utils import fuse_boxes
+from fvgvisionai.processor.detections import POSE_KEYPOINTS_SHAPE
+
+# soglia di sovrapposizione (rispetto al box piu' piccolo) oltre la quale i box di tile diversi vengono fusi
+TILE_FUSION_IOS_THRESHOLD = 0.5
+
+MAX_DETECTIONS = 300
+
+
+class TiledInference:
+    """Inferenza su tile sovrapposti del frame sorgente, per rilevare oggetti piccoli nei frame ad alta risoluzione.
+
+    Il frame viene diviso in una griglia di tile (MODEL_TILES_GRID) con sovrapposizione MODEL_TILES_OVERLAP; ogni tile
+    viene ridimensionato alla risoluzione del modello ed analizzato in un unico batch assieme al frame intero, che
+    rileva gli oggetti piu' grandi di un tile. I box vengono riportati sul frame e quelli sovrapposti fusi.
+    """
+
+    def __init__(self, app_settings: AppSettings):
+        self._columns, self._rows = app_settings.model_tiles_grid
+        self._overlap = app_settings.model_tiles_overlap
+        self._interval = max(1, app_settings.model_tiles_interval)
+        self._pose_enabled = app_settings.scenario_pose_enabled
+
+        self._frame_width = 0
+        self._frame_height = 0
+        self._model_width = 0
+        self._model_height = 0
+        self._regions: List[Tuple[int, int, int, int]] = []
+        self._tile_buffers: List[ndarray] = []
+        self._counter = 0
+
+    @property
+    def regions(self) -> List[Tuple[int, int, int, int]]:
+        return self._regions
+
+    def setup(self, frame_width: int, frame_height: int, model_width: int, model_height: int):
+        self._frame_width = frame_width
+        self._frame_height = frame_height
+        self._model_width = model_width
+        self._model_height = model_height
+
+        # dimensione dei tile tale che la griglia, con la sovrapposizione, copra esattamente il frame
+        tile_width = min(frame_width, int(np.ceil(frame_width / (self._columns - (self._columns - 1) * self._overlap))))
+        tile_height = min(frame_height, int(np.ceil(frame_height / (self._rows - (self._rows - 1) * self._overlap))))
+        xs = np.linspace(0, frame_width - tile_width, self._columns).round().astype(int)
+        ys = np.linspace(0, frame_height - tile_height, self._rows).round().astype(int)
+        self._regions = [(int(x), int(y), int(x) + tile_width, int(y) + tile_height) for y in ys for x in xs]
+        self._tile_buffers = []
+        self._counter = 0
+
+    def is_scheduled(self) -> bool:
+        """True se il frame analizzato corrente deve essere diviso in tile (uno ogni MODEL_TILES_INTERVAL)."""
+        scheduled = self._counter == 0
+        self._counter = (self._counter + 1) % self._interval
+        return scheduled
+
+    def split(self, source_frame: ndarray) -> List[ndarray]:
+        """Tile del frame alla risoluzione del modello, nello stesso ordine delle regioni."""
+        if len(self._tile_buffers) != len(self._regions) or self._tile_buffers[0].dtype != source_frame.dtype:
+            shape = (self._model_height, self._model_width) + source_frame.shape[2:]
+            self._tile_buffers = [np.empty(shape, dtype=source_frame.dtype) for _ in self._regions]
+
+        for (x1, y1, x2, y2), buffer in zip(self._regions, self._tile_buffers):
+            cv2.resize(source_frame[y1:y2, x1:x2], (self._model_width, self._model_height), dst=buffer)
+        return self._tile_buffers
+
+    def merge(self, model_frame: ndarray, frame_result: Results, tile_results: List[Results]) -> Results:
+        """Unisce i risultati del frame intero e dei tile in un unico Results, con coordinate alla risoluzione del
+        modello sul frame intero come quelle prodotte da un'inferenza senza tile."""
+        regions = [(0, 0, self._frame_width, self._frame_height)] + self._regions
+        model_size = np.array([self._model_width, self._model_height], dtype=np.float32)
+
+        boxes_list, scores_list, classes_list, keypoints_list = [], [], [], []
+        for result, (x1, y1, x2, y2) in zip([frame_result] + tile_results, regions):
+            data = result.boxes.data.cpu().numpy()
+            if len(data) == 0:
+                continue
+            # dalla risoluzione del modello alle coordinate del frame sorgente
+            scale = np.array([x2 - x1, y2 - y1], dtype=np.float32) / model_size
+            offset = np.array([x1, y1], dtype=np.float32)
+            boxes_list.append((data[:, :4].reshape(-1, 2, 2) * scale + offset).reshape(-1, 4))
+            scores_list.append(data[:, 4])
+            classes_list.append(data[:, 5])
+            if self._pose_enabled:
+                if result.keypoints is None:
+                    keypoints = np.zeros((len(data),) + POSE_KEYPOINTS_SHAPE, dtype=np.float32)
+                else:
+                    keypoints = result.keypoints.data.cpu().numpy().copy()
+                defined = (keypoints[..., 0] != 0) | (keypoints[..., 1] != 0)
+                keypoints[..., :2] = np.where(defined[..., None], keypoints[..., :2] * scale + offset, 0)
+                keypoints_list.append(keypoints)
+
+        frame_scale = np.array([self._frame_width, self._frame_height], dtype=np.float32) / model_size
+        boxes = np.empty((0, 4), dtype=np.float32)
+        scores = np.empty(0, dtype=np.float32)
+        classes = np.empty(0, dtype=np.float32)
+        keypoints: Optional[ndarray] = None
+        if len(boxes_list) > 0:
+            keep, fused = fuse_boxes(np.concatenate(boxes_list), np.concatenate(scores_list),
+                                     np.concatenate(classes_list), TILE_FUSION_IOS_THRESHOLD)
+            keep, fused = keep[:MAX_DETECTIONS], fused[:MAX_DETECTIONS]
+            boxes = (fused.reshape(-1, 2, 2) / frame_scale).reshape(-1, 4)
+            scores = np.concatenate(scores_list)[keep]
+            classes = np.concatenate(classes_list)[keep]
+            if self._pose_enabled:
+                keypoints = np.concatenate(keypoints_list)[keep]
+                keypoints[..., :2] /= frame_scale
+
+        result_keypoints = None
+        if self._pose_enabled:
+            if keypoints is None:
+                keypoints = np.zeros((0,) + POSE_KEYPOINTS_SHAPE, dtype=np.float32)
+            result_keypoints = torch.from_numpy(np.ascontiguousarray(keypoints, dtype=np.float32))
+
+        result_boxes = np.concatenate((boxes, scores[:, None], classes[:, None]), axis=1).astype(np.float32)
+        return Results(orig_img=model_frame, path="", names=frame_result.names,
+                       boxes=torch.from_numpy(result_boxes), keypoints=result_keypoints)
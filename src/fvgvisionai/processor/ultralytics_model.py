@@ -0,0 +1,58 @@
+import logging
+
+import torch
+import yaml
+from ultralytics import YOLO
+from ultralytics.engine.results import Results
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import IterableSimpleNamespace
+
+from fvgvisionai.config.app_settings import AppSettings
+
+MODELS_TRACKER_YAML = "assets/models/tracker.yaml"
+
+
+def build_model_file_name(app_settings: AppSettings) -> str:
+    if app_settings.model_filename is not None:
+        return app_settings.model_filename.split("/")[-1]
+
+    if app_settings.scenario_pose_enabled:
+        if app_settings.model_use_tensort:
+            return f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}-pose-{app_settings.model_resolution.value['suffix']}-{app_settings.model_precision.value['suffix']}.engine"
+        else:
+            return f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}-pose.pt"
+    else:
+        if app_settings.model_use_tensort:
+            return f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}-{app_settings.model_resolution.value['suffix']}-{app_settings.model_precision.value['suffix']}.engine"
+        else:
+            return f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}.pt"
+
+
+def load_model(app_settings: AppSettings) -> (YOLO, str):
+    model_file_name = build_model_file_name(app_settings)
+    model = YOLO(f"./assets/models/{model_file_name}")
+    logging.getLogger(__name__).info(f"Used model is {model_file_name}")
+    return model, model_file_name
+
+
+class CameraTracker:
+    """Tracker dedicato ad una singola camera, usato quando il modello e' condiviso tra piu' sorgenti.
+
+    Replica quanto fa model.track(persist=True) ma con uno stato indipendente per ogni camera.
+    """
+
+    def __init__(self, frame_rate: int):
+        with open(MODELS_TRACKER_YAML, 'r') as file:
+            tracker_config = IterableSimpleNamespace(**yaml.safe_load(file))
+        self._tracker = TRACKER_MAP[tracker_config.tracker_type](args=tracker_config, frame_rate=frame_rate)
+
+    def update(self, result: Results) -> Results:
+        detections = result.boxes.cpu().numpy()
+        tracks = self._tracker.update(detections, result.orig_img)
+        if len(tracks) == 0:
+            return result
+
+        # l'ultima colonna contiene l'indice della detection originale
+        tracked_result = result[tracks[:, -1].astype(int)]
+        tracked_result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return tracked_result
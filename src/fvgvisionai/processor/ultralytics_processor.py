@@ -1,79 +1,124 @@
-import traceback
+import sys
 from abc import ABC
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 import cv2
 import numpy as np
 import torch
 from numpy import ndarray
-from ultralytics import YOLO
 
 from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
 from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_tracer import TRACER
+from fvgvisionai.common.memory_inspector import MEMORY_INSPECTOR
+from fvgvisionai.common.metrics import TRACKED_OBJECTS
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.config.app_settings import AppSettings
+from fvgvisionai.config.app_settings_utils import ModelResolution
+from fvgvisionai.input.input_costants import NO_CONNECTION_FRAME_INDEX
 from fvgvisionai.notify.notification_client import NotificationClient
-from fvgvisionai.processor.abstract_frame_processor import AbstractFrameProcessor
-from fvgvisionai.processor.categories import categories_dict
+from fvgvisionai.processor.abstract_local_frame_processor import AbstractLocalFrameProcessor
+from fvgvisionai.processor.batch_inference_engine import BatchInferenceEngine
 from fvgvisionai.processor.data_aggregator import DataAggregator
 from fvgvisionai.processor.decorators.alert_decorator import AlertFrameDecorator
 from fvgvisionai.processor.decorators.fps_frame_decorator import FpsFrameDecorator
+from fvgvisionai.processor.decorators.latency_decorator import LatencyFrameDecorator
 from fvgvisionai.processor.decorators.object_counter_decorator import ObjectCounterDecorator
 from fvgvisionai.processor.decorators.parking_decorator import ParkingDecorator
 from fvgvisionai.processor.decorators.video_info_decorator import VideoInfoDecorator
-from fvgvisionai.processor.detected_object import DetectedObject
+from fvgvisionai.processor.crop_region import polygons_region
+from fvgvisionai.processor.detections import Detections
+from fvgvisionai.processor.latency_controller import LatencyController
+from fvgvisionai.processor.motion_scheduler import MotionScheduler
+from fvgvisionai.processor.motion_tracker import MotionTracker
+from fvgvisionai.processor.tiled_inference import TiledInference
 from fvgvisionai.processor.subprocessors.detected_object_sub_processor import DetectedObjectSubProcessor
 from fvgvisionai.processor.subprocessors.door_sub_processor import DoorSubProcessor
 from fvgvisionai.processor.subprocessors.parking_sub_processor import ParkingSubProcessor
 from fvgvisionai.processor.subprocessors.raise_your_hand_sub_processor import RaiseYourHandSubProcessor
 from fvgvisionai.processor.subprocessors.in_zone_sub_processor import InZoneSubProcessor, AlarmStatus
+from fvgvisionai.processor.ultralytics_model import MODELS_TRACKER_YAML, CameraTracker, load_model
 
-MODELS_TRACKER_YAML = "assets/models/tracker.yaml"
 MIN_HEIGHT_FOR_MODEL = 448
 
 
-class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
+class FrameInference(NamedTuple):
+    # None se il frame non e' stato analizzato dal modello
+    list_res_detect: Optional[list] = None
+    # rapporto e spostamento dalle coordinate del modello a quelle del frame, fissati al momento dell'inferenza
+    scale: Optional[Tuple[float, float, int, int]] = None
+
+
+class FrameAnalysis(NamedTuple):
+    detections: Detections
+    zone_alarm_status: AlarmStatus
+    raised_hand_alarm_status: AlarmStatus
+    total_people_entering: int
+    total_people_leaving: int
+    people_in_zone: int
+    avg_time_in_zone: float
+    people_raised_hand: int
+
+
+class UltralyticsFrameProcessor(AbstractLocalFrameProcessor, ABC):
     def __init__(self, buffer: TripleBuffer,
                  notification_client: Optional[NotificationClient],
                  benchmark_monitor: Optional[BenchmarkMonitor],
-                 app_settings: AppSettings):
+                 app_settings: AppSettings,
+                 inference_engine: Optional[BatchInferenceEngine] = None,
+                 camera_index: int = 0,
+                 stage_latency: Optional[StageLatency] = None):
         super().__init__(buffer=buffer,
                          notification_client=notification_client,
                          benchmark_monitor=benchmark_monitor,
-                         app_settings=app_settings)
+                         app_settings=app_settings,
+                         stage_latency=stage_latency)
+
+        self._inference_engine = inference_engine
+        self._camera_index = camera_index
+        self._camera_tracker: Optional[CameraTracker] = None
+        self._motion_tracker: Optional[MotionTracker] = None
 
-        if self._app_settings.model_filename is not None:
-            self._model_file_name = self._app_settings.model_filename.split("/")[-1]
-            self._model = YOLO(f"./assets/models/{self._model_file_name}")
+        if self._inference_engine is None:
+            self._model, self._model_file_name = self._load_model()
         else:
-            if self._app_settings.scenario_pose_enabled:
-                if self._app_settings.model_use_tensort:
-                    self._model_file_name = f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}-pose-{app_settings.model_resolution.value['suffix']}-{app_settings.model_precision.value['suffix']}.engine"
-                else:
-                    self._model_file_name = f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}-pose.pt"
-            else:
-                if self._app_settings.model_use_tensort:
-                    self._model_file_name = f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}-{app_settings.model_resolution.value['suffix']}-{app_settings.model_precision.value['suffix']}.engine"
-                else:
-                    self._model_file_name = f"{app_settings.model_id.value['prefix']}{app_settings.model_size.value['suffix']}.pt"
-            self._model = YOLO(f"./assets/models/{self._model_file_name}")
-        self._logger.info(f"Used model is {self._model_file_name}")
+            # modello condiviso tra piu' camere
+            self._model = None
+            self._model_file_name = self._inference_engine.model_file_name
+            self._logger.info(f"Camera #{camera_index} uses shared model {self._model_file_name}")
 
         self._image_source_width = 0
         self._image_source_height = 0
 
+        self._model_resolution = app_settings.model_resolution
+        self._requested_model_resolution = app_settings.model_resolution
         self._model_width = app_settings.model_width
         self._model_height = app_settings.model_height
         self._model_skip_frames_enabled = app_settings.model_skip_frames_enabled
         self._model_skip_frames_mask = app_settings.model_skip_frames_mask
         self._model_skip_frames_mask_size = len(app_settings.model_skip_frames_mask)
+        self._motion_scheduler = MotionScheduler(app_settings) if app_settings.model_motion_scheduler_enabled else None
+        self._tiled_inference = TiledInference(app_settings) if app_settings.model_tiles_enabled else None
+        # risultati del micro-batch per frame index, consumati dall'analisi dei singoli frame
+        self._batch_results: Dict[int, object] = {}
+
+        if app_settings.model_latency_controller_enabled:
+            # la risoluzione puo' cambiare solo per i modelli pytorch non condivisi, engine e onnx sono a dimensione fissa
+            self._latency_controller = LatencyController(
+                app_settings,
+                resolution_change_enabled=self._inference_engine is None and self._model_file_name.endswith(".pt"))
 
         # if door is enabled, tracking have to be True
+        self._motion_tracker_enabled = app_settings.model_motion_tracker_enabled
         self._tracking_enabled = (app_settings.model_tracking_enabled or
+                                  self._motion_tracker_enabled or
                                   app_settings.scenario_door_enabled or
                                   (app_settings.show_time_people_in_zone and app_settings.scenario_zone_enabled))
 
-        if self._tracking_enabled:
+        if self._motion_tracker_enabled:
+            self._logger.info(f"Used motion tracker with parameters from {MODELS_TRACKER_YAML}")
+        elif self._tracking_enabled:
             self._logger.info(f"Used model tracker is {MODELS_TRACKER_YAML}")
 
         self._scenario_pose_enabled = app_settings.scenario_pose_enabled
@@ -81,8 +126,6 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
         self._scenario_door_enabled = app_settings.scenario_door_enabled
         self._scenario_parking_enabled = app_settings.scenario_parking_enabled
 
-        self._categories = categories_dict
-
         self._categories_list: List[int] = []
         for item in app_settings.model_categories:
             self._categories_list.append(item.model_class)
@@ -97,9 +140,23 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
         self._door_processor = DoorSubProcessor(app_settings)
         self._raise_your_hand_processor = RaiseYourHandSubProcessor(app_settings)
         self._parking_processor = ParkingSubProcessor(app_settings)
+        for tracker, sub_processor in (("zone", self._zone_processor), ("door", self._door_processor),
+                                       ("parking", self._parking_processor)):
+            TRACKED_OBJECTS.labels(camera=self.stage_latency.camera_index, tracker=tracker).set_function(
+                lambda sub_processor=sub_processor: sub_processor.tracked_objects)
+            MEMORY_INSPECTOR.register_tracked_structure(
+                f"{tracker}-{self.stage_latency.camera_index}",
+                lambda sub_processor=sub_processor: (sub_processor.tracked_objects,
+                                                     sub_processor.tracked_objects_bytes))
+        MEMORY_INSPECTOR.register_tracked_structure(f"motion_tracker-{self.stage_latency.camera_index}",
+                                                    self._motion_tracker_memory)
+        MEMORY_INSPECTOR.register_tracked_structure(f"batch_results-{self.stage_latency.camera_index}",
+                                                    lambda: (len(self._batch_results),
+                                                             sys.getsizeof(self._batch_results)))
 
         self._alert_decorator = AlertFrameDecorator(app_settings)
         self._fps_decorator = FpsFrameDecorator()
+        self._latency_decorator = LatencyFrameDecorator()
 
         if self._scenario_parking_enabled:
             self._obj_count_decorator = ParkingDecorator(
@@ -132,13 +189,23 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
                                                                 app_settings.model_skip_frames_mask)
         )
         self._zone_poly = np.array([])
+        self._roi_region: Optional[Tuple[int, int, int, int]] = None
         self._ratio_width = 1
         self._ratio_height = 1
 
         self.performance_timer = AppTimer()
+        self._resize_timer = AppTimer()
+        self._inference_timer = AppTimer()
+        self._analysis_timer = AppTimer()
+        self._rendering_timer = AppTimer()
 
         self.frame_counter = 0
-        self.list_objects: List[DetectedObject] = []
+        # frame previsti dalla maschera (o dal movimento), su cui il controllo della latenza applica lo stride
+        self._stride_counter = 0
+        self.detections: Detections = Detections.empty(self._scenario_pose_enabled)
+
+        # buffer riutilizzato per il frame ridimensionato alla risoluzione del modello
+        self._model_frame_buffer: Optional[ndarray] = None
 
     def setup_video_parameters(self, video_width: int, video_height: int, source_frame_rate_declared: int):
         super().setup_video_parameters(video_width, video_height, source_frame_rate_declared)
@@ -153,122 +220,345 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
         self._ratio_height = video_height / self._model_height
 
         self._zone_poly = self._app_settings.scenario_zone_coords
+        self._update_roi_region()
+        if self._tiled_inference is not None:
+            self._tiled_inference.setup(video_width, video_height, self._model_width, self._model_height)
+
+        if self._latency_controller is not None:
+            self._latency_controller.setup(source_frame_rate_declared)
+
+        self._camera_tracker = None
+        if self._motion_tracker_enabled:
+            # il tracker riparte da zero ad ogni (ri)apertura della sorgente
+            self._motion_tracker = MotionTracker(MODELS_TRACKER_YAML,
+                                                 frame_rate=round(1000 / max(source_frame_rate_declared, 1)))
+        elif (self._inference_engine is not None or self._tiled_inference is not None or
+              self._micro_batch_size > 1) and self._tracking_enabled:
+            # il tracker deve ricevere i risultati gia' uniti dei tile, non puo' essere quello di model.track
+            self._camera_tracker = CameraTracker(frame_rate=round(1000 / max(source_frame_rate_declared, 1)))
+
+        # le mappe delle zone sono alla risoluzione del frame
+        for sub_processor in (self._zone_processor, self._door_processor, self._parking_processor):
+            if sub_processor.is_enabled:
+                sub_processor.init_image_size(video_width, video_height)
 
         self._alert_decorator.init_image_size(video_width, video_height)
         self._fps_decorator.init_image_size(video_width, video_height)
+        self._latency_decorator.init_image_size(video_width, video_height)
         self._obj_count_decorator.init_image_size(video_width, video_height)
         self._video_info_decorator.init_image_size(video_width, video_height)
 
-    def _execute_frame_analysis(self, source_frame: ndarray,
-                                data_aggregator: DataAggregator) -> (Optional[ndarray], AlarmStatus, AlarmStatus):
-        try:
-            self.performance_timer.start()
-
-            if self.is_mask_opened():
-                # model is reduced respect source video_source
-                model_frame: ndarray = cv2.resize(source_frame, (self._model_width, self._model_height))
-
-                if self._tracking_enabled:
-                    results = self._model.track(model_frame, verbose=False,
-                                                tracker=MODELS_TRACKER_YAML,
-                                                imgsz=self._app_settings.model_resolution.value["resolution"],
-                                                conf=self._app_settings.model_confidence,
-                                                iou=self._app_settings.model_iou,
-                                                classes=self._categories_list,
-                                                persist=True)
-                else:
-                    results = self._model(model_frame, verbose=False,
-                                          imgsz=self._app_settings.model_resolution.value["resolution"],
-                                          conf=self._app_settings.model_confidence,
-                                          iou=self._app_settings.model_iou,
-                                          classes=self._categories_list)
+    def _infer_frame(self, frame_index: int, source_frame: ndarray, data_aggregator: DataAggregator,
+                     model_frame: Optional[ndarray] = None) -> FrameInference:
+        self.performance_timer.start()
 
-                list_res_detect = []
-                list_time_detect = []
-                for r in results:
-                    list_res_detect.append(r.cpu())
-                    list_time_detect.append(r.speed)
+        # la risoluzione richiesta dal controllo della latenza cambia solo tra un'inferenza e l'altra
+        if self._requested_model_resolution != self._model_resolution:
+            self._apply_model_resolution(self._requested_model_resolution)
 
-                self._logger.debug(f"\t\tperformance model {self.performance_timer.elapsed_time:.2f} ms")
-                self.performance_timer.start()
+        if self._motion_scheduler is not None:
+            analysis_scheduled = self._motion_scheduler.evaluate(source_frame, len(self.detections) > 0)
+            data_aggregator.measure_motion(self._motion_scheduler.motion_score, analysis_scheduled)
+        else:
+            analysis_scheduled = self.is_analysis_scheduled(frame_index)
 
-                #
-                # Process operations
-                #
-                self.list_objects = self.extract_detected_objects(list_res_detect,
-                                                                  self._raise_your_hand_processor.is_enabled)
+        if analysis_scheduled:
+            analysis_scheduled = self._is_stride_opened(self._stride_counter)
+            self._stride_counter += 1
 
-            self.frame_counter = (self.frame_counter + 1) % self._model_skip_frames_mask_size
+        self.frame_counter = (self.frame_counter + 1) % self._model_skip_frames_mask_size
 
-            # count objects detected in this frame or in an old one
-            data_aggregator.measure_objects_counter(self.list_objects)
+        if not analysis_scheduled:
+            return FrameInference()
 
-            zone_alarm_status = AlarmStatus.NORMAL
+        crop_region = self._roi_region
+        if self._motion_scheduler is not None:
+            motion_region = self._motion_scheduler.crop_region(self._image_source_width,
+                                                               self._image_source_height,
+                                                               self.detections.xyxy)
+            if motion_region is not None:
+                crop_region = motion_region
 
-            # Process scenario zone
-            if self._zone_processor.is_enabled:
+        batch_result = self._batch_results.pop(frame_index, None)
+        if batch_result is not None:
+            # gia' analizzato nel micro-batch
+            results = [batch_result]
+        else:
+            # model is reduced respect source video_source, unless the decoder has already done it
+            self._resize_timer.start()
+            if crop_region is not None:
+                x1, y1, x2, y2 = crop_region
+                model_frame = self._resize_for_model(source_frame[y1:y2, x1:x2])
+            elif model_frame is None or model_frame.shape[:2] != (self._model_height, self._model_width):
+                model_frame = self._resize_for_model(source_frame)
+            data_aggregator.stage_latency.record(LatencyStage.RESIZE, self._resize_timer.stop())
+
+            # i tile coprono il frame intero, per cui non si usano con un ritaglio
+            self._inference_timer.start()
+            with TRACER.span("model", frame_index, self._camera_index):
+                if crop_region is None and self._tiled_inference is not None and self._tiled_inference.is_scheduled():
+                    results = self._run_model_tiled(source_frame, model_frame)
+                else:
+                    results = self._run_model(model_frame)
+            data_aggregator.stage_latency.record(LatencyStage.INFERENCE, self._inference_timer.stop())
+
+        list_res_detect = []
+        list_time_detect = []
+        for r in results:
+            list_res_detect.append(r.cpu())
+            list_time_detect.append(r.speed)
+
+        self._logger.debug(f"\t\tperformance model {self.performance_timer.elapsed_time:.2f} ms")
+        return FrameInference(list_res_detect, self._model_to_frame_scale(crop_region))
+
+    def _analyse_frame(self, frame_index: int, inference: FrameInference,
+                       data_aggregator: DataAggregator) -> FrameAnalysis:
+        self._analysis_timer.start()
+
+        #
+        # Process operations
+        #
+        with TRACER.span("detections", frame_index, self._camera_index):
+            if inference.list_res_detect is not None:
+                scale = inference.scale if inference.scale is not None else self._model_to_frame_scale()
+                self.detections = self.extract_detected_objects(inference.list_res_detect,
+                                                                self._raise_your_hand_processor.is_enabled,
+                                                                scale)
+                if self._motion_tracker is not None:
+                    self.detections = self._motion_tracker.update(frame_index, self.detections,
+                                                                  keypoints_ratio=scale[:2])
+            elif self._motion_tracker is not None:
+                # sui frame saltati dal modello i box sono stimati dal tracker
+                self.detections = self._motion_tracker.predict(frame_index)
+
+        # count objects detected in this frame or in an old one
+        data_aggregator.measure_objects_counter(self.detections)
+
+        zone_alarm_status = AlarmStatus.NORMAL
+
+        # Process scenario zone
+        if self._zone_processor.is_enabled:
+            with TRACER.span("zone", frame_index, self._camera_index):
                 (avg_time_in_zone, max_time_in_zone,
                  min_time_in_zone, objects_in_zone, zone_alarm_status) = self.process_scenario_in_zone()
-                data_aggregator.measure_items_in_zone(objects_in_zone,
-                                                      min_time_in_zone, max_time_in_zone,
-                                                      avg_time_in_zone)
+            data_aggregator.measure_items_in_zone(objects_in_zone,
+                                                  min_time_in_zone, max_time_in_zone,
+                                                  avg_time_in_zone)
 
-            # Process scenario parking
-            if self._parking_processor.is_enabled:
+        # Process scenario parking
+        if self._parking_processor.is_enabled:
+            with TRACER.span("parking", frame_index, self._camera_index):
                 (avg_time_in_zone, max_time_in_zone,
                  min_time_in_zone, objects_in_zone, zone_alarm_status) = self.process_scenario_parking()
-                data_aggregator.measure_items_in_zone(objects_in_zone,
-                                                      min_time_in_zone, max_time_in_zone,
-                                                      avg_time_in_zone)
-            # Process scenario door
-            total_people_entering = 0
-            total_people_leaving = 0
-            if self._door_processor.is_enabled:
+            data_aggregator.measure_items_in_zone(objects_in_zone,
+                                                  min_time_in_zone, max_time_in_zone,
+                                                  avg_time_in_zone)
+        # Process scenario door
+        total_people_entering = 0
+        total_people_leaving = 0
+        if self._door_processor.is_enabled:
+            with TRACER.span("door", frame_index, self._camera_index):
                 (people_entering, people_leaving,
                  total_people_entering, total_people_leaving) = self.process_scenario_door()
-                data_aggregator.measure_people_near_door(people_entering, people_leaving)
+            data_aggregator.measure_people_near_door(people_entering, people_leaving)
 
-            # Process scenario raise hands
-            if self._raise_your_hand_processor.is_enabled:
+        # Process scenario raise hands
+        if self._raise_your_hand_processor.is_enabled:
+            with TRACER.span("raised_hand", frame_index, self._camera_index):
                 people_raised_hand, raised_hand_alarm_status = self.process_scenario_raised_hand()
-                data_aggregator.measure_people_with_raised_hands(people_raised_hand)
-            else:
-                raised_hand_alarm_status = AlarmStatus.NORMAL
-
-            self._logger.debug(f"\t\tperformance process {self.performance_timer.elapsed_time / 1000:.2f} ms")
-            self.performance_timer.start()
-
-            #
-            # Drawing operations
-            #
-
+            data_aggregator.measure_people_with_raised_hands(people_raised_hand)
+        else:
+            raised_hand_alarm_status = AlarmStatus.NORMAL
+
+        self._logger.debug(f"\t\tperformance process {self._analysis_timer.elapsed_time / 1000:.2f} ms")
+        data_aggregator.stage_latency.record(LatencyStage.ANALYTICS, self._analysis_timer.stop())
+
+        # i valori mostrati nel box dei conteggi sono quelli di questo frame, anche se l'aggregatore e' gia' avanti
+        return FrameAnalysis(detections=self.detections,
+                             zone_alarm_status=zone_alarm_status,
+                             raised_hand_alarm_status=raised_hand_alarm_status,
+                             total_people_entering=total_people_entering,
+                             total_people_leaving=total_people_leaving,
+                             people_in_zone=data_aggregator.people_in_zone_counter.last_value,
+                             avg_time_in_zone=data_aggregator.avg_time_in_zone,
+                             people_raised_hand=data_aggregator.people_with_raised_hands.last_value)
+
+    def _render_frame(self, frame_index: int, source_frame: ndarray, analysis: FrameAnalysis,
+                      data_aggregator: DataAggregator) -> (Optional[ndarray], AlarmStatus, AlarmStatus):
+        zone_alarm_status = analysis.zone_alarm_status
+        raised_hand_alarm_status = analysis.raised_hand_alarm_status
+
+        # sotto carico solo una parte dei frame viene annotata e pubblicata
+        if (self._latency_controller is not None and
+                frame_index % self._latency_controller.level.output_stride != 0):
+            return None, zone_alarm_status, raised_hand_alarm_status
+
+        self._rendering_timer.start()
+
+        #
+        # Drawing operations
+        #
+
+        with TRACER.span("drawing", frame_index, self._camera_index):
             # draw scenari
             self._draw_scenario_parking(source_frame)
             self._draw_scenario_in_zone(source_frame)
             self._draw_scenario_door(source_frame)
 
             # draw on input frame, starting from model frame dimensions
-            self._detected_objects_processor.draw(source_frame, self.list_objects)
+            self._detected_objects_processor.draw(source_frame, analysis.detections)
 
             # draw alarm icon
             self._draw_alert_icons(raised_hand_alarm_status, source_frame, zone_alarm_status)
 
             # draw boxes
-            self._show_count_box(data_aggregator, raised_hand_alarm_status, source_frame, total_people_entering,
-                                 total_people_leaving, zone_alarm_status)
+            self._show_count_box(analysis, source_frame)
             self._show_video_info_box(source_frame)
             self._show_fps_box(data_aggregator, source_frame)
+            self._show_latency_box(data_aggregator, source_frame)
             self._show_time_box(source_frame)
 
-            self._logger.debug(f"\t\tperformance drawing {self.performance_timer.elapsed_time / 1000:.2f} ms")
-            self.performance_timer.start()
+        self._logger.debug(f"\t\tperformance drawing {self._rendering_timer.elapsed_time / 1000:.2f} ms")
+        data_aggregator.stage_latency.record(LatencyStage.DRAWING, self._rendering_timer.stop())
+
+        return source_frame, zone_alarm_status, raised_hand_alarm_status
+
+    def _motion_tracker_memory(self) -> (int, int):
+        if self._motion_tracker is None:
+            return 0, 0
+        return self._motion_tracker.track_count, self._motion_tracker.nbytes
 
-            return source_frame, zone_alarm_status, raised_hand_alarm_status
+    def _load_model(self) -> (object, str):
+        return load_model(self._app_settings)
 
-        except Exception as e:
-            self._logger.error("Unexpected error %s " % e)
-            traceback.print_exc()
-            return None, None
+    def _on_latency_level_changed(self):
+        # applicata dallo stadio di inferenza prima del frame successivo, che con la pipeline gira in un altro thread
+        self._requested_model_resolution = self._latency_controller.level.model_resolution
+
+    def _apply_model_resolution(self, model_resolution: ModelResolution):
+        self._model_resolution = model_resolution
+        self._model_height, self._model_width = model_resolution.value["resolution"]
+        if self._image_source_width > 0:
+            self._ratio_width = self._image_source_width / self._model_width
+            self._ratio_height = self._image_source_height / self._model_height
+        self._logger.warning(f"model image size is set to {self._model_width}x{self._model_height}")
+        self._update_roi_region()
+        if self._tiled_inference is not None and self._image_source_width > 0:
+            self._tiled_inference.setup(self._image_source_width, self._image_source_height,
+                                        self._model_width, self._model_height)
+
+    def _update_roi_region(self):
+        if not self._app_settings.model_roi_crop_enabled or self._image_source_width == 0:
+            return
+
+        polygons = []
+        if self._scenario_zone_enabled:
+            polygons.append(self._app_settings.scenario_zone_coords)
+        if self._scenario_door_enabled:
+            polygons += [self._app_settings.scenario_door_enter_poly, self._app_settings.scenario_door_leaving_poly]
+        if self._scenario_parking_enabled:
+            polygons += self._app_settings.scenario_parking_coords
+
+        # almeno la risoluzione del modello, cosi' la regione non viene mai ingrandita
+        self._roi_region = polygons_region(polygons, self._app_settings.model_roi_crop_margin,
+                                           self._image_source_width, self._image_source_height,
+                                           self._model_width / self._model_height,
+                                           self._model_width, self._model_height)
+        self._logger.info(f"model analyses region {self._roi_region} of the frame")
+
+    def _resize_for_model(self, source_frame: ndarray) -> ndarray:
+        model_shape = (self._model_height, self._model_width) + source_frame.shape[2:]
+        if self._model_frame_buffer is None or self._model_frame_buffer.shape != model_shape:
+            self._model_frame_buffer = np.empty(model_shape, dtype=source_frame.dtype)
+        return cv2.resize(source_frame, (self._model_width, self._model_height), dst=self._model_frame_buffer)
+
+    def _run_model(self, model_frame: ndarray) -> list:
+        if self._inference_engine is not None:
+            result = self._inference_engine.infer(self._camera_index, model_frame)
+            if result is None:
+                return []
+            if self._camera_tracker is not None:
+                result = self._camera_tracker.update(result)
+            return [result]
+
+        if self._tracking_enabled and not self._motion_tracker_enabled and self._camera_tracker is None:
+            return self._model.track(model_frame, verbose=False,
+                                     tracker=MODELS_TRACKER_YAML,
+                                     imgsz=self._model_resolution.value["resolution"],
+                                     conf=self._app_settings.model_confidence,
+                                     iou=self._app_settings.model_iou,
+                                     classes=self._categories_list,
+                                     persist=True)
+
+        results = self._predict_batch([model_frame])
+        if self._camera_tracker is not None:
+            return [self._camera_tracker.update(results[0])]
+        return results
+
+    def _run_model_tiled(self, source_frame: ndarray, model_frame: ndarray) -> list:
+        tiles = self._tiled_inference.split(source_frame)
+        results = self._predict_batch([model_frame] + tiles)
+        result = self._tiled_inference.merge(model_frame, results[0], results[1:])
+        if self._camera_tracker is not None:
+            result = self._camera_tracker.update(result)
+        return [result]
+
+    def _prefetch_batch(self, batch: list):
+        self._batch_results = {}
+
+        # i frame che verranno analizzati, con lo stesso contatore della maschera usato dall'analisi
+        frame_indexes, model_frames = [], []
+        frame_counter = self.frame_counter
+        stride_counter = self._stride_counter
+        for frame_index, source_frame, _, model_frame, _ in batch:
+            if frame_index == NO_CONNECTION_FRAME_INDEX or source_frame is None or source_frame.size == 0:
+                continue
+            if self._is_analysis_planned(frame_index, frame_counter):
+                if self._is_stride_opened(stride_counter):
+                    if model_frame is None or model_frame.shape[:2] != (self._model_height, self._model_width):
+                        model_frame = cv2.resize(source_frame, (self._model_width, self._model_height))
+                    frame_indexes.append(frame_index)
+                    model_frames.append(model_frame)
+                stride_counter += 1
+            frame_counter = (frame_counter + 1) % self._model_skip_frames_mask_size
+
+        if len(model_frames) == 0:
+            return
+
+        results = self._predict_batch(model_frames)
+        for frame_index, result in zip(frame_indexes, results):
+            # il tracker riceve i risultati nell'ordine dei frame
+            if self._camera_tracker is not None:
+                result = self._camera_tracker.update(result)
+            self._batch_results[frame_index] = result
+
+    def _predict_batch(self, frames: List[ndarray]) -> list:
+        # un unico batch per tutti i frame, un Results per frame
+        return self._model(frames, verbose=False,
+                           imgsz=self._model_resolution.value["resolution"],
+                           conf=self._app_settings.model_confidence,
+                           iou=self._app_settings.model_iou,
+                           classes=self._categories_list)
+
+    def _is_analysis_planned(self, frame_index: int, frame_counter: int) -> bool:
+        if self._frame_schedule.enabled:
+            scheduled = self._frame_schedule.needs_analysis(frame_index)
+        else:
+            scheduled = self._model_skip_frames_mask[frame_counter]
+        return scheduled
+
+    def _is_stride_opened(self, stride_counter: int) -> bool:
+        # lo stride conta solo i frame gia' previsti dalla maschera: applicato al frame index si sovrapporrebbe alla
+        # maschera (con maschera 10 e stride 2 non verrebbe analizzato alcun frame)
+        return (self._latency_controller is None or
+                stride_counter % self._latency_controller.level.skip_stride == 0)
+
+    def is_analysis_scheduled(self, frame_index: int) -> bool:
+        # con la decodifica pianificata il reader decodifica solo i frame previsti dalla maschera, per cui si deve
+        # usare il suo frame index e non il contatore dei frame elaborati
+        if self._frame_schedule.enabled:
+            return self._frame_schedule.needs_analysis(frame_index)
+        return self.is_mask_opened()
 
     def is_mask_opened(self) -> bool:
         return self.frame_counter < self._model_skip_frames_mask_size and self._model_skip_frames_mask[
@@ -280,25 +570,33 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
                                      data_aggregator.time_frame_source_declared,
                                      data_aggregator.time_frame_acquisition_average,
                                      data_aggregator.time_frame_processing_average,
-                                     self._app_settings.video_output_fps)
+                                     self._app_settings.video_output_fps,
+                                     data_aggregator.processor_drop_ratio)
+
+    def _show_latency_box(self, data_aggregator: DataAggregator, source_frame: ndarray):
+        if self._app_settings.show_latency_enabled:
+            self._latency_decorator.draw(source_frame, data_aggregator.stage_latency)
 
     def _show_video_info_box(self, source_frame: ndarray):
         if self._app_settings.show_video_info_enabled:
+            motion_info = None
+            if self._motion_scheduler is not None:
+                motion_info = (f"{self._motion_scheduler.motion_score:.4f} "
+                               f"{self._motion_scheduler.decision.value['message']}")
             self._video_info_decorator.draw(source_frame,
                                             self._image_source_width, self._image_source_height,
-                                            self._model_width, self._model_height)
+                                            self._model_width, self._model_height, motion_info)
 
-    def _show_count_box(self, data_aggregator, raised_hand_alarm_status, source_frame: ndarray, total_people_entering,
-                        total_people_leaving, zone_alarm_status):
+    def _show_count_box(self, analysis: FrameAnalysis, source_frame: ndarray):
         if self._app_settings.show_count_enabled:
-            self._obj_count_decorator.draw(frame=source_frame, detected_objects=self.list_objects,
-                                           in_zone_people=data_aggregator.people_in_zone_counter.last_value,
-                                           in_zone_avg_time=data_aggregator.avg_time_in_zone,
-                                           people_entering=total_people_entering,
-                                           people_leaving=total_people_leaving,
-                                           people_raised_hand=data_aggregator.people_with_raised_hands.last_value,
-                                           zone_status=zone_alarm_status,
-                                           raised_hand_alarm_status=raised_hand_alarm_status)
+            self._obj_count_decorator.draw(frame=source_frame, detected_objects=analysis.detections,
+                                           in_zone_people=analysis.people_in_zone,
+                                           in_zone_avg_time=analysis.avg_time_in_zone,
+                                           people_entering=analysis.total_people_entering,
+                                           people_leaving=analysis.total_people_leaving,
+                                           people_raised_hand=analysis.people_raised_hand,
+                                           zone_status=analysis.zone_alarm_status,
+                                           raised_hand_alarm_status=analysis.raised_hand_alarm_status)
 
     def _draw_alert_icons(self, raised_hand_alarm_status, source_frame, zone_alarm_status):
         if self._app_settings.show_alert_icon:
@@ -321,7 +619,7 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
         raised_hand_alarm_status = AlarmStatus.NORMAL
         if self._raise_your_hand_processor.is_enabled:
             raised_hand_alarm_status, people_raised_hand = self._raise_your_hand_processor.detected_raised_hands(
-                self.list_objects)
+                self.detections)
         return people_raised_hand, raised_hand_alarm_status
 
     def process_scenario_in_zone(self):
@@ -330,7 +628,7 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
         if self._zone_processor.is_enabled:
             (zone_alarm_status, objects_in_zone,
              min_time_in_zone, max_time_in_zone,
-             avg_time_in_zone) = self._zone_processor.detected_objects_in_zone(self.list_objects)
+             avg_time_in_zone) = self._zone_processor.detected_objects_in_zone(self.detections)
         return avg_time_in_zone, max_time_in_zone, min_time_in_zone, objects_in_zone, zone_alarm_status
 
     def process_scenario_parking(self):
@@ -339,7 +637,7 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
         if self._parking_processor.is_enabled:
             (zone_alarm_status, objects_in_zone,
              min_time_in_zone, max_time_in_zone,
-             avg_time_in_zone) = self._parking_processor.detected_objects_parked(self.list_objects)
+             avg_time_in_zone) = self._parking_processor.detected_objects_parked(self.detections)
         return avg_time_in_zone, max_time_in_zone, min_time_in_zone, objects_in_zone, zone_alarm_status
 
     def process_scenario_door(self):
@@ -347,51 +645,23 @@ class UltralyticsFrameProcessor(AbstractFrameProcessor, ABC):
         if self._door_processor.is_enabled:
             (total_people_entering, total_people_leaving,
              people_entering, people_leaving) = (self._door_processor
-                                                 .detected_objects_near_door_zone(self.list_objects))
+                                                 .detected_objects_near_door_zone(self.detections))
         return people_entering, people_leaving, total_people_entering, total_people_leaving
 
-    def extract_detected_objects(self, list_res_detect, pose_enabled: bool) -> List[DetectedObject]:
-        list_objects: List[DetectedObject] = []
-        for element in list_res_detect:
-            boxes = element.boxes.numpy()
-            index = 0
-            for box in boxes:
-                if box.id is None:
-                    object_id = int(box.cls)
-                else:
-                    object_id = int(box.id)
-                cls = int(box.cls)
-
-                bbox_xy = box.xyxy[0].astype(np.int32).tolist()
-                bbox_wh = box.xywh[0].astype(np.int32).tolist()
+    def extract_detected_objects(self, list_res_detect, pose_enabled: bool,
+                                 scale: Optional[Tuple[float, float, int, int]] = None) -> Detections:
+        # Set image_source dimension from model_size to source frame size
+        ratio_width, ratio_height, offset_x, offset_y = scale if scale is not None else self._model_to_frame_scale()
+        return Detections.from_results(list_res_detect, ratio_width, ratio_height, pose_enabled, offset_x, offset_y)
 
-                # Set image_source dimension from model_size to source frame size
-                bbox_xy[0] *= self._ratio_width
-                bbox_xy[2] *= self._ratio_width
-                bbox_wh[0] *= self._ratio_width
-                bbox_wh[2] *= self._ratio_width
+    def _model_to_frame_scale(self, crop_region: Optional[Tuple[int, int, int, int]] = None) \
+            -> Tuple[float, float, int, int]:
+        if crop_region is None:
+            return self._ratio_width, self._ratio_height, 0, 0
 
-                bbox_xy[1] *= self._ratio_height
-                bbox_xy[3] *= self._ratio_height
-                bbox_wh[1] *= self._ratio_height
-                bbox_wh[3] *= self._ratio_height
-
-                if pose_enabled:
-                    current_keypoints = element.keypoints[index]
-                else:
-                    current_keypoints = None
-                index += 1
-                detected_object = DetectedObject(object_id=object_id,
-                                                 label_num=cls,
-                                                 label_str=self._categories[cls].label,
-                                                 color=list(self._categories[cls].color),
-                                                 conf=round(float(box.conf), 2),
-                                                 bbox_xy=bbox_xy,
-                                                 bbox_wh=bbox_wh,
-                                                 keypoints=current_keypoints)
-
-                list_objects.append(detected_object)
-        return list_objects
+        # il modello ha analizzato solo la regione indicata del frame
+        x1, y1, x2, y2 = crop_region
+        return (x2 - x1) / self._model_width, (y2 - y1) / self._model_height, x1, y1
 
 
 def boolean_array_to_binary_sequences(mask_enabled: bool, boolean_array: List[bool]) -> str:
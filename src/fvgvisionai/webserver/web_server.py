@@ -2,22 +2,31 @@ import logging
 import threading
 import time
 import traceback
+from typing import List, Optional
 
 import cv2
-from flask import Flask, Response, request
+from flask import Flask, Response, request, jsonify
 from flask_wtf import CSRFProtect
 from waitress import serve
 
 from fvgvisionai.common.app_timer import AppTimer
+from fvgvisionai.common.frame_tracer import TRACER
 from fvgvisionai.common.loading_image_utils import create_loading_image, rotate_loading_image
+from fvgvisionai.common.memory_inspector import MEMORY_INSPECTOR, DEFAULT_TOP_STATISTICS
+from fvgvisionai.common.metrics import EXPOSITION_CONTENT_TYPE, FRAMES_ENCODED, REGISTRY
+from fvgvisionai.common.sampling_profiler import PROFILER
+from fvgvisionai.common.stage_latency import LatencyStage, StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.config.app_settings import AppSettings
 
 
 class WebServer:
-    def __init__(self, buffer: TripleBuffer, app_settings: AppSettings):
+    def __init__(self, buffer: TripleBuffer, app_settings: AppSettings, stage_latency: Optional[StageLatency] = None):
         self.local_buffer: TripleBuffer = buffer
         self.app_settings: AppSettings = app_settings
+        self.stage_latency = stage_latency
+        self._camera_index = stage_latency.camera_index if stage_latency is not None else 0
+        self._frames_encoded_metric = FRAMES_ENCODED.labels(camera=self._camera_index, output="web")
 
         self.local_image_mime_type = app_settings.video_output_image_type.value['mime-type']
         self.local_image_extension = app_settings.video_output_image_type.value['extension']
@@ -32,6 +41,10 @@ class WebServer:
         self.loading_image = create_loading_image(800, 600)
         self._logger = logging.getLogger(__name__)
 
+        # il frame codificato resta in memoria fino al successivo
+        MEMORY_INSPECTOR.register_frame_holder(f"web-{self._camera_index}",
+                                               lambda: (1 if self.cached_data else 0, len(self.cached_data)))
+
     def build_web_frame(self, exit_event: threading.Event):
         try:
             # Imposta la frequenza di frame desiderata in FPS
@@ -39,17 +52,26 @@ class WebServer:
             # Inizializza l'angolo di rotazione
             angle = 0
             fps_timer = AppTimer()
+            encode_timer = AppTimer()
 
             while not exit_event.is_set():
                 fps_timer.start()
-                next_frame_id, next_frame = self.local_buffer.get_ready_frame()
+                with self.local_buffer.ready_frame() as (next_frame_id, next_frame):
+                    if self.cached_data_id != next_frame_id and next_frame is not None:
+                        encode_timer.start()
+                        with TRACER.span("encode", next_frame_id, self._camera_index):
+                            _, temp = cv2.imencode(self.local_image_extension,
+                                                   next_frame,
+                                                   [self.local_image_quality_param_name,
+                                                    self.local_image_quality_param_value])
+                        if self.stage_latency is not None:
+                            self.stage_latency.record(LatencyStage.ENCODE, encode_timer.stop())
+                        self._frames_encoded_metric.inc()
+                    else:
+                        temp = None
 
                 if self.cached_data_id != next_frame_id:
-                    if next_frame is not None:
-                        _, temp = cv2.imencode(self.local_image_extension,
-                                               next_frame,
-                                               [self.local_image_quality_param_name,
-                                                self.local_image_quality_param_value])
+                    if temp is not None:
                         frame = temp.tobytes()
                         content_type_header = f"Content-Type: {self.local_image_mime_type}\r\n\r\n"
                         with self.local_lock:
@@ -95,7 +117,7 @@ class WebServer:
 
 
 app = Flask(__name__)
-web_server: WebServer
+web_servers: List[WebServer] = []
 
 
 # Video streaming page
@@ -123,6 +145,11 @@ def video():
             traceback.print_exc()
 
     login = request.args.get('login')
+    # in modalita' multi camera si seleziona la camera con il parametro camera (default la prima)
+    camera = request.args.get('camera', default=0, type=int)
+    if camera < 0 or camera >= len(web_servers):
+        return Response('Invalid camera', mimetype='text/plain')
+    web_server = web_servers[camera]
 
     if login is not None and login == web_server.app_settings.video_output_image_password:
         # If success return the video_source
@@ -132,20 +159,91 @@ def video():
         return Response('Invalid login', mimetype='text/plain')
 
 
+# Metriche nel formato testuale di Prometheus
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.exposition(), mimetype=EXPOSITION_CONTENT_TYPE)
+
+
+# Timeline dei frame nel formato trace-event di Chrome/Perfetto, con la stessa password del video
+@app.route('/trace')
+def trace():
+    if not TRACER.enabled:
+        return Response('Tracing is disabled', mimetype='text/plain')
+    if request.args.get('login') != web_servers[0].app_settings.video_output_image_password:
+        return Response('Invalid login', mimetype='text/plain')
+    return jsonify(TRACER.chrome_trace())
+
+
+# Profiler a campionamento: avvio, arresto e scaricamento dei risultati, con la stessa password del video
+@app.route('/profiler/<action>')
+def profiler(action: str):
+    app_settings = web_servers[0].app_settings
+    if not app_settings.profiler_enabled:
+        return Response('Profiler is disabled', mimetype='text/plain')
+    if request.args.get('login') != app_settings.video_output_image_password:
+        return Response('Invalid login', mimetype='text/plain')
+
+    if action == 'start':
+        started = PROFILER.start()
+        return Response('Profiler started' if started else 'Profiler is already running', mimetype='text/plain')
+    if action == 'stop':
+        stopped = PROFILER.stop()
+        return Response(f'Profiler stopped after {PROFILER.samples} samples' if stopped
+                        else 'Profiler is not running', mimetype='text/plain')
+    if action == 'collapsed':
+        return Response(PROFILER.collapsed(), mimetype='text/plain')
+    if action == 'speedscope':
+        response = jsonify(PROFILER.speedscope())
+        response.headers['Content-Disposition'] = 'attachment; filename=profile.speedscope.json'
+        return response
+    return Response('Invalid action', mimetype='text/plain')
+
+
+# Memoria del processo: frame per possessore, strutture degli oggetti tracciati e differenze di tracemalloc
+@app.route('/memory', defaults={'action': 'report'})
+@app.route('/memory/<action>')
+def memory(action: str):
+    app_settings = web_servers[0].app_settings
+    if not app_settings.memory_inspection_enabled:
+        return Response('Memory inspection is disabled', mimetype='text/plain')
+    if request.args.get('login') != app_settings.video_output_image_password:
+        return Response('Invalid login', mimetype='text/plain')
+
+    top = request.args.get('top', default=DEFAULT_TOP_STATISTICS, type=int)
+    if action == 'report':
+        return jsonify(MEMORY_INSPECTOR.report())
+    if action == 'start':
+        started = MEMORY_INSPECTOR.start_tracing(app_settings.memory_tracemalloc_frames)
+        return Response('Tracemalloc started' if started else 'Tracemalloc is already running',
+                        mimetype='text/plain')
+    if action == 'stop':
+        stopped = MEMORY_INSPECTOR.stop_tracing()
+        return Response('Tracemalloc stopped' if stopped else 'Tracemalloc is not running', mimetype='text/plain')
+    if action == 'snapshot':
+        return jsonify(MEMORY_INSPECTOR.take_snapshot(top))
+    if action == 'diff':
+        return jsonify(MEMORY_INSPECTOR.diff(top))
+    return Response('Invalid action', mimetype='text/plain')
+
+
 # Homepage
 @app.route('/')
 def index():
     return 'Service is up!'
 
 
-def run_web_server(buffer: TripleBuffer, app_settings: AppSettings, exit_event: threading.Event):
-    global web_server, app
-    web_server = WebServer(buffer, app_settings)
-    web_streamer_thread = threading.Thread(target=web_server.build_web_frame,
-                                           args=(exit_event,),
-                                           name='WebServer')
-    web_streamer_thread.daemon = True
-    web_streamer_thread.start()
+def run_web_server(buffers: List[TripleBuffer], app_settings: AppSettings, exit_event: threading.Event,
+                   stage_latencies: Optional[List[StageLatency]] = None):
+    global app
+    for camera_index, buffer in enumerate(buffers):
+        web_server = WebServer(buffer, app_settings, stage_latencies[camera_index] if stage_latencies else None)
+        web_servers.append(web_server)
+        web_streamer_thread = threading.Thread(target=web_server.build_web_frame,
+                                               args=(exit_event,),
+                                               name='WebServer' if len(buffers) == 1 else f'WebServer-{camera_index}')
+        web_streamer_thread.daemon = True
+        web_streamer_thread.start()
 
     csrf = CSRFProtect()
     csrf.init_app(app)
@@ -11,11 +11,15 @@ from typing import Dict
 
 from fvgvisionai.benchmark.benchmark_monitor import BenchmarkMonitor
 from fvgvisionai.common.config_executor import ConfigExecutor
+from fvgvisionai.common.frame_tracer import TRACER
+from fvgvisionai.common.memory_inspector import MEMORY_INSPECTOR
 from fvgvisionai.common.pid_file import remove_pid_file, is_another_instance_running, write_pid_file
+from fvgvisionai.common.sampling_profiler import PROFILER
+from fvgvisionai.common.stage_latency import StageLatency
 from fvgvisionai.common.triple_buffer import TripleBuffer
 from fvgvisionai.common.video_observable import VideoObservable
 from fvgvisionai.config.app_settings import load_settings_from_file, load_settings_from_env
-from fvgvisionai.input.frame_reader import run_reader
+from fvgvisionai.input.frame_reader import run_reader, run_multi_camera_reader
 from fvgvisionai.notify.notification_client import NotificationClient
 from fvgvisionai.output.hls.hls_streamer import run_hls_streamer_thread
 from fvgvisionai.webserver.web_server import run_web_server
@@ -86,34 +90,55 @@ def main() -> int:
 
     app_settings.show_properties()
 
+    TRACER.configure(app_settings.trace_enabled, app_settings.trace_buffer_size)
+    PROFILER.configure(app_settings.profiler_sample_rate_hz)
+
     # Collega il gestore dei segnali al segnale SIGINT (CTRL+C)
     signal.signal(signal.SIGINT, handle_exit)
     signal.signal(signal.SIGTERM, handle_exit)
 
-    video_observable = VideoObservable()
-    image_buffer = TripleBuffer()
+    # In modalita' multi camera ogni sorgente ha i propri buffer, output e notifiche
+    cameras_count = len(app_settings.video_source_list) if app_settings.multi_camera_enabled else 1
+    video_observables = [VideoObservable() for _ in range(cameras_count)]
+    image_buffers = [TripleBuffer() for _ in range(cameras_count)]
+    # tempi degli stadi di ogni camera, dalla lettura della sorgente agli output
+    stage_latencies = [StageLatency(camera_index) for camera_index in range(cameras_count)]
+    for camera_index, image_buffer in enumerate(image_buffers):
+        MEMORY_INSPECTOR.register_frame_holder(f"triple_buffer-{camera_index}", image_buffer.held_frames)
 
-    hls_streamer_thread = None
+    hls_streamer_threads = []
     if app_settings.video_output_stream:
-        hls_streamer_thread = run_hls_streamer_thread(video_observable, image_buffer, app_settings, exit_signal)
+        for camera_index in range(cameras_count):
+            hls_streamer_threads.append(
+                run_hls_streamer_thread(video_observables[camera_index], image_buffers[camera_index], app_settings,
+                                        exit_signal,
+                                        camera_index if app_settings.multi_camera_enabled else None,
+                                        stage_latencies[camera_index]))
 
     if app_settings.video_output_image:
         web_server_thread = threading.Thread(target=run_web_server,
-                                             args=(image_buffer, app_settings, exit_signal,),
+                                             args=(image_buffers, app_settings, exit_signal, stage_latencies,),
                                              name='WebServerThread')
         web_server_thread.daemon = True
         web_server_thread.start()
 
-    if app_settings.enabled_notification:
-        notification_client = NotificationClient(enabled=True,
-                                                 azure_connection_string=app_settings.azure_connection_string,
-                                                 device_id=app_settings.notification_device_id,
-                                                 camera_id=app_settings.notification_camera_id,
-                                                 model_id=app_settings.model_id.value,
-                                                 measures_aggregation_time_ms=app_settings.notification_aggregation_time_ms)
-        notification_client.start()
-    else:
-        notification_client = None
+    notification_clients = []
+    for camera_index in range(cameras_count):
+        if app_settings.enabled_notification:
+            if app_settings.multi_camera_enabled:
+                camera_id = f"{app_settings.notification_camera_id}_{camera_index}"
+            else:
+                camera_id = app_settings.notification_camera_id
+            notification_client = NotificationClient(enabled=True,
+                                                     azure_connection_string=app_settings.azure_connection_string,
+                                                     device_id=app_settings.notification_device_id,
+                                                     camera_id=camera_id,
+                                                     model_id=app_settings.model_id.value,
+                                                     measures_aggregation_time_ms=app_settings.notification_aggregation_time_ms)
+            notification_client.start()
+        else:
+            notification_client = None
+        notification_clients.append(notification_client)
 
     benchmark_monitor = None
     if app_settings.benchmark_enabled:
@@ -122,11 +147,18 @@ def main() -> int:
                                              exit_signal=exit_signal)
         benchmark_monitor.start()
 
-    computer_vision_thread = threading.Thread(target=run_reader,
-                                              args=(video_observable, image_buffer,
-                                                    notification_client, benchmark_monitor,
-                                                    app_settings, exit_signal,),
-                                              name='InputThread')
+    if app_settings.multi_camera_enabled:
+        computer_vision_thread = threading.Thread(target=run_multi_camera_reader,
+                                                  args=(video_observables, image_buffers,
+                                                        notification_clients, benchmark_monitor,
+                                                        app_settings, exit_signal, stage_latencies,),
+                                                  name='InputThread')
+    else:
+        computer_vision_thread = threading.Thread(target=run_reader,
+                                                  args=(video_observables[0], image_buffers[0],
+                                                        notification_clients[0], benchmark_monitor,
+                                                        app_settings, exit_signal, stage_latencies[0],),
+                                                  name='InputThread')
     computer_vision_thread.daemon = True
     computer_vision_thread.start()
     computer_vision_thread.join()
@@ -135,7 +167,7 @@ def main() -> int:
         benchmark_monitor.close()
         exit_signal.set()
 
-    if hls_streamer_thread is not None:
+    for hls_streamer_thread in hls_streamer_threads:
         hls_streamer_thread.join()
 
     time.sleep(2)